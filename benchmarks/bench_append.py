@@ -0,0 +1,123 @@
+"""What an incremental append costs end to end, and what it leaves to
+rebuild: the dataset grown in weeks (see synthetic.extended_frame) is
+written without its last week as a cached source CSV, and that week is
+appended as a batch. Timed are the whole `datastore.py append` command
+(reading the history from the column cache, merging, appending to the CSV
+and rewriting the cache and sidecar), the next start's load of the
+refreshed cache, and each index derived from the frame — the KpiIndex both
+rebuilt and extended by the batch (KpiIndex.extended), the DenseCube and
+SketchIndex rebuilt, and one type's AnomalyScores (what the anomaly feed
+computes on its first request after the append).
+
+    python benchmarks/bench_append.py [--factors 1 4 16] [--repeat 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+from synthetic import extended_frame
+
+import datastore  # importable once synthetic has put src/ on sys.path
+from anomalies import AnomalyScores
+from data_index import BlockIndex
+from dense_cube import DenseCube
+from kpi_index import KpiIndex
+from quantile_sketch import SketchIndex
+
+SKETCH_COLUMNS = ["AveragePrice", "Total Volume", "Total Bags"]
+
+
+def _median_seconds(
+    run: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _quietly(run: Callable[..., Any], *args: Any) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(*args)
+
+
+def _measure(factor: int, repeat: int) -> str:
+    frame = extended_frame(factor)
+    last_week = frame["Date"] == frame["Date"].max()
+    with tempfile.TemporaryDirectory() as directory:
+        pristine = os.path.join(directory, "pristine")
+        source = os.path.join(directory, "source")
+        batch_path = os.path.join(directory, "batch.csv")
+        os.makedirs(pristine)
+        frame[~last_week].to_csv(os.path.join(pristine, "history.csv"), index=False)
+        frame[last_week].to_csv(batch_path, index=False)
+        history = datastore.parse_and_cache(os.path.join(pristine, "history.csv"))
+        batch = datastore.read_batch(batch_path)
+        history_path = os.path.join(source, "history.csv")
+
+        def restore() -> None:
+            shutil.rmtree(source, ignore_errors=True)
+            shutil.copytree(pristine, source)
+
+        cli = ["append", history_path, batch_path]
+        end_to_end = [
+            _median_seconds(lambda: _quietly(datastore.main, cli), repeat, restore),
+            _median_seconds(lambda: datastore.read_column_cache(history_path), repeat),
+        ]
+    index = BlockIndex(history)
+    merged, _, _ = datastore.merge_sorted_batch(history, index, batch)
+    kpi_index = KpiIndex(history)
+
+    timings = end_to_end + [
+        _median_seconds(
+            lambda: datastore.merge_sorted_batch(history, index, batch), repeat
+        ),
+        _median_seconds(lambda: KpiIndex(merged), repeat),
+        _median_seconds(lambda: kpi_index.extended(batch), repeat),
+        _median_seconds(lambda: DenseCube(merged), repeat),
+        _median_seconds(lambda: SketchIndex(merged, SKETCH_COLUMNS), repeat),
+        _median_seconds(
+            lambda: AnomalyScores(merged[merged["type"] == "organic"]), repeat
+        ),
+    ]
+    return f"{len(merged):>9}  {len(batch):>5}" + "".join(
+        f"  {seconds * 1000:>10.1f}" for seconds in timings
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("milliseconds per step, after merging the last week into the rest")
+    headings = [
+        "cli append",
+        "next load",
+        "merge",
+        "kpi build",
+        "kpi extend",
+        "cube build",
+        "sketches",
+        "anomalies",
+    ]
+    print(f"{'rows':>9}  {'batch':>5}" + "".join(f"  {name:>10}" for name in headings))
+    for factor in args.factors:
+        print(_measure(factor, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
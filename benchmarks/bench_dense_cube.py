@@ -0,0 +1,93 @@
+"""Dense cube slicing against the `data.query()` scan, as the dataset grows
+in regions (the bundled one replicated under renamed regions) and in weeks
+(replicated to follow itself in time). For one query — three regions, one
+type, the middle half of the weeks — it times the scan, the cube's view of
+the date range, and the cube's rebuild of the matching long frame (what
+filter_data and the CSV export get), and checks that rebuild equals the
+scan's rows.
+
+    python benchmarks/bench_dense_cube.py [--factors 1 4 16] [--repeat 20]
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pandas as pd
+from synthetic import extended_frame, scaled_frame
+
+from dense_cube import DenseCube
+
+REGIONS = ["Albany", "Chicago", "Boise"]
+AVOCADO_TYPE = "organic"
+
+
+def _median_seconds(run: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _measure(frame: pd.DataFrame, repeat: int) -> str:
+    frame = frame.assign(Date=lambda df: pd.to_datetime(df["Date"])).sort_values(
+        by="Date", kind="stable"
+    )
+    dates = frame["Date"].drop_duplicates().sort_values()
+    start_date = dates.iloc[len(dates) // 4]
+    end_date = dates.iloc[3 * len(dates) // 4]
+
+    started = time.perf_counter()
+    cube = DenseCube(frame)
+    build = time.perf_counter() - started
+
+    def scan() -> pd.DataFrame:
+        return frame.query(
+            "region in @regions and type == @avocado_type"
+            " and Date >= @start_date and Date <= @end_date",
+            local_dict={
+                "regions": REGIONS,
+                "avocado_type": AVOCADO_TYPE,
+                "start_date": start_date,
+                "end_date": end_date,
+            },
+        )
+
+    def view() -> Any:
+        return cube.window(start_date, end_date)
+
+    def rebuild() -> pd.DataFrame:
+        return cube.select(REGIONS, [AVOCADO_TYPE], start_date, end_date)
+
+    pd.testing.assert_frame_equal(rebuild(), scan())
+    scan_time = _median_seconds(scan, repeat)
+    view_time = _median_seconds(view, repeat)
+    rebuild_time = _median_seconds(rebuild, repeat)
+    return (
+        f"{len(cube.regions):>7}  {len(cube.dates):>5}  {len(frame):>9}"
+        f"  {build:>9.3f}  {scan_time * 1000:>10.2f}  {view_time * 1000:>9.3f}"
+        f"  {rebuild_time * 1000:>12.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'regions':>7}  {'weeks':>5}  {'rows':>9}  {'build (s)':>9}"
+        f"  {'query (ms)':>10}  {'view (ms)':>9}  {'rebuild (ms)':>12}"
+    )
+    for grow in (scaled_frame, extended_frame):
+        for factor in args.factors:
+            print(_measure(grow(factor), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""filter_data() scaling: the old `data.query()` boolean scan vs. the
+(region, type, Date) BlockIndex, on the bundled dataset replicated 10x-1000x
+(each copy under renamed regions, so a query still selects the same handful
+of rows while the table grows). Every run also checks both paths return the
+identical frame.
+
+    python benchmarks/bench_filter_data.py [--factors 1 10 100 1000] [--repeat 20]
+
+1000x is ~18M rows and needs several GB of RAM.
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+import pandas as pd
+from synthetic import scaled_frame
+
+from data_index import BlockIndex
+
+QUERY = (["Albany", "Chicago", "Boise"], "organic", "2016-01-01", "2017-06-30")
+COLUMNS = ["Date", "AveragePrice", "Total Volume", "type", "year", "region"]
+
+
+def _median_seconds(run: Callable[[], pd.DataFrame], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    regions, avocado_type, start_date, end_date = QUERY
+    print(
+        f"{'rows':>10}  {'build (s)':>9}  {'query (ms)':>10}"
+        f"  {'index (ms)':>10}  {'speedup':>7}"
+    )
+    for factor in args.factors:
+        frame = scaled_frame(factor)[COLUMNS].assign(
+            Date=lambda df: pd.to_datetime(df["Date"])
+        )
+        frame = frame.sort_values(by="Date")
+
+        started = time.perf_counter()
+        index = BlockIndex(frame)
+        build = time.perf_counter() - started
+
+        def scan() -> pd.DataFrame:
+            return frame.query(
+                "region in @regions and type == @avocado_type"
+                " and Date >= @start_date and Date <= @end_date",
+                local_dict={
+                    "regions": regions,
+                    "avocado_type": avocado_type,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                },
+            )
+
+        def indexed() -> pd.DataFrame:
+            return frame.iloc[
+                index.positions(regions, [avocado_type], start_date, end_date)
+            ]
+
+        pd.testing.assert_frame_equal(scan(), indexed())
+        scan_time = _median_seconds(scan, args.repeat)
+        index_time = _median_seconds(indexed, args.repeat)
+        print(
+            f"{len(frame):>10}  {build:>9.3f}  {scan_time * 1000:>10.2f}"
+            f"  {index_time * 1000:>10.2f}  {scan_time / index_time:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Language toggle cost: payload bytes and server CPU of the callback requests
+one switch of `language-toggle` issues, with the charts relabeled client-side
+(after) vs. every chart callback re-run server-side as it used to be
+(before). Requests go through Dash's /_dash-update-component endpoint via the
+Flask test client, on the bundled dataset replicated `--factor` times.
+
+"Before" replays the old callback graph — the chart callbacks, which now
+read the language as State, fired too — with the figure and summary caches
+emptied first, as a language not yet shown missed them; the filter cache
+stays warm, as it did then.
+
+    python benchmarks/bench_language_toggle.py [--factor 1] [--regions 8] [--repeat 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any
+
+from synthetic import write_scaled_csv
+
+LANGUAGE = "language-toggle.value"
+
+
+def _outputs(key: str) -> list[dict[str, str]]:
+    outputs = []
+    for output in key.strip(".").split("..."):
+        component_id, prop = output.rsplit(".", 1)
+        outputs.append({"id": component_id, "property": prop})
+    return outputs
+
+
+def _body(key: str, entry: dict[str, Any], values: dict[str, Any]) -> bytes:
+    """The request the browser sends to run callback `key` after a toggle."""
+
+    def with_values(items: list[dict[str, str]]) -> list[dict[str, Any]]:
+        return [
+            {**item, "value": values.get(f"{item['id']}.{item['property']}")}
+            for item in items
+        ]
+
+    outputs = _outputs(key)
+    return json.dumps(
+        {
+            "output": key,
+            "outputs": outputs if key.startswith("..") else outputs[0],
+            "inputs": with_values(entry["inputs"]),
+            "state": with_values(entry["state"]),
+            "changedPropIds": [LANGUAGE],
+        }
+    ).encode()
+
+
+def _reads(entry: dict[str, Any], prop: str, *kinds: str) -> bool:
+    return any(
+        f"{item['id']}.{item['property']}" == prop
+        for kind in kinds
+        for item in entry[kind]
+    )
+
+
+def _toggle(client: Any, bodies: list[bytes]) -> tuple[int, int, float]:
+    """(request bytes, response bytes, CPU seconds) of one toggle's requests.
+    Client and server share this process, so the CPU time is the server's
+    plus the test client's (small) share."""
+    sent = received = 0
+    started = time.process_time()
+    for body in bodies:
+        response = client.post(
+            "/_dash-update-component", data=body, content_type="application/json"
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.get_data()[:200]!r}")
+        sent += len(body)
+        received += len(response.get_data())
+    return sent, received, time.process_time() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factor", type=int, default=1)
+    parser.add_argument("--regions", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "avocado.csv")
+        rows = write_scaled_csv(csv_path, args.factor)
+        os.environ["AVOCADO_DATA_PATH"] = csv_path
+        os.environ["AVOCADO_DATA_WARMUP"] = "false"
+        import app  # after the environment above; synthetic put src/ on sys.path
+
+        dataset = app.current_dataset()
+        values = {
+            "region-filter.value": dataset.regions[: args.regions],
+            "type-filter.value": "organic",
+            "date-range.start_date": dataset.min_date.isoformat(),
+            "date-range.end_date": dataset.max_date.isoformat(),
+            "x-axis-dropdown.value": app.DEFAULT_URL_X_AXIS,
+            "y-axis-dropdown.value": app.DEFAULT_URL_Y_AXIS,
+            "box-plot-column.value": app.DEFAULT_URL_BOX_PLOT_COLUMN,
+            "box-plot-groupby.value": app.DEFAULT_URL_BOX_PLOT_GROUPBY,
+        }
+        server_callbacks = {
+            key: entry
+            for key, entry in app.app.callback_map.items()
+            if "callback" in entry
+        }
+        after_keys = [
+            key
+            for key, entry in server_callbacks.items()
+            if _reads(entry, LANGUAGE, "inputs")
+        ]
+        before_keys = [
+            key
+            for key, entry in server_callbacks.items()
+            if _reads(entry, LANGUAGE, "inputs", "state")
+        ]
+        client = app.server.test_client()
+
+        def bodies(keys: list[str], lang: str) -> list[bytes]:
+            return [
+                _body(key, server_callbacks[key], {**values, LANGUAGE: lang})
+                for key in keys
+            ]
+
+        # Page load in English: fills the filter, figure and summary caches.
+        _toggle(client, bodies(before_keys, "en"))
+
+        results = {}
+        for label, keys in (("before", before_keys), ("after", after_keys)):
+            samples = []
+            for i in range(args.repeat):
+                if label == "before":
+                    for cache in app.figure_caches.values():
+                        cache.clear()
+                    app.summary_cache.clear()
+                samples.append(_toggle(client, bodies(keys, ("es", "en")[i % 2])))
+            results[label] = (
+                len(keys),
+                samples[0][0],
+                samples[0][1],
+                statistics.median(sample[2] for sample in samples),
+            )
+
+    print(f"{rows} rows, {args.regions} regions selected, {args.repeat} toggles")
+    print(
+        f"{'':>6}  {'requests':>8}  {'sent (KB)':>9}  {'received (KB)':>13}"
+        f"  {'CPU (ms)':>8}"
+    )
+    for label, (requests, sent, received, cpu) in results.items():
+        print(
+            f"{label:>6}  {requests:>8}  {sent / 1024:>9.1f}  {received / 1024:>13.1f}"
+            f"  {cpu * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Startup benchmark for load_data(): cold CSV parse vs. warm column-cache
+load, across growing dataset sizes.
+
+    python benchmarks/bench_load_data.py [--factors 1 10 50] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from synthetic import write_scaled_csv
+
+import datastore  # importable once synthetic has put src/ on sys.path
+
+
+def _time_load(repeat: int, cache: bool) -> float:
+    # Imported lazily: importing app itself runs a load of the bundled CSV.
+    from app import load_data
+
+    os.environ["AVOCADO_DATA_CACHE"] = "true" if cache else "false"
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        load_data()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'cold csv (s)':>12}  {'warm cache (s)':>14}  {'speedup':>7}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for factor in args.factors:
+            csv_path = os.path.join(tmp_dir, f"avocado_x{factor}.csv")
+            rows = write_scaled_csv(csv_path, factor)
+            os.environ["AVOCADO_DATA_PATH"] = csv_path
+
+            cold = _time_load(args.repeat, cache=False)
+            _time_load(1, cache=True)  # populate the cache
+            assert datastore.read_cache_manifest(csv_path) is not None
+            warm = _time_load(args.repeat, cache=True)
+            print(f"{rows:>10}  {cold:>12.3f}  {warm:>14.3f}  {cold / warm:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
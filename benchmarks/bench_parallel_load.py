@@ -0,0 +1,59 @@
+"""Multi-file load benchmark: parse a directory of per-region, per-month CSVs
+(the layout upstream delivers) with growing process-pool sizes.
+
+    python benchmarks/bench_parallel_load.py [--factor 1] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from synthetic import scaled_frame
+
+import datastore  # importable once synthetic has put src/ on sys.path
+
+
+def write_split_source(directory: str, factor: int) -> tuple[int, int]:
+    """Write the scaled dataset as one CSV per (region, month) into
+    `directory`; returns (rows, files)."""
+    frame = scaled_frame(factor)
+    months = frame["Date"].str.slice(0, 7)
+    files = 0
+    for (region, month), part in frame.groupby(["region", months]):
+        part.to_csv(os.path.join(directory, f"{region}_{month}.csv"), index=False)
+        files += 1
+    return len(frame), files
+
+
+def _time_parse(source: str, workers: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        datastore.parse_sources(source, workers=workers)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--factor", type=int, default=1)
+    default_workers = sorted({1, 2, 4, os.cpu_count() or 1})
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as source_dir:
+        rows, files = write_split_source(source_dir, args.factor)
+        print(f"{rows} rows in {files} files, {os.cpu_count()} CPUs")
+        print(f"{'workers':>7}  {'parse (s)':>9}  {'speedup':>7}")
+        baseline = None
+        for workers in args.workers:
+            elapsed = _time_parse(source_dir, workers, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{workers:>7}  {elapsed:>9.3f}  {baseline / elapsed:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Scatter chart size and build time against point count: the payload
+bytes of create_scatter_chart's figure as Dash serializes it, the median
+time to build it, and the trace type it picks (SVG "scatter", or WebGL
+"scattergl" past app.SCATTER_GL_POINTS). "unpacked" is the payload with
+each point's (region, date) hover labels sent as strings, as they were
+before being packed into codes. Points are the first N rows of the bundled
+dataset replicated as needed.
+
+    python benchmarks/bench_scatter_render.py [--points 1000 20000] [--repeat 5]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import time
+from typing import Any
+
+import pandas as pd
+from plotly.io.json import to_json_plotly
+from synthetic import scaled_frame
+
+
+def _unpacked(figure: dict[str, Any]) -> dict[str, Any]:
+    traces = []
+    for trace in figure["data"]:
+        packed = trace["meta"]["customdata"]
+        columns = [
+            [labels[code] for code in codes]
+            for codes, labels in zip(packed["codes"], packed["labels"])
+        ]
+        traces.append(
+            {
+                **{key: value for key, value in trace.items() if key != "meta"},
+                "customdata": list(zip(*columns)),
+            }
+        )
+    return {**figure, "data": traces}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--points", type=int, nargs="+", default=[1_000, 5_000, 20_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["AVOCADO_DATA_WARMUP"] = "false"
+    import app  # after the environment above; synthetic put src/ on sys.path
+
+    factor = math.ceil(max(args.points) / len(scaled_frame(1)))
+    frame = scaled_frame(factor).assign(Date=lambda df: pd.to_datetime(df["Date"]))
+
+    print(
+        f"{'points':>8}  {'trace type':>10}  {'payload (KB)':>12}"
+        f"  {'unpacked (KB)':>13}  {'build (ms)':>10}"
+    )
+    for points in args.points:
+        rows = frame.head(points)
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            figure = app.create_scatter_chart(rows, "AveragePrice", "Total Volume")
+            timings.append(time.perf_counter() - started)
+        payload = len(to_json_plotly(figure).encode())
+        unpacked = len(to_json_plotly(_unpacked(figure)).encode())
+        print(
+            f"{points:>8}  {figure['data'][0]['type']:>10}  {payload / 1024:>12.1f}"
+            f"  {unpacked / 1024:>13.1f}  {statistics.median(timings) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
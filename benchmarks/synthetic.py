@@ -0,0 +1,46 @@
+"""Synthetic datasets for the benchmarks in this directory: the bundled
+avocado.csv replicated `factor` times, each copy under renamed regions
+("Albany~3"), so row counts scale while the per-(region, type) weekly shape
+stays realistic — or, with `extended_frame`, each copy shifted to follow
+the previous one in time, so the weeks grow instead."""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+BUNDLED_CSV = os.path.join(SRC_DIR, "avocado.csv")
+
+import pandas as pd  # noqa: E402
+
+
+def scaled_frame(factor: int) -> pd.DataFrame:
+    base = pd.read_csv(BUNDLED_CSV)
+    copies = [
+        base.assign(region=base["region"] + ("" if copy == 0 else f"~{copy}"))
+        for copy in range(factor)
+    ]
+    scaled = pd.concat(copies, ignore_index=True)
+    scaled["Unnamed: 0"] = range(len(scaled))
+    return scaled
+
+
+def extended_frame(factor: int) -> pd.DataFrame:
+    base = pd.read_csv(BUNDLED_CSV)
+    dates = pd.to_datetime(base["Date"])
+    weeks = (dates.max() - dates.min()).days // 7 + 1
+    copies = []
+    for copy in range(factor):
+        shifted = dates + pd.Timedelta(weeks=weeks * copy)
+        copies.append(
+            base.assign(Date=shifted.dt.strftime("%Y-%m-%d"), year=shifted.dt.year)
+        )
+    extended = pd.concat(copies, ignore_index=True)
+    extended["Unnamed: 0"] = range(len(extended))
+    return extended
+
+
+def write_scaled_csv(path: str, factor: int) -> int:
+    frame = scaled_frame(factor)
+    frame.to_csv(path, index=False)
+    return len(frame)
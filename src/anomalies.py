@@ -0,0 +1,102 @@
+# anomalies.py
+"""Price anomaly scores for every series of a frame at once. Where
+utils.detect_price_anomalies scores one series per call (the price chart
+used to call it once per selected region), `price_zscores` computes every
+(region, type) series' deviations in one grouped pass, and an
+`AnomalyScores` keeps a selection's scores so that later lookups (the
+anomaly feed's, for one type over a date range) read the same array
+instead of rescanning rows.
+
+Two scores are offered: the default "std" is the detector's own —
+distance from the series' mean in sample standard deviations, so
+`score > threshold` flags exactly what detect_price_anomalies flags — and
+"mad" a robust variant, distance from the median in scaled median
+absolute deviations, which a few extreme weeks can't inflate. A score is
+NaN where a series can't define a deviation (fewer than 2 points, or no
+spread), and NaN never exceeds a threshold."""
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("std", "mad")
+
+# Scales a median absolute deviation to a standard deviation's units for
+# normally distributed prices, so both methods share one threshold.
+MAD_SCALE = 1.4826
+
+SERIES_KEYS = ("region", "type")
+
+
+def price_zscores(
+    frame: pd.DataFrame,
+    method: str = "std",
+    keys: Sequence[str] = SERIES_KEYS,
+    column: str = "AveragePrice",
+) -> pd.Series:
+    """Each row's `column` score within its series — the rows sharing its
+    `keys` — aligned to `frame`'s index. Rows missing a key belong to no
+    series and score NaN. Raises ValueError for an unknown `method`."""
+    if method not in METHODS:
+        raise ValueError(
+            f"Unknown anomaly method {method!r}; expected one of {METHODS}"
+        )
+    prices = frame[column].astype(np.float64)
+    groups = [frame[key] for key in keys]
+
+    def grouped(values: pd.Series) -> Any:
+        return values.groupby(groups, sort=False, observed=True, dropna=True)
+
+    by_series = grouped(prices)
+    # Like detect_price_anomalies, the size counts rows without a price.
+    sizes = by_series.transform("size")
+    if method == "std":
+        centers = by_series.transform("mean")
+        spreads = by_series.transform("std")
+    else:
+        centers = by_series.transform("median")
+        spreads = grouped((prices - centers).abs()).transform("median") * MAD_SCALE
+    deviations = (prices - centers).abs()
+    undefined = (sizes < 2) | (spreads == 0)
+    scores: pd.Series = (deviations / spreads).mask(undefined)
+    return scores
+
+
+def flag_anomalies(scores: pd.Series, threshold: float) -> pd.Series:
+    """The points scoring strictly above `threshold`; NaN scores never do."""
+    return scores > threshold
+
+
+class AnomalyScores:
+    """Every (region, type) series' scores over one date range: `frame`
+    holds the range's rows (in any order), scored within the range."""
+
+    FEED_COLUMNS = ["Date", "region", "type", "AveragePrice"]
+
+    def __init__(self, frame: pd.DataFrame, method: str = "std") -> None:
+        self.method = method
+        self.rows = frame[self.FEED_COLUMNS]
+        self.zscores = price_zscores(frame, method)
+
+    def for_rows(self, index: pd.Index) -> pd.Series:
+        """The scores of the rows labelled `index`, in its order."""
+        return self.zscores.reindex(index)
+
+    def most_extreme(
+        self,
+        avocado_types: Iterable[str] | None,
+        threshold: float,
+        limit: int,
+    ) -> pd.DataFrame:
+        """Up to `limit` of the points flagged above `threshold` (of
+        `avocado_types`; None means all), most extreme first, with their
+        score as a `zscore` column. Equal scores keep row order."""
+        flagged = flag_anomalies(self.zscores, threshold)
+        if avocado_types is not None:
+            flagged &= self.rows["type"].isin(list(avocado_types))
+        scores = self.zscores[flagged]
+        order = np.argsort(-scores.to_numpy(), kind="stable")[: max(limit, 0)]
+        points = self.rows[flagged].iloc[order]
+        return points.assign(zscore=scores.iloc[order])
@@ -1,23 +1,47 @@
 # app.py
 
+import base64
 import logging
 import os
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, replace
 from datetime import date
 from typing import Any, NotRequired, TypedDict
 from urllib.parse import parse_qs, urlencode
 
+import numpy as np
 import pandas as pd
 import sentry_sdk
 from dash import Dash, Input, NoUpdate, Output, State, ctx, dcc, html, no_update
 
+import datastore
 import translations
-from utils import (
-    calculate_price_change,
-    calculate_summary_stats,
-    detect_price_anomalies,
-    find_region_extremes,
-    format_number,
+from anomalies import METHODS, AnomalyScores, flag_anomalies, price_zscores
+from data_index import BlockIndex
+from dataset import (
+    DataReloader,
+    Dataset,
+    DatasetSnapshot,
+    LazySnapshot,
+    PartitionedSnapshot,
 )
+from downsample import lttb_indices
+from filters import FilterSpec
+from quantile_sketch import (
+    DEFAULT_RELATIVE_ACCURACY,
+    QuantileSketch,
+    SketchIndex,
+    SketchSelection,
+)
+from result_cache import CacheStats, ResultCache
+from sqlite_backend import (
+    SqliteSnapshot,
+    build_sqlite_store,
+    default_sqlite_path,
+    sqlite_store_is_current,
+)
+from utils import calculate_summary_stats, format_number
 
 logger = logging.getLogger(__name__)
 
@@ -45,58 +69,366 @@ class Option(TypedDict):
 DropdownOptions = list[Option]
 
 
-REQUIRED_DATA_COLUMNS = {"Date", "AveragePrice", "Total Volume", "type", "region"}
+def load_data(source: str | None = None) -> pd.DataFrame:
+    """Load and preprocess the avocado dataset from `source`, by default
+    data_source_path(): the bundled CSV unless AVOCADO_DATA_PATH overrides
+    it (e.g. to swap in a different dataset without a code change). The parsed, sorted
+    frame is cached next to the source (see datastore.py) and reused while
+    the source is unchanged; AVOCADO_DATA_CACHE=false turns that off.
+    AVOCADO_COMPACT_DATA=true opts into datastore.compact_frame's smaller
+    in-memory representation, logging the footprint before and after."""
+    loaded = _read_source(source or data_source_path())
+    if os.environ.get("AVOCADO_COMPACT_DATA", "false").lower() == "true":
+        full_bytes = datastore.frame_memory_bytes(loaded)
+        loaded = datastore.compact_frame(loaded)
+        logger.info(
+            "Compact dataset mode: %.2f MB -> %.2f MB in memory",
+            full_bytes / 1_000_000,
+            datastore.frame_memory_bytes(loaded) / 1_000_000,
+        )
+    return loaded
 
 
-def load_data() -> pd.DataFrame:
-    """Load and preprocess the avocado dataset. The source path defaults to
-    the bundled CSV but can be overridden via AVOCADO_DATA_PATH (e.g. to
-    swap in a different dataset without a code change)."""
-    csv_path = os.environ.get(
+def data_source_path() -> str:
+    """What load_data() reads: AVOCADO_DATA_PATH — a CSV file, a directory
+    of them or a glob (see datastore.source_files) — else the bundled CSV."""
+    return os.environ.get(
         "AVOCADO_DATA_PATH",
         os.path.join(os.path.dirname(__file__), "avocado.csv"),
     )
-    try:
-        raw_data = pd.read_csv(csv_path)
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Could not find avocado.csv at {csv_path}")
-    except Exception as e:
-        raise Exception(f"Error loading data: {str(e)}")
 
-    missing_columns = REQUIRED_DATA_COLUMNS - set(raw_data.columns)
-    if missing_columns:
+
+def load_dataset(source: str | None = None) -> tuple[pd.DataFrame, BlockIndex]:
+    """load_data() plus the BlockIndex over it. When AVOCADO_COLUMN_STORE
+    names a directory built with `python src/datastore.py build-store`, both
+    are memory-mapped from that store instead — no CSV is read, and every
+    worker on the host shares one page-cache copy of the columns (see
+    datastore.open_column_store; AVOCADO_COMPACT_DATA doesn't apply there,
+    the store's region/type are already categorical codes)."""
+    store_dir = os.environ.get("AVOCADO_COLUMN_STORE")
+    if store_dir:
+        return datastore.open_column_store(store_dir)
+    frame = load_data(source)
+    return frame, BlockIndex(frame)
+
+
+def load_snapshot(lazy: bool = False) -> Dataset:
+    """The dataset to serve. AVOCADO_PARTITION_DIR, naming a directory
+    written by `python src/datastore.py ingest`, serves it lazily from
+    per-(region, type) partitions (for sources larger than memory), keeping
+    up to AVOCADO_PARTITION_CACHE_MB (default 64) of them parsed;
+    AVOCADO_QUERY_BACKEND=sqlite serves it from a SQLite file (see
+    open_sqlite_snapshot); otherwise it is load_dataset() held in memory.
+    With `lazy`, a CSV source with a valid metadata sidecar isn't loaded
+    here at all: a LazySnapshot serves the sidecar until the data is first
+    needed."""
+    partition_dir = os.environ.get("AVOCADO_PARTITION_DIR")
+    if partition_dir:
+        cache_mb = int(os.environ.get("AVOCADO_PARTITION_CACHE_MB", "64"))
+        return PartitionedSnapshot.open(partition_dir, cache_mb * 1024 * 1024)
+    source = data_source_path()
+    backend = os.environ.get("AVOCADO_QUERY_BACKEND", "pandas").lower()
+    if backend == "sqlite":
+        return open_sqlite_snapshot(source)
+    if backend != "pandas":
         raise ValueError(
-            f"CSV at {csv_path} is missing required columns: "
-            f"{', '.join(sorted(missing_columns))}"
+            f"Unknown AVOCADO_QUERY_BACKEND {backend!r}; expected 'pandas' or 'sqlite'"
+        )
+    if lazy and not os.environ.get("AVOCADO_COLUMN_STORE"):
+        metadata = datastore.read_metadata_sidecar(source)
+        if metadata is not None:
+            return LazySnapshot(metadata, lambda: _build_snapshot(source))
+    return _build_snapshot(source)
+
+
+def open_sqlite_snapshot(source: str) -> SqliteSnapshot:
+    """Serve `source` from the SQLite file at AVOCADO_SQLITE_PATH (default:
+    `<source>.sqlite`), building it first when it's missing or was built
+    from an older version of a single-CSV source."""
+    db_path = os.environ.get("AVOCADO_SQLITE_PATH") or default_sqlite_path(source)
+    if os.path.isfile(source) and not sqlite_store_is_current(db_path, source):
+        rows = build_sqlite_store(source, db_path)
+        logger.info("Built SQLite store %s from %s: %d rows", db_path, source, rows)
+    return SqliteSnapshot(db_path)
+
+
+def _build_snapshot(source: str) -> DatasetSnapshot:
+    """Load `source` in full, refreshing its metadata sidecar if that no
+    longer describes what was loaded (a single CSV source only). With
+    AVOCADO_DENSE_CUBE=true the snapshot also holds the data as a DenseCube
+    and selects rows from it."""
+    dense_cube = os.environ.get("AVOCADO_DENSE_CUBE", "false").lower() == "true"
+    snapshot = DatasetSnapshot.build(*load_dataset(source), dense_cube=dense_cube)
+    if os.path.isfile(source) and not os.environ.get("AVOCADO_COLUMN_STORE"):
+        metadata = snapshot.metadata()
+        if datastore.read_metadata_sidecar(source) != metadata:
+            datastore.write_metadata_sidecar(source, metadata)
+    return snapshot
+
+
+def _read_source(csv_path: str) -> pd.DataFrame:
+    """Parse, validate and Date-sort `csv_path`, via its column cache when
+    one is valid (see load_data). A multi-file source is parsed across
+    AVOCADO_LOAD_WORKERS processes (default: one per CPU) and isn't cached —
+    the cache is keyed by a single file's fingerprint."""
+    use_cache = os.environ.get(
+        "AVOCADO_DATA_CACHE", "true"
+    ).lower() == "true" and os.path.isfile(csv_path)
+    if use_cache:
+        cached = datastore.read_column_cache(csv_path)
+        if cached is not None:
+            return cached
+
+    workers = os.environ.get("AVOCADO_LOAD_WORKERS")
+    parse = datastore.parse_and_cache if use_cache else datastore.parse_sources
+    return parse(csv_path, int(workers) if workers else None)
+
+
+def select_rows(
+    regions: list[str] | None,
+    avocado_types: list[str] | None,
+    start_date: str | None,
+    end_date: str | None,
+    dataset: Dataset | None = None,
+) -> pd.DataFrame:
+    """Rows of `dataset` (default: the live one) matching the given regions,
+    types and inclusive date range, in dataset order — None for `regions` or
+    `avocado_types` means "all of them". See select_filter."""
+    if dataset is None:
+        dataset = current_dataset()
+    return select_filter(
+        filter_spec(regions, avocado_types, start_date, end_date, dataset), dataset
+    )
+
+
+def filter_spec(
+    regions: list[str] | None,
+    avocado_types: list[str] | None,
+    start_date: str | None,
+    end_date: str | None,
+    dataset: Dataset | None = None,
+) -> FilterSpec:
+    """The canonical FilterSpec of these filter values against `dataset`'s
+    (default: the live one's) date bounds and dates."""
+    if dataset is None:
+        dataset = current_dataset()
+    return FilterSpec.build(
+        regions,
+        avocado_types,
+        start_date,
+        end_date,
+        dataset.min_date,
+        dataset.max_date,
+        dataset.dates,
+    )
+
+
+def select_filter(spec: FilterSpec, dataset: Dataset | None = None) -> pd.DataFrame:
+    """Rows of `dataset` (default: the live one) matching `spec`, in dataset
+    order. Resolved through the snapshot's BlockIndex rather than a boolean
+    scan of its frame, and memoized in filter_cache: the callbacks one
+    filter change fires all share a single selection, as do filter values
+    that differ only in ways FilterSpec normalizes away. The frame returned
+    may be shared, so treat it as read-only."""
+    selected = current_dataset() if dataset is None else dataset
+
+    def select() -> tuple[Dataset, pd.DataFrame]:
+        return selected, selected.select(
+            None if spec.regions is None else list(spec.regions),
+            None if spec.avocado_types is None else list(spec.avocado_types),
+            spec.start_date.isoformat(),
+            spec.end_date.isoformat(),
         )
 
-    return raw_data.assign(
-        Date=lambda df: pd.to_datetime(df["Date"], format="%Y-%m-%d")
-    ).sort_values(by="Date")
+    # The entry holds `selected` itself, so its id can't be reused by
+    # another dataset while the entry exists.
+    _, rows = filter_cache.get_or_compute((id(selected), spec), select)
+    return rows
+
+
+def count_filter(spec: FilterSpec, dataset: Dataset | None = None) -> int:
+    """How many rows select_filter(spec, dataset) returns, answered by the
+    dataset without selecting them (for a loaded snapshot, two binary
+    searches per (region, type) in its BlockIndex) — for callbacks that only
+    need to know whether a filter matches anything."""
+    selected = current_dataset() if dataset is None else dataset
+    return selected.count(
+        None if spec.regions is None else list(spec.regions),
+        None if spec.avocado_types is None else list(spec.avocado_types),
+        spec.start_date.isoformat(),
+        spec.end_date.isoformat(),
+    )
+
+
+def _selection_bytes(entry: tuple[Dataset, pd.DataFrame]) -> int:
+    return int(entry[1].memory_usage(deep=True).sum())
+
+
+# Filtered frames shared across callbacks, keyed by dataset and FilterSpec.
+# Cleared whenever a new dataset is swapped in;
+# AVOCADO_FILTER_CACHE_ENTRIES=0 disables it.
+filter_cache: ResultCache[tuple[Dataset, pd.DataFrame]] = ResultCache(
+    max_entries=int(os.environ.get("AVOCADO_FILTER_CACHE_ENTRIES", "128")),
+    max_bytes=int(os.environ.get("AVOCADO_FILTER_CACHE_MB", "64")) * 1024 * 1024,
+    sizeof=_selection_bytes,
+)
+
+
+FIGURE_CHARTS = ("price", "volume", "scatter", "box")
+
+# Finished figure dicts per chart, keyed by dataset and the chart's inputs
+# (translate_figure swaps the language in; the theme is applied
+# client-side). Cleared with filter_cache on a dataset swap;
+# AVOCADO_FIGURE_CACHE_ENTRIES (per chart) of 0 disables them.
+figure_caches: dict[str, ResultCache[tuple[Dataset, dict[str, Any]]]] = {
+    chart: ResultCache(
+        max_entries=int(os.environ.get("AVOCADO_FIGURE_CACHE_ENTRIES", "64"))
+    )
+    for chart in FIGURE_CHARTS
+}
+
+# The summary panel's numbers, keyed like the figures, so switching the
+# language only re-renders the panel's labels.
+summary_cache: ResultCache[tuple[Dataset, "SummaryKpis | None"]] = ResultCache(
+    max_entries=int(os.environ.get("AVOCADO_FIGURE_CACHE_ENTRIES", "64"))
+)
+
+# Quantile sketches of numeric_columns per dataset (see sketch_index),
+# within AVOCADO_SKETCH_ACCURACY of the exact quantiles (default 1%,
+# relative). Only the live dataset's is needed; one more covers a swap.
+SKETCH_ACCURACY = float(
+    os.environ.get("AVOCADO_SKETCH_ACCURACY", str(DEFAULT_RELATIVE_ACCURACY))
+)
+sketch_cache: ResultCache[tuple[Dataset, SketchIndex]] = ResultCache(max_entries=2)
+
+# The ISO labels of each dataset's distinct dates (see date_labels), which
+# scatter hovers show; one more entry covers a swap.
+date_label_cache: ResultCache[tuple[Dataset, list[str]]] = ResultCache(max_entries=2)
+
+# Prices scoring above ANOMALY_STD_THRESHOLD are anomalies. The price chart's
+# anomaly-threshold slider re-marks them in the browser (see MASK_ANOMALIES)
+# at any threshold in [ANOMALY_THRESHOLD_MIN, ANOMALY_THRESHOLD_MAX].
+ANOMALY_STD_THRESHOLD = 2.0
+ANOMALY_THRESHOLD_MIN = 1.5
+ANOMALY_THRESHOLD_MAX = 4.0
+
+# Anomaly scores, with AVOCADO_ANOMALY_METHOD: "std" (the default,
+# detect_price_anomalies' own z-score) or the robust "mad". The anomaly
+# feed's, of every region of one type over a date range, are cached (see
+# anomaly_scores); the price chart scores just its own rows.
+ANOMALY_METHOD = os.environ.get("AVOCADO_ANOMALY_METHOD", "std").lower()
+if ANOMALY_METHOD not in METHODS:
+    raise ValueError(
+        f"AVOCADO_ANOMALY_METHOD must be one of {METHODS}, not {ANOMALY_METHOD!r}"
+    )
+anomaly_cache: ResultCache[tuple[Dataset, AnomalyScores]] = ResultCache(
+    max_entries=int(os.environ.get("AVOCADO_ANOMALY_CACHE_ENTRIES", "16"))
+)
+
+
+def sketch_index(dataset: Dataset) -> SketchIndex | None:
+    """`dataset`'s SketchIndex, built from its frame on first use — or None
+    for the partition and SQLite backends, whose `data` would read every
+    row into memory just to build it; their box plots use the rows."""
+    if not isinstance(dataset, (DatasetSnapshot, LazySnapshot)):
+        return None
+
+    def build_entry() -> tuple[Dataset, SketchIndex]:
+        return dataset, SketchIndex(dataset.data, numeric_columns, SKETCH_ACCURACY)
+
+    _, index = sketch_cache.get_or_compute(id(dataset), build_entry)
+    return index
+
+
+def date_labels(dataset: Dataset) -> list[str] | None:
+    """`dataset.dates` as "%Y-%m-%d" labels, formatted on first use — or
+    None while the backend doesn't hold its dates (see Dataset.dates)."""
+    dates = dataset.dates
+    if dates is None:
+        return None
+
+    def build_entry() -> tuple[Dataset, list[str]]:
+        return dataset, pd.DatetimeIndex(dates).strftime("%Y-%m-%d").tolist()
+
+    _, labels = date_label_cache.get_or_compute(id(dataset), build_entry)
+    return labels
+
+
+def anomaly_scores(spec: FilterSpec, dataset: Dataset | None = None) -> AnomalyScores:
+    """The anomaly scores of every region of `dataset` (default: the live
+    one) of `spec`'s types over its date range, computed in one grouped
+    pass on first use and cached per types and range — `spec`'s regions
+    don't change a series' scores, so they aren't part of the key."""
+    selected = current_dataset() if dataset is None else dataset
+    avocado_types = None if spec.avocado_types is None else list(spec.avocado_types)
+
+    def score() -> tuple[Dataset, AnomalyScores]:
+        rows = selected.select(
+            None,
+            avocado_types,
+            spec.start_date.isoformat(),
+            spec.end_date.isoformat(),
+        )
+        return selected, AnomalyScores(rows, ANOMALY_METHOD)
+
+    key = (
+        id(selected),
+        spec.avocado_types,
+        spec.start_date,
+        spec.end_date,
+        ANOMALY_METHOD,
+    )
+    _, scores = anomaly_cache.get_or_compute(key, score)
+    return scores
+
+
+def cached_figure(
+    chart: str,
+    dataset: Dataset,
+    inputs: tuple[Any, ...],
+    lang: str,
+    build: Callable[[], dict[str, Any]],
+) -> dict[str, Any]:
+    """`chart`'s figure for `inputs` (its FilterSpec first, then any chart
+    options) in `lang`, from figure_caches, running `build` on a miss. A
+    figure cached in one language is served in the other through
+    translate_figure, so the language isn't part of the key. The figure may
+    share objects with other requests', so it must not be modified."""
+
+    def build_entry() -> tuple[Dataset, dict[str, Any]]:
+        return dataset, build()
+
+    # As in select_filter, the entry holds `dataset`, pinning its id.
+    key = (id(dataset), inputs)
+    _, figure = figure_caches[chart].get_or_compute(key, build_entry)
+    return translate_figure(figure, lang)
 
 
 def filter_data(
-    regions: list[str], avocado_type: str, start_date: str, end_date: str
+    regions: list[str],
+    avocado_type: str,
+    start_date: str,
+    end_date: str,
+    dataset: Dataset | None = None,
 ) -> pd.DataFrame:
-    """Filter the module-level dataset by selected regions/type/date-range."""
-    return data.query(
-        "region in @regions and type == @avocado_type"
-        " and Date >= @start_date and Date <= @end_date"
-    )
+    """Filter the dataset by selected regions/type/date-range. Callbacks
+    pass the snapshot they took on entry, so every query they make sees the
+    same data even if a hot reload swaps the live one mid-callback."""
+    return select_rows(regions, [avocado_type], start_date, end_date, dataset)
 
 
 EMPTY_REGION_MESSAGE = translations.t("empty.select_region", "en")
 
 
 def empty_state_figure(
-    message: str, lang: str = "en", theme: str = "light"
+    message: str | translations.LocalizedText, lang: str = "en", theme: str = "light"
 ) -> dict[str, Any]:
     """Empty Plotly figure with a centered annotation explaining why."""
     chart_bg, _, text_color = _chart_chrome(theme)
-    return {
+    figure: dict[str, Any] = {
         "data": [],
         "layout": {
-            "title": translations.t("empty.no_data_filters", lang),
+            "title": translations.localized(("t", "empty.no_data_filters")),
             "plot_bgcolor": chart_bg,
             "paper_bgcolor": chart_bg,
             "font": {"color": text_color},
@@ -113,12 +445,133 @@ def empty_state_figure(
             ],
         },
     }
+    return localize_figure(figure, lang)
+
+
+def error_figure(error: Exception, lang: str = "en") -> dict[str, Any]:
+    """Empty Plotly figure titled with the error a chart callback caught."""
+    title = translations.localized(("t", "common.error_prefix"), f": {error}")
+    return localize_figure({"data": [], "layout": {"title": title}}, lang)
+
+
+# Load data. The live snapshot is replaced wholesale (never mutated) by
+# swap_dataset() when AVOCADO_DATA_RELOAD_INTERVAL enables hot reloading.
+# With a metadata sidecar the frame itself loads in the background (or on
+# the first data callback, with AVOCADO_DATA_WARMUP=false), so importing
+# this module — and binding the port — doesn't wait for it.
+_dataset = load_snapshot(lazy=True)
+if (
+    isinstance(_dataset, LazySnapshot)
+    and os.environ.get("AVOCADO_DATA_WARMUP", "true").lower() == "true"
+):
+    _dataset.warm_up()
+
+
+def current_dataset() -> Dataset:
+    return _dataset
+
+
+def swap_dataset(snapshot: Dataset) -> Dataset:
+    """Install `snapshot` as the live dataset and return the one it replaced.
+    A single reference rebind, so readers see either snapshot whole."""
+    global _dataset
+    previous, _dataset = _dataset, snapshot
+    filter_cache.clear()
+    for cache in figure_caches.values():
+        cache.clear()
+    summary_cache.clear()
+    sketch_cache.clear()
+    date_label_cache.clear()
+    anomaly_cache.clear()
+    return previous
+
+
+# Module attributes that used to be import-time globals, now always read
+# from the live snapshot (e.g. `from app import data, regions`).
+_SNAPSHOT_ATTRIBUTES = {
+    "data": "data",
+    "data_index": "index",
+    "regions": "regions",
+    "avocado_types": "avocado_types",
+    "DATA_MIN_DATE": "min_date",
+    "DATA_MAX_DATE": "max_date",
+}
 
 
-# Load data
-data = load_data()
-regions = sorted(data["region"].unique())
-avocado_types = sorted(data["type"].unique())
+def __getattr__(name: str) -> Any:
+    if name in _SNAPSHOT_ATTRIBUTES:
+        return getattr(_dataset, _SNAPSHOT_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_append_lock = threading.Lock()
+
+
+def append_batch(batch_path: str) -> datastore.AppendResult:
+    """Merge the CSV of new rows at `batch_path` into the live dataset.
+    Only the batch is validated; rows repeating an existing (Date, region,
+    type) replace it. The merged snapshot is swapped in, and a single-CSV
+    source gets the batch appended and its metadata sidecar and column
+    cache rewritten (see datastore.append_to_source) — no step reparses or
+    re-sorts the history (see DatasetSnapshot.append), and the reloader
+    doesn't reload the file for it. A column store on disk is left as
+    built; rerun build-store to fold the batch in there."""
+    batch = datastore.read_batch(batch_path)
+    with _append_lock:
+        dataset = current_dataset()
+        if isinstance(dataset, LazySnapshot):
+            dataset = dataset.loaded()
+        if not isinstance(dataset, DatasetSnapshot):
+            raise ValueError(
+                "Appending needs an in-memory dataset; add the rows to the "
+                "source and rebuild the partition or SQLite store instead"
+            )
+        snapshot, result = dataset.append(batch)
+        source = data_source_path()
+        if os.path.isfile(source) and not os.environ.get("AVOCADO_COLUMN_STORE"):
+            cache = os.environ.get("AVOCADO_DATA_CACHE", "true").lower() == "true"
+            datastore.append_to_source(
+                source, batch, snapshot.data, snapshot.metadata(), cache
+            )
+            if data_reloader is not None:
+                data_reloader.mark_loaded()
+        swap_dataset(snapshot)
+    logger.info(
+        "Appended %s: %d new rows, %d replaced",
+        batch_path,
+        result.inserted,
+        result.replaced,
+    )
+    return result
+
+
+def start_data_reloader() -> DataReloader | None:
+    """Start the background reloader when AVOCADO_DATA_RELOAD_INTERVAL is a
+    positive number of seconds. Watches the partition or column store's
+    manifest when AVOCADO_PARTITION_DIR / AVOCADO_COLUMN_STORE is set
+    (rebuilding either rewrites it last), else the source CSV."""
+    interval = float(os.environ.get("AVOCADO_DATA_RELOAD_INTERVAL", "0"))
+    if interval <= 0:
+        return None
+    store_dir = os.environ.get("AVOCADO_PARTITION_DIR") or os.environ.get(
+        "AVOCADO_COLUMN_STORE"
+    )
+    watch_path = (
+        os.path.join(store_dir, datastore.MANIFEST_NAME)
+        if store_dir
+        else data_source_path()
+    )
+    reloader = DataReloader(
+        watch_path,
+        load_snapshot,
+        swap_dataset,
+        interval,
+    )
+    reloader.start()
+    return reloader
+
+
+data_reloader = start_data_reloader()
 
 # Categorical palette for per-region chart lines (validated with the
 # /dataviz skill: 8 hues, worst adjacent CVD ΔE 24.2 against the light
@@ -173,17 +626,91 @@ CHART_TEXT_COLOR_DARK = "#EDE6D6"  # --cream-text
 TYPE_COLOR_MAP = {"conventional": "#7C8F3E", "organic": "#B4432E"}  # --flesh / --bruise
 
 
+# Every theme-dependent color a figure carries, per theme. The chart
+# callbacks build light figures; APPLY_CHART_STYLE swaps these in
+# client-side (the dict reaches it through the chart-themes store).
+CHART_THEMES: dict[str, dict[str, Any]] = {
+    "light": {
+        "background": CHART_BG,
+        "grid": CHART_GRIDCOLOR,
+        "text": CHART_TEXT_COLOR,
+        "legend": {"bgcolor": "rgba(255, 255, 255, 0.8)", "bordercolor": "gray"},
+    },
+    "dark": {
+        "background": CHART_BG_DARK,
+        "grid": CHART_GRIDCOLOR_DARK,
+        "text": CHART_TEXT_COLOR_DARK,
+        "legend": {"bgcolor": "rgba(36, 28, 19, 0.85)", "bordercolor": "#6B5A3E"},
+    },
+}
+
+
 def _chart_chrome(theme: str) -> tuple[str, str, str]:
     """(plot/paper background, gridline color, text color) for `theme`."""
-    if theme == "dark":
-        return CHART_BG_DARK, CHART_GRIDCOLOR_DARK, CHART_TEXT_COLOR_DARK
-    return CHART_BG, CHART_GRIDCOLOR, CHART_TEXT_COLOR
+    chrome = CHART_THEMES.get(theme, CHART_THEMES["light"])
+    return chrome["background"], chrome["grid"], chrome["text"]
 
 
 def _chart_legend_style(theme: str) -> dict[str, str]:
-    if theme == "dark":
-        return {"bgcolor": "rgba(36, 28, 19, 0.85)", "bordercolor": "#6B5A3E"}
-    return {"bgcolor": "rgba(255, 255, 255, 0.8)", "bordercolor": "gray"}
+    legend: dict[str, str] = CHART_THEMES.get(theme, CHART_THEMES["light"])["legend"]
+    return dict(legend)
+
+
+def localize_figure(figure: dict[str, Any], lang: str) -> dict[str, Any]:
+    """Render, in place, every LocalizedText in `figure` — in its layout or
+    traces, nested in objects or lists of objects — in `lang`, and record
+    each one's parts by dotted path ("layout.title.text", "data.2.name")
+    under layout.meta.i18n. From those, translate_figure here and
+    APPLY_CHART_STYLE in the browser can relabel the figure in another
+    language without rebuilding it. Returns `figure`."""
+    texts: dict[str, list[translations.TextPart]] = {}
+
+    def walk(node: dict[str, Any] | list[Any], path: str) -> None:
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            child = f"{path}.{key}" if path else str(key)
+            if isinstance(value, translations.LocalizedText):
+                node[key] = value.render(lang)  # type: ignore[index]
+                texts[child] = list(value.parts)
+            elif isinstance(value, dict) or (
+                # Lists of objects (traces, annotations) or of texts (box
+                # positions), not data arrays.
+                isinstance(value, list)
+                and value
+                and isinstance(value[0], dict | translations.LocalizedText)
+            ):
+                walk(value, child)
+
+    walk(figure, "")
+    figure.setdefault("layout", {}).setdefault("meta", {})["i18n"] = texts
+    return figure
+
+
+def translate_figure(figure: dict[str, Any], lang: str) -> dict[str, Any]:
+    """A copy of a localize_figure'd `figure` with its text rendered in
+    `lang`. Only the objects along each text's path are copied; the trace
+    arrays are shared with `figure`, which is left as it was."""
+    texts = figure.get("layout", {}).get("meta", {}).get("i18n", {})
+    for path, parts in texts.items():
+        text = translations.LocalizedText(tuple(_text_part(part) for part in parts))
+        figure = _with_value(figure, path.split("."), text.render(lang))
+    return figure
+
+
+def _text_part(part: Any) -> translations.TextPart:
+    # Parts that went through JSON come back as [table, key] lists.
+    return part if isinstance(part, str) else (part[0], part[1])
+
+
+def _with_value(node: Any, keys: list[str], value: str) -> Any:
+    """A copy of `node` with `value` at `keys`, sharing everything else."""
+    if isinstance(node, list):
+        copy: Any = list(node)
+        key: Any = int(keys[0])
+    else:
+        copy, key = dict(node), keys[0]
+    copy[key] = value if len(keys) == 1 else _with_value(node[key], keys[1:], value)
+    return copy
 
 
 # Plotly's default modebar has zoom/pan/select buttons that are inert on
@@ -256,7 +783,7 @@ def label_with_tooltip(text: str, tooltip_text: str) -> TooltipChildren:
 def build_type_options(lang: str) -> DropdownOptions:
     return [
         {"label": translations.type_label(avocado_type, lang), "value": avocado_type}
-        for avocado_type in avocado_types
+        for avocado_type in current_dataset().avocado_types
     ]
 
 
@@ -302,6 +829,29 @@ app.title = "Avocado Analytics"
 server = app.server  # This is needed for Railway deployment
 
 
+def cache_stats() -> dict[str, Any]:
+    """Counters of the shared caches, served at /cache-stats: hits and
+    misses show that the callbacks of one interaction share their work, and
+    each chart's `saved_seconds` the figure-building time its hits saved."""
+    return {
+        "filter": _stats_dict(filter_cache.stats()),
+        "figures": {
+            chart: _stats_dict(cache.stats()) for chart, cache in figure_caches.items()
+        },
+        "summary": _stats_dict(summary_cache.stats()),
+        "sketch": _stats_dict(sketch_cache.stats()),
+        "date_labels": _stats_dict(date_label_cache.stats()),
+        "anomaly": _stats_dict(anomaly_cache.stats()),
+    }
+
+
+def _stats_dict(stats: CacheStats) -> dict[str, Any]:
+    return {**asdict(stats), "hit_rate": stats.hit_rate}
+
+
+server.add_url_rule("/cache-stats", view_func=cache_stats)
+
+
 def init_sentry() -> None:
     """Initialize Sentry from SENTRY_DSN. Callbacks catch their own
     exceptions (see each `except` block below), so they never reach Flask
@@ -340,9 +890,10 @@ THEME_TOGGLE_OPTIONS: list[Option] = [
     {"label": "🌙", "value": "dark"},
 ]
 
-REGION_FILTER_OPTIONS: DropdownOptions = [
-    {"label": region, "value": region} for region in regions
-]
+
+def build_region_options(dataset: Dataset) -> DropdownOptions:
+    return [{"label": region, "value": region} for region in dataset.regions]
+
 
 # Shareable-URL state. V1 scope: top filter bar (region/type/date-range).
 # V2 scope: scatter axes + box-plot column/group-by. See
@@ -353,8 +904,6 @@ DEFAULT_URL_X_AXIS = "AveragePrice"
 DEFAULT_URL_Y_AXIS = "Total Volume"
 DEFAULT_URL_BOX_PLOT_COLUMN = "AveragePrice"
 DEFAULT_URL_BOX_PLOT_GROUPBY = "type"
-DATA_MIN_DATE = data["Date"].min().date()
-DATA_MAX_DATE = data["Date"].max().date()
 URL_STATE_PARAM_ORDER = (
     "region",
     "type",
@@ -396,14 +945,14 @@ def encode_filters_to_query(
     return "?" + urlencode({key: params[key] for key in URL_STATE_PARAM_ORDER})
 
 
-def _parse_date_param(value: str | None, default: date) -> str:
+def _parse_date_param(value: str | None, default: date, dataset: Dataset) -> str:
     if value is None:
         return default.isoformat()
     try:
         parsed_date = pd.Timestamp(value).date()
     except (ValueError, TypeError):
         return default.isoformat()
-    if not (DATA_MIN_DATE <= parsed_date <= DATA_MAX_DATE):
+    if not (dataset.min_date <= parsed_date <= dataset.max_date):
         return default.isoformat()
     return parsed_date.isoformat()
 
@@ -425,10 +974,11 @@ def decode_query_to_filters(search: str | None) -> dict[str, Any]:
     app already supports via the empty-state figure — is distinguishable
     from `region` being absent entirely, which means "use the default"."""
     parsed = parse_qs((search or "").lstrip("?"), keep_blank_values=True)
+    dataset = current_dataset()
 
     if "region" in parsed:
         raw_regions = [r for r in parsed["region"][0].split(",") if r]
-        valid_regions = [r for r in raw_regions if r in regions]
+        valid_regions = [r for r in raw_regions if r in dataset.regions]
         if not raw_regions:
             resolved_regions = []
         elif not valid_regions:
@@ -439,14 +989,18 @@ def decode_query_to_filters(search: str | None) -> dict[str, Any]:
         resolved_regions = list(DEFAULT_URL_REGIONS)
 
     avocado_type = parsed.get("type", [DEFAULT_URL_TYPE])[0]
-    if avocado_type not in avocado_types:
+    if avocado_type not in dataset.avocado_types:
         avocado_type = DEFAULT_URL_TYPE
 
     return {
         "region": resolved_regions,
         "type": avocado_type,
-        "start": _parse_date_param(parsed.get("start", [None])[0], DATA_MIN_DATE),
-        "end": _parse_date_param(parsed.get("end", [None])[0], DATA_MAX_DATE),
+        "start": _parse_date_param(
+            parsed.get("start", [None])[0], dataset.min_date, dataset
+        ),
+        "end": _parse_date_param(
+            parsed.get("end", [None])[0], dataset.max_date, dataset
+        ),
         "x": _parse_choice_param(
             parsed.get("x", [None])[0], numeric_columns, DEFAULT_URL_X_AXIS
         ),
@@ -471,6 +1025,8 @@ app.layout = html.Div(
         dcc.Location(id="url", refresh=False),
         dcc.Store(id="theme-store", storage_type="local"),
         dcc.Store(id="theme-resolved"),
+        dcc.Store(id="chart-themes", data=CHART_THEMES),
+        dcc.Store(id="string-tables", data=translations.STRING_TABLES),
         html.Div(
             children=[
                 dcc.RadioItems(
@@ -531,7 +1087,7 @@ app.layout = html.Div(
                         ),
                         dcc.Dropdown(
                             id="region-filter",
-                            options=REGION_FILTER_OPTIONS,
+                            options=build_region_options(_dataset),
                             value=["Albany"],
                             multi=True,
                             clearable=True,
@@ -579,10 +1135,10 @@ app.layout = html.Div(
                         ),
                         dcc.DatePickerRange(
                             id="date-range",
-                            min_date_allowed=data["Date"].min().date(),
-                            max_date_allowed=data["Date"].max().date(),
-                            start_date=data["Date"].min().date(),
-                            end_date=data["Date"].max().date(),
+                            min_date_allowed=_dataset.min_date.isoformat(),
+                            max_date_allowed=_dataset.max_date.isoformat(),
+                            start_date=_dataset.min_date.isoformat(),
+                            end_date=_dataset.max_date.isoformat(),
                         ),
                     ]
                 ),
@@ -605,29 +1161,81 @@ app.layout = html.Div(
             id="summary-panel",
             className="summary-panel",
         ),
+        html.Div(
+            children=[
+                html.Div(
+                    id="anomaly-threshold-label",
+                    children=label_with_tooltip(
+                        translations.t("filters.anomaly_threshold.label", INITIAL_LANG),
+                        translations.t(
+                            "filters.anomaly_threshold.tooltip", INITIAL_LANG
+                        ),
+                    ),
+                    className="menu-title",
+                ),
+                dcc.Slider(
+                    id="anomaly-threshold",
+                    min=ANOMALY_THRESHOLD_MIN,
+                    max=ANOMALY_THRESHOLD_MAX,
+                    step=0.1,
+                    value=ANOMALY_STD_THRESHOLD,
+                    marks={
+                        value: f"{value:g}σ"
+                        for value in np.arange(
+                            ANOMALY_THRESHOLD_MIN, ANOMALY_THRESHOLD_MAX + 0.5, 0.5
+                        ).tolist()
+                    },
+                ),
+            ],
+            className="anomaly-threshold",
+        ),
         dcc.Loading(
             id="charts-loading",
             type="circle",
             children=html.Div(
                 children=[
                     html.Div(
-                        children=dcc.Graph(
-                            id="price-chart",
-                            config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
-                        ),
+                        children=[
+                            dcc.Store(id="price-chart-base"),
+                            dcc.Graph(
+                                id="price-chart",
+                                config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
+                            ),
+                        ],
                         className="card",
                     ),
                     html.Div(
-                        children=dcc.Graph(
-                            id="volume-chart",
-                            config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
-                        ),
+                        children=[
+                            dcc.Store(id="volume-chart-base"),
+                            dcc.Graph(
+                                id="volume-chart",
+                                config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
+                            ),
+                        ],
                         className="card",
                     ),
                 ],
                 className="wrapper",
             ),
         ),
+        html.Div(
+            children=[
+                html.H2(
+                    id="anomaly-feed-title",
+                    children=translations.t(
+                        "sections.anomaly_feed_title", INITIAL_LANG
+                    ),
+                    style={
+                        "text-align": "center",
+                        "margin": "40px 0 20px 0",
+                        "color": "var(--heading-accent)",
+                        "font-family": "Fraunces, serif",
+                        "font-size": "28px",
+                    },
+                ),
+                html.Div(id="anomaly-feed", className="anomaly-feed"),
+            ]
+        ),
         html.Div(
             children=[
                 html.H2(
@@ -702,10 +1310,13 @@ app.layout = html.Div(
                     id="scatter-loading",
                     type="circle",
                     children=html.Div(
-                        children=dcc.Graph(
-                            id="scatter-chart",
-                            config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
-                        ),
+                        children=[
+                            dcc.Store(id="scatter-chart-base"),
+                            dcc.Graph(
+                                id="scatter-chart",
+                                config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
+                            ),
+                        ],
                         className="card",
                         style={"margin": "20px auto", "max-width": "1000px"},
                     ),
@@ -790,10 +1401,13 @@ app.layout = html.Div(
                     id="box-plot-loading",
                     type="circle",
                     children=html.Div(
-                        children=dcc.Graph(
-                            id="box-plot-chart",
-                            config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
-                        ),
+                        children=[
+                            dcc.Store(id="box-plot-chart-base"),
+                            dcc.Graph(
+                                id="box-plot-chart",
+                                config=DOWNLOAD_ONLY_MODEBAR_CONFIG,
+                            ),
+                        ],
                         className="card",
                         style={"margin": "20px auto", "max-width": "1000px"},
                     ),
@@ -856,20 +1470,56 @@ def create_summary_panel(
     start_date: str,
     end_date: str,
     lang: str = "en",
+    dataset: Dataset | None = None,
 ) -> html.Div:
-    """Build the summary panel's KPI cards for the current filter selection."""
-    if filtered_data.empty:
+    """Build the summary panel's KPI cards for the current filter selection.
+    The period-over-period and region-ranking cards read `dataset` (default:
+    the live one) beyond `filtered_data`."""
+    stats = None if filtered_data.empty else calculate_summary_stats(filtered_data)
+    kpis = summary_kpis(stats, regions, avocado_type, start_date, end_date, dataset)
+    return render_summary_panel(kpis, lang)
+
+
+@dataclass(frozen=True)
+class SummaryKpis:
+    """The numbers behind the summary panel, independent of the language
+    they're displayed in (see summary_cache)."""
+
+    stats: dict[str, Any]
+    price_change: float | None
+    extremes: dict[str, Any] | None
+
+
+def summary_kpis(
+    stats: dict[str, Any] | None,
+    regions: list[str],
+    avocado_type: str,
+    start_date: str,
+    end_date: str,
+    dataset: Dataset | None = None,
+) -> SummaryKpis | None:
+    """The summary panel's numbers around the selection's `stats` (see
+    utils.calculate_summary_stats), or None when it matched no rows."""
+    if dataset is None:
+        dataset = current_dataset()
+    if stats is None:
+        return None
+    return SummaryKpis(
+        stats=stats,
+        price_change=dataset.price_change(regions, avocado_type, start_date, end_date),
+        extremes=dataset.region_extremes(avocado_type, start_date, end_date),
+    )
+
+
+def render_summary_panel(kpis: SummaryKpis | None, lang: str = "en") -> html.Div:
+    """The summary panel's KPI cards for `kpis`, labeled in `lang`."""
+    if kpis is None:
         return html.Div(
             translations.t("empty.no_data_summary", lang),
             className="summary-empty",
         )
 
-    stats = calculate_summary_stats(filtered_data)
-    price_change = calculate_price_change(
-        data, regions, avocado_type, start_date, end_date
-    )
-    extremes = find_region_extremes(data, avocado_type, start_date, end_date)
-
+    stats, price_change, extremes = kpis.stats, kpis.price_change, kpis.extremes
     cards = [
         summary_stat_card(
             translations.column_label("AveragePrice", lang),
@@ -909,21 +1559,77 @@ def create_summary_panel(
     return html.Div(cards, className="summary-stats")
 
 
+RowGroups = list[tuple[Any, pd.DataFrame]]
+
+
+def _split_rows(
+    frame: pd.DataFrame,
+    column: str,
+    columns: list[str],
+    first_seen: bool = False,
+) -> RowGroups:
+    """`frame`'s `columns` split into one frame per value of `column`, each
+    holding that value's rows in frame order — what `frame[frame[column] ==
+    value]` selects, but partitioned in one pass (a stable sort by group,
+    then a slice per group) rather than with a boolean scan per value.
+    Groups come in value order, or with `first_seen` in order of first
+    appearance, as `unique()` lists them. Rows missing `column` are left
+    out."""
+    codes, values = pd.factorize(frame[column], sort=not first_seen)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+    rows = frame[list(dict.fromkeys(columns))].take(order)
+    return [
+        (value, rows.iloc[start:stop])
+        for value, start, stop in zip(values, bounds[:-1], bounds[1:])
+    ]
+
+
+# Price and volume lines longer than a chart is wide are downsampled by LTTB
+# (see _downsample) to about one point per pixel of AVOCADO_CHART_WIDTH_PX;
+# AVOCADO_LINE_DOWNSAMPLE=false keeps every point.
+LINE_DOWNSAMPLE = os.environ.get("AVOCADO_LINE_DOWNSAMPLE", "true").lower() == "true"
+CHART_WIDTH_PX = int(os.environ.get("AVOCADO_CHART_WIDTH_PX", "1200"))
+
+
+def _downsample(
+    regions: RowGroups,
+    y_column: str,
+    downsample: bool | None,
+    keep: list[pd.Series] | None = None,
+) -> RowGroups:
+    """`regions` with each region's rows cut to the ones LTTB keeps to
+    draw its `y_column` line in CHART_WIDTH_PX points, every row flagged in
+    the matching `keep` mask among them (see lttb_indices). `downsample`
+    defaults to LINE_DOWNSAMPLE; without it, or within the budget, the rows
+    are returned as they are."""
+    if downsample is None:
+        downsample = LINE_DOWNSAMPLE
+    if not downsample or all(len(rows) <= CHART_WIDTH_PX for _, rows in regions):
+        return regions
+    picked = lttb_indices(
+        [rows["Date"].to_numpy() for _, rows in regions],
+        [rows[y_column].to_numpy(dtype=float, na_value=np.nan) for _, rows in regions],
+        max(CHART_WIDTH_PX, 3),
+        None if keep is None else [mask.to_numpy() for mask in keep],
+    )
+    return [
+        (region, rows if len(positions) == len(rows) else rows.iloc[positions])
+        for (region, rows), positions in zip(regions, picked)
+    ]
+
+
 def _region_traces(
-    filtered_data: pd.DataFrame,
+    regions: RowGroups,
     y_column: str,
-    hover_label: str,
+    hover_label: translations.TextPart,
     hover_format: str,
-    lang: str = "en",
 ) -> list[dict[str, Any]]:
-    """One line+marker trace per region present in `filtered_data`, colored
-    in a fixed palette order by the current selection (see
+    """One line+marker trace per region in `regions` (see _split_rows),
+    colored in a fixed palette order by the current selection (see
     REGION_COLOR_PALETTE for why this isn't a fixed per-region color)."""
     traces: list[dict[str, Any]] = []
-    selected_regions = sorted(filtered_data["region"].unique())
-    date_label = translations.t("common.date", lang)
-    for i, region in enumerate(selected_regions):
-        region_data = filtered_data[filtered_data["region"] == region]
+    for i, (region, region_data) in enumerate(regions):
         color = REGION_COLOR_PALETTE[i % len(REGION_COLOR_PALETTE)]
         traces.append(
             {
@@ -932,9 +1638,12 @@ def _region_traces(
                 "type": "scatter",
                 "mode": "lines+markers",
                 "name": region,
-                "hovertemplate": (
-                    f"<b>%{{fullData.name}}</b><br>{date_label}: %{{x}}<br>"
-                    f"{hover_label}: {hover_format}<extra></extra>"
+                "hovertemplate": translations.localized(
+                    "<b>%{fullData.name}</b><br>",
+                    ("t", "common.date"),
+                    ": %{x}<br>",
+                    hover_label,
+                    f": {hover_format}<extra></extra>",
                 ),
                 "line": {"width": 3, "color": color},
                 "marker": {"size": 4, "color": color},
@@ -943,26 +1652,55 @@ def _region_traces(
     return traces
 
 
-ANOMALY_STD_THRESHOLD = 2.0
 ANOMALY_MARKER_COLOR = "#B4432E"  # --bruise — fixed, not per-region
 
 
+def _anomaly_masks(
+    regions: RowGroups, threshold: float = ANOMALY_STD_THRESHOLD
+) -> list[pd.Series]:
+    """Each region's points scoring above `threshold`, from the `zscore`
+    column create_price_chart gives its rows."""
+    return [
+        flag_anomalies(region_data["zscore"], threshold) for _, region_data in regions
+    ]
+
+
+def _anomaly_style(region: Any) -> dict[str, Any]:
+    """Everything but the points of `region`'s anomaly-marker trace."""
+    anomaly_label = ("t", "charts.price.anomaly_label")
+    return {
+        "type": "scatter",
+        "mode": "markers",
+        "name": translations.localized(anomaly_label),
+        "legendgroup": "anomaly",
+        "hovertemplate": translations.localized(
+            "<b>",
+            anomaly_label,
+            f"</b> ({region})<br>",
+            ("t", "common.date"),
+            ": %{x}<br>",
+            ("t", "common.price"),
+            ": $%{y:.2f}<extra></extra>",
+        ),
+        "marker": {
+            "size": 12,
+            "symbol": "x",
+            "color": ANOMALY_MARKER_COLOR,
+            "line": {"width": 2, "color": ANOMALY_MARKER_COLOR},
+        },
+    }
+
+
 def _anomaly_traces(
-    filtered_data: pd.DataFrame, lang: str = "en"
+    regions: RowGroups, anomaly_masks: list[pd.Series]
 ) -> list[dict[str, Any]]:
     """One marker-only trace per region with ≥1 anomalous price point
-    (issue #39). A single fixed color/symbol and one shared "Anomaly"
-    legend entry (via legendgroup) — not per-region — to avoid legend
-    clutter when multiple regions are selected."""
+    (issue #39; `anomaly_masks` from _anomaly_masks). A single fixed
+    color/symbol and one shared "Anomaly" legend entry (via legendgroup) —
+    not per-region — to avoid legend clutter when multiple regions are
+    selected."""
     traces: list[dict[str, Any]] = []
-    anomaly_label = translations.t("charts.price.anomaly_label", lang)
-    date_label = translations.t("common.date", lang)
-    price_label = translations.t("common.price", lang)
-    for region in sorted(filtered_data["region"].unique()):
-        region_data = filtered_data[filtered_data["region"] == region]
-        anomaly_mask = detect_price_anomalies(
-            region_data["AveragePrice"], ANOMALY_STD_THRESHOLD
-        )
+    for (region, region_data), anomaly_mask in zip(regions, anomaly_masks):
         if not anomaly_mask.any():
             continue
         anomaly_points = region_data[anomaly_mask]
@@ -970,59 +1708,83 @@ def _anomaly_traces(
             {
                 "x": anomaly_points["Date"],
                 "y": anomaly_points["AveragePrice"],
-                "type": "scatter",
-                "mode": "markers",
-                "name": anomaly_label,
-                "legendgroup": "anomaly",
+                **_anomaly_style(region),
                 "showlegend": len(traces) == 0,
-                "hovertemplate": (
-                    f"<b>{anomaly_label}</b> ({region})<br>"
-                    f"{date_label}: %{{x}}<br>"
-                    f"{price_label}: $%{{y:.2f}}<extra></extra>"
-                ),
-                "marker": {
-                    "size": 12,
-                    "symbol": "x",
-                    "color": ANOMALY_MARKER_COLOR,
-                    "line": {"width": 2, "color": ANOMALY_MARKER_COLOR},
-                },
             }
         )
     return traces
 
 
+def _packed_floats(values: pd.Series) -> dict[str, str]:
+    """`values` as little-endian float64 bytes in base64 — in the shape of
+    Plotly's typed-array spec — for MASK_ANOMALIES to read back exactly,
+    NaN included, in well under the size of the JSON numbers."""
+    raw = values.to_numpy(dtype="<f8", na_value=np.nan).tobytes()
+    return {"dtype": "f8", "bdata": base64.b64encode(raw).decode("ascii")}
+
+
 def create_price_chart(
-    filtered_data: pd.DataFrame, lang: str = "en", theme: str = "light"
+    filtered_data: pd.DataFrame,
+    lang: str = "en",
+    theme: str = "light",
+    downsample: bool | None = None,
+    zscores: pd.Series | None = None,
 ) -> dict[str, Any]:
     """Create the price chart, one line per region in `filtered_data`,
     plus anomaly markers (see _anomaly_traces) for any region with a
     price point beyond ANOMALY_STD_THRESHOLD standard deviations from
-    its own mean over the selected range."""
-    price_label = translations.t("common.price", lang)
-    traces = _region_traces(
-        filtered_data, "AveragePrice", price_label, "$%{y:.2f}", lang
+    its own mean over the selected range — the initial marks, which the
+    anomaly-threshold slider redraws in the browser from the z-scores each
+    line carries (see MASK_ANOMALIES). `zscores` are those deviations,
+    one per row of `filtered_data`; by default each region's are computed
+    here, in one grouped pass. With `downsample` (see
+    _downsample) long lines are thinned, never dropping an anomaly."""
+    if zscores is None:
+        zscores = price_zscores(filtered_data, keys=("region",))
+    scored = filtered_data[["Date", "region", "AveragePrice"]].assign(
+        zscore=zscores.to_numpy()
     )
-    traces += _anomaly_traces(filtered_data, lang)
+    regions = _split_rows(scored, "region", ["Date", "AveragePrice", "zscore"])
+    # Downsampling keeps every point the slider can flag, reserving their
+    # slots out of the line's budget, so any threshold marks the same
+    # points on the thinned lines as on the full ones.
+    lines = _downsample(
+        regions,
+        "AveragePrice",
+        downsample,
+        keep=_anomaly_masks(regions, ANOMALY_THRESHOLD_MIN),
+    )
+    traces = _region_traces(lines, "AveragePrice", ("t", "common.price"), "$%{y:.2f}")
+    # Each line carries its points' z-scores and its markers' style, for
+    # MASK_ANOMALIES to re-mark at the slider's threshold.
+    for trace, (region, rows) in zip(traces, lines):
+        trace["meta"] = {
+            "anomaly": {
+                "zscores": _packed_floats(rows["zscore"]),
+                "trace": _anomaly_style(region),
+            }
+        }
+    traces += _anomaly_traces(regions, _anomaly_masks(regions))
     chart_bg, gridcolor, text_color = _chart_chrome(theme)
-    return {
+    figure: dict[str, Any] = {
         "data": traces,
         "layout": {
             "title": {
-                "text": translations.t("charts.price.title", lang),
+                "text": translations.localized(("t", "charts.price.title")),
                 "x": 0.05,
                 "xanchor": "left",
                 "font": {"size": 20},
             },
             "xaxis": {
                 "fixedrange": True,
-                "title": translations.t("common.date", lang),
+                "title": translations.localized(("t", "common.date")),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
             "yaxis": {
                 "tickprefix": "$",
                 "fixedrange": True,
-                "title": translations.t("charts.price.yaxis", lang),
+                "title": translations.localized(("t", "charts.price.yaxis")),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
@@ -1038,35 +1800,44 @@ def create_price_chart(
             },
         },
     }
+    return localize_figure(figure, lang)
 
 
 def create_volume_chart(
-    filtered_data: pd.DataFrame, lang: str = "en", theme: str = "light"
+    filtered_data: pd.DataFrame,
+    lang: str = "en",
+    theme: str = "light",
+    downsample: bool | None = None,
 ) -> dict[str, Any]:
-    """Create the volume chart, one line per region in `filtered_data`."""
-    volume_label = translations.t("common.volume", lang)
+    """Create the volume chart, one line per region in `filtered_data`,
+    long lines thinned with `downsample` (see _downsample)."""
+    volume_label = ("t", "common.volume")
+    regions = _split_rows(filtered_data, "region", ["Date", "Total Volume"])
     traces = _region_traces(
-        filtered_data, "Total Volume", volume_label, "%{y:,.0f}", lang
+        _downsample(regions, "Total Volume", downsample),
+        "Total Volume",
+        volume_label,
+        "%{y:,.0f}",
     )
     chart_bg, gridcolor, text_color = _chart_chrome(theme)
-    return {
+    figure: dict[str, Any] = {
         "data": traces,
         "layout": {
             "title": {
-                "text": translations.t("charts.volume.title", lang),
+                "text": translations.localized(("t", "charts.volume.title")),
                 "x": 0.05,
                 "xanchor": "left",
                 "font": {"size": 20},
             },
             "xaxis": {
                 "fixedrange": True,
-                "title": translations.t("common.date", lang),
+                "title": translations.localized(("t", "common.date")),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
             "yaxis": {
                 "fixedrange": True,
-                "title": volume_label,
+                "title": translations.localized(volume_label),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
@@ -1082,30 +1853,129 @@ def create_volume_chart(
             },
         },
     }
+    return localize_figure(figure, lang)
+
+
+# Box plots send each box's statistics and outliers (see _box_summary)
+# rather than every point; AVOCADO_BOX_PLOT_SUMMARY=false sends the points.
+BOX_PLOT_SUMMARY = os.environ.get("AVOCADO_BOX_PLOT_SUMMARY", "true").lower() == "true"
+# With AVOCADO_BOX_PLOT_SKETCH=true those statistics come from merging the
+# selection's quantile sketches (see sketch_index) instead of its rows,
+# on the backends holding their frame in memory.
+BOX_PLOT_SKETCH = os.environ.get("AVOCADO_BOX_PLOT_SKETCH", "false").lower() == "true"
+
+BoxValues = pd.Series | QuantileSketch
+
+
+def _box_summary(boxes: list[tuple[Any, BoxValues]]) -> dict[str, Any]:
+    """Box-trace fields drawing one box per (position, values) in `boxes`
+    from precomputed statistics, the way Plotly would draw it from all the
+    values: quartiles by its default "linear" method (Hazen's, in numpy's
+    terms), fences at the outermost values within 1.5 IQR of the quartiles,
+    and the mean. Only the values beyond the fences are sent, as each box's
+    sample points, so `boxpoints="outliers"` shows the same points. Values
+    given as a QuantileSketch get its approximation of each (see
+    QuantileSketch.box)."""
+    fields: dict[str, list[Any]] = {
+        "x": [],
+        "q1": [],
+        "median": [],
+        "q3": [],
+        "lowerfence": [],
+        "upperfence": [],
+        "mean": [],
+        "y": [],
+    }
+    for position, values in boxes:
+        stats: dict[str, Any] | None
+        if isinstance(values, QuantileSketch):
+            stats = values.box() if values.count else None
+        else:
+            stats = _exact_box(np.sort(values.dropna().to_numpy(dtype=float)))
+        if stats is None:
+            continue
+        fields["x"].append(
+            position.tolist() if isinstance(position, np.generic) else position
+        )
+        fields["y"].append(stats.pop("outliers"))
+        for field, value in stats.items():
+            fields[field].append(value)
+    return fields
+
+
+def _exact_box(points: np.ndarray[Any, Any]) -> dict[str, Any] | None:
+    """_box_summary's statistics of the sorted `points` (None if empty)."""
+    if not len(points):
+        return None
+    q1, median, q3 = np.quantile(points, [0.25, 0.5, 0.75], method="hazen")
+    low = np.searchsorted(points, q1 - 1.5 * (q3 - q1), side="left")
+    high = np.searchsorted(points, q3 + 1.5 * (q3 - q1), side="right") - 1
+    lowerfence = min(q1, points[min(low, len(points) - 1)])
+    upperfence = max(q3, points[max(high, 0)])
+    return {
+        "q1": q1.tolist(),
+        "median": median.tolist(),
+        "q3": q3.tolist(),
+        "lowerfence": lowerfence.tolist(),
+        "upperfence": upperfence.tolist(),
+        "mean": points.mean().tolist(),
+        "outliers": points[(points < lowerfence) | (points > upperfence)].tolist(),
+    }
+
+
+def _box_groups(
+    source: "pd.DataFrame | SketchSelection",
+    column: str,
+    by: str,
+    first_seen: bool = False,
+) -> list[tuple[Any, BoxValues]]:
+    """`column`'s values per `by` group of `source`: rows split as by
+    _split_rows, or a selection's merged sketches (in key order)."""
+    if isinstance(source, SketchSelection):
+        return list(source.split(column, by))
+    return [
+        (key, rows[column])
+        for key, rows in _split_rows(source, by, [column], first_seen=first_seen)
+    ]
 
 
 def create_box_plot(
-    filtered_data: pd.DataFrame,
+    filtered_data: pd.DataFrame | SketchSelection,
     column: str,
     group_by: str,
     lang: str = "en",
     theme: str = "light",
+    summary: bool | None = None,
 ) -> dict[str, Any]:
-    """Create a box plot for the selected column grouped by the specified variable."""
+    """Create a box plot for the selected column grouped by the specified
+    variable. With `summary` (default: BOX_PLOT_SUMMARY) the boxes are sent
+    as statistics and outliers rather than as every value; a SketchSelection
+    in place of the rows is always summarized, from its sketches."""
+    if summary is None:
+        summary = BOX_PLOT_SUMMARY
+    sketched = isinstance(filtered_data, SketchSelection)
+    summary = summary or sketched
     # Color mapping for different groups
     color_map = TYPE_COLOR_MAP
 
     traces: list[dict[str, Any]] = []
+    if isinstance(filtered_data, SketchSelection):
+        multiple_types = len(filtered_data.split(column, "type")) > 1
+    else:
+        multiple_types = len(filtered_data["type"].unique()) > 1
+
+    def one_box(name: Any, values: BoxValues) -> dict[str, Any]:
+        return _box_summary([(name, values)]) if summary else {"y": values}
 
     if group_by == "type":
         # Group by avocado type
-        for avocado_type in sorted(filtered_data["type"].unique()):
-            type_data = filtered_data[filtered_data["type"] == avocado_type]
+        for avocado_type, values in _box_groups(filtered_data, column, "type"):
+            name = translations.localized(("type", avocado_type))
             traces.append(
                 {
-                    "y": type_data[column],
+                    **one_box(name, values),
                     "type": "box",
-                    "name": translations.type_label(avocado_type, lang),
+                    "name": name,
                     "marker": {"color": color_map.get(avocado_type, "#17B897")},
                     "boxpoints": "outliers",
                     "jitter": 0.3,
@@ -1115,26 +1985,40 @@ def create_box_plot(
 
     elif group_by == "region":
         # For regions, use a single box plot with color by type if multiple types exist
-        if len(filtered_data["type"].unique()) > 1:
-            for avocado_type in sorted(filtered_data["type"].unique()):
-                type_data = filtered_data[filtered_data["type"] == avocado_type]
+        if multiple_types:
+            types: list[tuple[Any, pd.DataFrame | SketchSelection]]
+            if isinstance(filtered_data, SketchSelection):
+                types = [
+                    (kind, replace(filtered_data, avocado_types=(kind,)))
+                    for kind, _ in filtered_data.split(column, "type")
+                ]
+            else:
+                types = list(_split_rows(filtered_data, "type", [column, "region"]))
+            for avocado_type, type_data in types:
+                if summary or isinstance(type_data, SketchSelection):
+                    # A box per region, in the order the regions' points
+                    # would have put them on the category axis (sketches:
+                    # in region order).
+                    boxes = _box_summary(
+                        _box_groups(type_data, column, "region", first_seen=True)
+                    )
+                else:
+                    boxes = {"y": type_data[column], "x": type_data["region"]}
                 traces.append(
                     {
-                        "y": type_data[column],
-                        "x": type_data["region"],
+                        **boxes,
                         "type": "box",
-                        "name": translations.type_label(avocado_type, lang),
+                        "name": translations.localized(("type", avocado_type)),
                         "marker": {"color": color_map.get(avocado_type, "#17B897")},
                         "boxpoints": "outliers",
                     }
                 )
         else:
             # Single type, group by region
-            for region in sorted(filtered_data["region"].unique()):
-                region_data = filtered_data[filtered_data["region"] == region]
+            for region, values in _box_groups(filtered_data, column, "region"):
                 traces.append(
                     {
-                        "y": region_data[column],
+                        **one_box(region, values),
                         "type": "box",
                         "name": region,
                         "boxpoints": "outliers",
@@ -1145,11 +2029,10 @@ def create_box_plot(
 
     elif group_by == "year":
         # Group by year
-        for year in sorted(filtered_data["year"].unique()):
-            year_data = filtered_data[filtered_data["year"] == year]
+        for year, values in _box_groups(filtered_data, column, "year"):
             traces.append(
                 {
-                    "y": year_data[column],
+                    **one_box(str(year), values),
                     "type": "box",
                     "name": str(year),
                     "boxpoints": "outliers",
@@ -1159,22 +2042,25 @@ def create_box_plot(
             )
 
     # Determine layout based on group_by
-    if group_by == "region" and len(filtered_data["type"].unique()) > 1:
-        x_title = translations.t("common.region", lang)
+    if group_by == "region" and multiple_types:
+        x_title = translations.localized(("t", "common.region"))
         show_legend = True
     else:
-        x_title = translations.groupby_label(group_by, lang)
+        x_title = translations.localized(("groupby", group_by))
         show_legend = len(traces) > 1
 
+    column_label = ("column", column)
     chart_bg, gridcolor, text_color = _chart_chrome(theme)
-    return {
+    figure: dict[str, Any] = {
         "data": traces,
         "layout": {
             "title": {
-                "text": (
-                    f"{translations.column_label(column, lang)} "
-                    f"{translations.t('charts.box_plot.distribution_by', lang)} "
-                    f"{translations.groupby_label(group_by, lang)}"
+                "text": translations.localized(
+                    column_label,
+                    " ",
+                    ("t", "charts.box_plot.distribution_by"),
+                    " ",
+                    ("groupby", group_by),
                 ),
                 "x": 0.5,
                 "xanchor": "center",
@@ -1186,7 +2072,7 @@ def create_box_plot(
                 "gridcolor": gridcolor,
             },
             "yaxis": {
-                "title": translations.column_label(column, lang),
+                "title": translations.localized(column_label),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
@@ -1202,6 +2088,44 @@ def create_box_plot(
             },
         },
     }
+    return localize_figure(figure, lang)
+
+
+def _packed_customdata(
+    columns: list[tuple[pd.Series, list[Any]]],
+) -> dict[str, list[Any]]:
+    """A trace's `customdata` columns packed as (codes, labels) pairs — an
+    integer array per point and each distinct label once — which the
+    clientside APPLY_CHART_STYLE unpacks into the `customdata` rows
+    [labels[0][codes[0][i]], labels[1][codes[1][i]], ...] that
+    hovertemplates read. Repeated strings are most of a scatter payload."""
+    return {
+        "codes": [codes.to_numpy() for codes, _ in columns],
+        "labels": [labels for _, labels in columns],
+    }
+
+
+def _date_codes(dates: pd.Series, dataset: Dataset | None) -> tuple[Any, list[str]]:
+    """Each of `dates`' code into a table of its distinct labels: looked up
+    among `dataset`'s (see date_labels) where it has them, so no date is
+    formatted again, else factorized and formatted here."""
+    labels = None if dataset is None else date_labels(dataset)
+    known = None if dataset is None else dataset.dates
+    if labels is not None and known is not None:
+        days = dates.to_numpy().astype("datetime64[D]")
+        positions = np.searchsorted(known, days)
+        if (positions < len(known)).all() and (known[positions] == days).all():
+            used = np.flatnonzero(np.bincount(positions, minlength=len(known)))
+            lookup = np.zeros(len(known), dtype=np.intp)
+            lookup[used] = np.arange(len(used))
+            return lookup[positions], [labels[position] for position in used]
+    codes, distinct = pd.factorize(dates, use_na_sentinel=False)
+    return codes, pd.DatetimeIndex(distinct).strftime("%Y-%m-%d").tolist()
+
+
+# Scatter charts of more than AVOCADO_SCATTER_GL_POINTS points render with
+# WebGL ("scattergl"), which stays responsive where SVG markers bog down.
+SCATTER_GL_POINTS = int(os.environ.get("AVOCADO_SCATTER_GL_POINTS", "5000"))
 
 
 def create_scatter_chart(
@@ -1210,63 +2134,82 @@ def create_scatter_chart(
     y_col: str,
     lang: str = "en",
     theme: str = "light",
+    dataset: Dataset | None = None,
 ) -> dict[str, Any]:
-    """Create a scatter plot with selected columns."""
+    """Create a scatter plot with selected columns, in WebGL past
+    SCATTER_GL_POINTS points. The hover dates are labelled from `dataset`'s
+    own, formatted once per dataset (see date_labels), when given."""
     # Create color mapping for avocado types
     color_map = TYPE_COLOR_MAP
-    x_label = translations.column_label(x_col, lang)
-    y_label = translations.column_label(y_col, lang)
-    region_label = translations.t("common.region", lang)
-    date_label = translations.t("common.date", lang)
+    trace_type = "scattergl" if len(filtered_data) > SCATTER_GL_POINTS else "scatter"
+    x_label = ("column", x_col)
+    y_label = ("column", y_col)
+
+    # Each point's hover labels are sent as codes into tables of the
+    # distinct regions and dates (see _packed_customdata).
+    date_codes, point_dates = _date_codes(filtered_data["Date"], dataset)
+    region_codes, regions = pd.factorize(filtered_data["region"], use_na_sentinel=False)
+    points = filtered_data.assign(_region_code=region_codes, _date_code=date_codes)
+    types = _split_rows(
+        points, "type", [x_col, y_col, "_region_code", "_date_code"], first_seen=True
+    )
 
     traces: list[dict[str, Any]] = []
-    for avocado_type in filtered_data["type"].unique():
-        type_data = filtered_data[filtered_data["type"] == avocado_type]
+    for avocado_type, type_data in types:
         traces.append(
             {
                 "x": type_data[x_col],
                 "y": type_data[y_col],
                 "mode": "markers",
-                "type": "scatter",
-                "name": translations.type_label(avocado_type, lang),
+                "type": trace_type,
+                "name": translations.localized(("type", avocado_type)),
                 "marker": {
                     "size": 8,
                     "color": color_map.get(avocado_type, "#17B897"),
                     "opacity": 0.7,
                     "line": {"width": 1, "color": "white"},
                 },
-                "hovertemplate": (
-                    f"<b>%{{fullData.name}}</b><br>"
-                    f"{x_label}: %{{x}}<br>"
-                    f"{y_label}: %{{y}}<br>"
-                    f"{region_label}: %{{customdata[0]}}<br>"
-                    f"{date_label}: %{{customdata[1]}}<extra></extra>"
-                ),
-                "customdata": list(
-                    zip(type_data["region"], type_data["Date"].dt.strftime("%Y-%m-%d"))
+                "hovertemplate": translations.localized(
+                    "<b>%{fullData.name}</b><br>",
+                    x_label,
+                    ": %{x}<br>",
+                    y_label,
+                    ": %{y}<br>",
+                    ("t", "common.region"),
+                    ": %{customdata[0]}<br>",
+                    ("t", "common.date"),
+                    ": %{customdata[1]}<extra></extra>",
                 ),
+                "meta": {
+                    "customdata": _packed_customdata(
+                        [
+                            (type_data["_region_code"], list(regions)),
+                            (type_data["_date_code"], point_dates),
+                        ]
+                    )
+                },
             }
         )
 
     chart_bg, gridcolor, text_color = _chart_chrome(theme)
-    return {
+    figure: dict[str, Any] = {
         "data": traces,
         "layout": {
             "title": {
-                "text": (
-                    f"{x_label} {translations.t('charts.scatter.vs', lang)} {y_label}"
+                "text": translations.localized(
+                    x_label, " ", ("t", "charts.scatter.vs"), " ", y_label
                 ),
                 "x": 0.5,
                 "xanchor": "center",
                 "font": {"size": 22},
             },
             "xaxis": {
-                "title": x_label,
+                "title": translations.localized(x_label),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
             "yaxis": {
-                "title": y_label,
+                "title": translations.localized(y_label),
                 "showgrid": True,
                 "gridcolor": gridcolor,
             },
@@ -1282,6 +2225,7 @@ def create_scatter_chart(
             },
         },
     }
+    return localize_figure(figure, lang)
 
 
 @app.callback(
@@ -1304,6 +2248,8 @@ def create_scatter_chart(
     Output("box-plot-column", "options"),
     Output("box-plot-groupby-label", "children"),
     Output("box-plot-groupby", "options"),
+    Output("anomaly-feed-title", "children"),
+    Output("anomaly-threshold-label", "children"),
     Input("language-toggle", "value"),
 )
 def update_ui_language(
@@ -1328,6 +2274,8 @@ def update_ui_language(
     DropdownOptions,
     TooltipChildren,
     DropdownOptions,
+    str,
+    TooltipChildren,
 ]:
     """Retranslate every static, filter-independent piece of text/labels in
     the layout. Only `children`/`placeholder`/`options["label"|"title"]` are
@@ -1405,6 +2353,31 @@ def update_ui_language(
             translations.t("filters.box_plot_groupby.tooltip", lang),
         ),
         build_groupby_options(lang),
+        translations.t("sections.anomaly_feed_title", lang),
+        label_with_tooltip(
+            translations.t("filters.anomaly_threshold.label", lang),
+            translations.t("filters.anomaly_threshold.tooltip", lang),
+        ),
+    )
+
+
+@app.callback(
+    Output("region-filter", "options"),
+    Output("date-range", "min_date_allowed"),
+    Output("date-range", "max_date_allowed"),
+    Input("url", "pathname"),
+)
+def refresh_dataset_controls(
+    pathname: str | None,
+) -> tuple[DropdownOptions, str, str]:
+    """Fill the dataset-derived control props from the live snapshot on each
+    page load, so a browser opened after a hot reload sees the new regions
+    and date bounds rather than the ones baked into the static layout."""
+    dataset = current_dataset()
+    return (
+        build_region_options(dataset),
+        dataset.min_date.isoformat(),
+        dataset.max_date.isoformat(),
     )
 
 
@@ -1474,11 +2447,12 @@ def sync_url_and_filters(
             filters["groupby"],
         )
 
+    dataset = current_dataset()
     new_search = encode_filters_to_query(
         regions_value or [],
         avocado_type or DEFAULT_URL_TYPE,
-        start_date or DATA_MIN_DATE.isoformat(),
-        end_date or DATA_MAX_DATE.isoformat(),
+        start_date or dataset.min_date.isoformat(),
+        end_date or dataset.max_date.isoformat(),
         x_axis or DEFAULT_URL_X_AXIS,
         y_axis or DEFAULT_URL_Y_AXIS,
         box_plot_column or DEFAULT_URL_BOX_PLOT_COLUMN,
@@ -1503,9 +2477,9 @@ def sync_url_and_filters(
 # unset store re-checks the live OS preference on every load instead of
 # freezing the first-ever detected preference in as if it were explicit.
 # theme-resolved (memory-only, not persisted) always mirrors the current
-# effective theme regardless of how it was derived, and is what the
-# server-side chart callbacks below key off of — theme-store alone can't
-# serve that role since it deliberately stays empty pre-explicit-choice.
+# effective theme regardless of how it was derived, and is what the chart
+# restyle below keys off of — theme-store alone can't serve that role
+# since it deliberately stays empty pre-explicit-choice.
 # Dash ships no type stubs for clientside_callback (unlike app.callback).
 app.clientside_callback(  # type: ignore[no-untyped-call]
     """
@@ -1536,6 +2510,150 @@ app.clientside_callback(  # type: ignore[no-untyped-call]
     Input("theme-store", "data"),
 )
 
+# Chart theming and labels, also client-side: the chart callbacks write
+# light figures to each graph's "-base" store, and this recolors the figure
+# from the store's copy with the resolved theme's CHART_THEMES entry, and
+# re-renders its layout.meta.i18n texts (see localize_figure) in the
+# selected language from the string-tables store, on its way into the
+# graph. A theme or language toggle therefore only reruns this — no server
+# request, no re-filtering, no trace arrays resent — and a figure arriving
+# from the server is styled before it's drawn, whichever comes first.
+APPLY_CHART_STYLE = """
+function(figure, theme, lang, chartThemes, stringTables) {
+    if (!figure) {
+        return dash_clientside.no_update;
+    }
+    // Copies only the objects along `keys`, so the store's figure is left
+    // as it was and the trace arrays are shared rather than copied.
+    function withValue(node, keys, value) {
+        var copy = Array.isArray(node) ? node.slice() : Object.assign({}, node);
+        copy[keys[0]] = keys.length === 1
+            ? value
+            : withValue(node[keys[0]] || {}, keys.slice(1), value);
+        return copy;
+    }
+    var texts = ((figure.layout || {}).meta || {}).i18n || {};
+    Object.keys(texts).forEach(function(path) {
+        var text = texts[path].map(function(part) {
+            if (typeof part === "string") {
+                return part;
+            }
+            var table = (stringTables[part[0]] || {})[lang] || {};
+            return table[part[1]] !== undefined ? table[part[1]] : part[1];
+        }).join("");
+        figure = withValue(figure, path.split("."), text);
+    });
+
+    // Scatter hover labels arrive packed (see _packed_customdata).
+    figure = Object.assign({}, figure, {
+        data: (figure.data || []).map(function(trace) {
+            var packed = (trace.meta || {}).customdata;
+            if (!packed) {
+                return trace;
+            }
+            var count = packed.codes.length ? packed.codes[0].length : 0;
+            var customdata = new Array(count);
+            for (var i = 0; i < count; i++) {
+                customdata[i] = packed.codes.map(function(codes, column) {
+                    return packed.labels[column][codes[i]];
+                });
+            }
+            return Object.assign({}, trace, {customdata: customdata});
+        })
+    });
+
+    var chrome = chartThemes[theme] || chartThemes.light;
+    var layout = Object.assign({}, figure.layout, {
+        plot_bgcolor: chrome.background,
+        paper_bgcolor: chrome.background,
+        font: Object.assign({}, (figure.layout || {}).font, {color: chrome.text})
+    });
+    Object.keys(layout).forEach(function(key) {
+        if (/^[xy]axis[0-9]*$/.test(key)) {
+            layout[key] = Object.assign({}, layout[key], {gridcolor: chrome.grid});
+        }
+    });
+    if (layout.legend) {
+        layout.legend = Object.assign({}, layout.legend, chrome.legend);
+    }
+    return Object.assign({}, figure, {layout: layout});
+}
+"""
+# Redraws a styled price chart's anomaly markers at the slider's threshold
+# from the z-scores its lines carry (see create_price_chart), with
+# detect_price_anomalies' rule: strictly above the threshold, and never a
+# NaN score (a one-point or flat series). Marker traces follow the lines,
+# in line order, as the server builds them.
+MASK_ANOMALIES = """
+function(figure, threshold) {
+    if (!figure || !figure.data || threshold === null || threshold === undefined) {
+        return figure;
+    }
+    function unpack(packed) {
+        var raw = atob(packed.bdata);
+        var bytes = new Uint8Array(raw.length);
+        for (var i = 0; i < raw.length; i++) {
+            bytes[i] = raw.charCodeAt(i);
+        }
+        return new Float64Array(bytes.buffer);
+    }
+    var lines = figure.data.filter(function(trace) {
+        return trace.legendgroup !== "anomaly";
+    });
+    var markers = [];
+    lines.forEach(function(trace) {
+        var anomaly = (trace.meta || {}).anomaly;
+        if (!anomaly) {
+            return;
+        }
+        var zscores = unpack(anomaly.zscores);
+        var x = [];
+        var y = [];
+        for (var i = 0; i < zscores.length; i++) {
+            if (zscores[i] > threshold) {
+                x.push(trace.x[i]);
+                y.push(trace.y[i]);
+            }
+        }
+        if (x.length) {
+            markers.push(Object.assign({}, anomaly.trace, {
+                x: x, y: y, showlegend: markers.length === 0
+            }));
+        }
+    });
+    return Object.assign({}, figure, {data: lines.concat(markers)});
+}
+"""
+# The price chart is styled, then re-marked: the markers' text comes from
+# the relabeled styles its lines carry.
+APPLY_PRICE_CHART_STYLE = f"""
+function(figure, theme, lang, threshold, chartThemes, stringTables) {{
+    var styled = ({APPLY_CHART_STYLE.strip()})(
+        figure, theme, lang, chartThemes, stringTables
+    );
+    if (styled === dash_clientside.no_update) {{
+        return styled;
+    }}
+    return ({MASK_ANOMALIES.strip()})(styled, threshold);
+}}
+"""
+CHART_GRAPH_IDS = ("price-chart", "volume-chart", "scatter-chart", "box-plot-chart")
+for graph_id in CHART_GRAPH_IDS:
+    # Only the price chart reads the anomaly-threshold slider.
+    threshold = (
+        [Input("anomaly-threshold", "value")] if graph_id == "price-chart" else []
+    )
+    app.clientside_callback(  # type: ignore[no-untyped-call]
+        APPLY_PRICE_CHART_STYLE if threshold else APPLY_CHART_STYLE,
+        Output(graph_id, "figure"),
+        Input(f"{graph_id}-base", "data"),
+        Input("theme-resolved", "data"),
+        Input("language-toggle", "value"),
+        *threshold,
+        State("chart-themes", "data"),
+        State("string-tables", "data"),
+    )
+
 
 @app.callback(
     Output("summary-panel", "children"),
@@ -1558,10 +2676,29 @@ def update_summary_panel(
             return html.Div(
                 translations.t("empty.select_region", lang), className="summary-empty"
             )
-        filtered_data = filter_data(regions, avocado_type, start_date, end_date)
-        return create_summary_panel(
-            filtered_data, regions, avocado_type, start_date, end_date, lang
-        )
+        dataset = current_dataset()
+        spec = filter_spec(regions, [avocado_type], start_date, end_date, dataset)
+
+        def compute() -> tuple[Dataset, SummaryKpis | None]:
+            # Aggregated by the dataset (a snapshot's KpiIndex), without
+            # selecting the rows behind them. Every number comes from the
+            # spec alone — the price-change card compares against the period
+            # of the same length before its snapped range — so equivalent
+            # filter values share one entry.
+            selected = list(spec.regions or ())
+            start, end = spec.start_date.isoformat(), spec.end_date.isoformat()
+            stats = dataset.summary_stats(
+                selected,
+                None if spec.avocado_types is None else list(spec.avocado_types),
+                start,
+                end,
+            )
+            return dataset, summary_kpis(
+                stats, selected, avocado_type, start, end, dataset
+            )
+
+        _, kpis = summary_cache.get_or_compute((id(dataset), spec), compute)
+        return render_summary_panel(kpis, lang)
     except Exception as e:
         logger.error(f"Error in summary panel callback: {str(e)}", exc_info=True)
         report_callback_error(
@@ -1575,6 +2712,78 @@ def update_summary_panel(
         return html.Div(f"{error_prefix}: {str(e)}", className="summary-empty")
 
 
+# How many flagged points the anomaly feed lists.
+ANOMALY_FEED_LIMIT = int(os.environ.get("AVOCADO_ANOMALY_FEED_LIMIT", "10"))
+
+
+def render_anomaly_feed(points: pd.DataFrame, lang: str = "en") -> html.Div:
+    """The anomaly feed's table of `points` (see AnomalyScores.most_extreme),
+    labeled in `lang`."""
+    if points.empty:
+        return html.Div(
+            translations.t("anomaly_feed.empty", lang), className="summary-empty"
+        )
+    header = html.Tr(
+        [
+            html.Th(translations.t("common.region", lang)),
+            html.Th(translations.t("common.date", lang)),
+            html.Th(translations.t("common.price", lang)),
+            html.Th(translations.t("anomaly_feed.deviation", lang)),
+        ]
+    )
+    rows = [
+        html.Tr(
+            [
+                html.Td(str(region)),
+                html.Td(pd.Timestamp(day).strftime("%Y-%m-%d")),
+                html.Td(f"${price:.2f}"),
+                html.Td(f"{zscore:.1f}"),
+            ]
+        )
+        for region, day, price, zscore in zip(
+            points["region"], points["Date"], points["AveragePrice"], points["zscore"]
+        )
+    ]
+    return html.Div(
+        html.Table(
+            [html.Thead(header), html.Tbody(rows)], className="anomaly-feed-table"
+        )
+    )
+
+
+@app.callback(
+    Output("anomaly-feed", "children"),
+    Input("type-filter", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    Input("language-toggle", "value"),
+)
+def update_anomaly_feed(
+    avocado_type: str,
+    start_date: str,
+    end_date: str,
+    lang: str = "en",
+) -> html.Div:
+    """List the selected type's most anomalous prices across every region
+    over the date range — the region filter doesn't narrow it — read from
+    the type's cached scores for the range (see anomaly_scores) rather than
+    a scan per region."""
+    try:
+        dataset = current_dataset()
+        spec = filter_spec(None, [avocado_type], start_date, end_date, dataset)
+        points = anomaly_scores(spec, dataset).most_extreme(
+            spec.avocado_types, ANOMALY_STD_THRESHOLD, ANOMALY_FEED_LIMIT
+        )
+        return render_anomaly_feed(points, lang)
+    except Exception as e:
+        logger.error(f"Error in anomaly feed callback: {str(e)}", exc_info=True)
+        report_callback_error(
+            e, type=avocado_type, start_date=start_date, end_date=end_date
+        )
+        error_prefix = translations.t("common.error_prefix", lang)
+        return html.Div(f"{error_prefix}: {str(e)}", className="summary-empty")
+
+
 @app.callback(
     Output("download-csv-button", "disabled"),
     Output("download-status", "children"),
@@ -1595,8 +2804,8 @@ def update_download_controls(
     try:
         if not regions:
             return True, translations.t("empty.select_region", lang)
-        filtered_data = filter_data(regions, avocado_type, start_date, end_date)
-        if filtered_data.empty:
+        spec = filter_spec(regions, [avocado_type], start_date, end_date)
+        if not count_filter(spec):
             return True, translations.t("download.no_data", lang)
         return False, ""
     except Exception as e:
@@ -1654,15 +2863,22 @@ def download_filtered_csv(
         return no_update
 
 
+def build_price_chart(spec: FilterSpec, dataset: Dataset, lang: str) -> dict[str, Any]:
+    """The price chart of `spec`'s rows, each of its series scored with
+    ANOMALY_METHOD from those rows alone: they hold every row of the series
+    in the date range, so no other region or type needs selecting."""
+    rows = select_filter(spec, dataset)
+    return create_price_chart(rows, lang, zscores=price_zscores(rows, ANOMALY_METHOD))
+
+
 @app.callback(
-    Output("price-chart", "figure"),
-    Output("volume-chart", "figure"),
+    Output("price-chart-base", "data"),
+    Output("volume-chart-base", "data"),
     Input("region-filter", "value"),
     Input("type-filter", "value"),
     Input("date-range", "start_date"),
     Input("date-range", "end_date"),
-    Input("language-toggle", "value"),
-    Input("theme-resolved", "data"),
+    State("language-toggle", "value"),
 )
 def update_charts(
     regions: list[str] | None,
@@ -1670,30 +2886,41 @@ def update_charts(
     start_date: str,
     end_date: str,
     lang: str = "en",
-    theme: str | None = None,
 ) -> tuple[dict[str, Any], dict[str, Any]]:
     """Update charts based on filter selections."""
-    theme = theme or "light"
     try:
         if not regions:
             empty_fig = empty_state_figure(
-                translations.t("empty.select_region", lang), lang, theme
+                translations.localized(("t", "empty.select_region")), lang
             )
             return empty_fig, empty_fig
 
-        # Filter data based on selections
-        filtered_data = filter_data(regions, avocado_type, start_date, end_date)
+        dataset = current_dataset()
+        spec = filter_spec(regions, [avocado_type], start_date, end_date, dataset)
 
-        # Handle empty data case
-        if filtered_data.empty:
+        # Handle empty data case, without selecting the rows
+        if not count_filter(spec, dataset):
             empty_fig = empty_state_figure(
-                translations.t("empty.try_adjusting", lang), lang, theme
+                translations.localized(("t", "empty.try_adjusting")), lang
             )
             return empty_fig, empty_fig
 
+        # The rows are only selected when a figure isn't cached.
         return (
-            create_price_chart(filtered_data, lang, theme),
-            create_volume_chart(filtered_data, lang, theme),
+            cached_figure(
+                "price",
+                dataset,
+                (spec,),
+                lang,
+                lambda: build_price_chart(spec, dataset, lang),
+            ),
+            cached_figure(
+                "volume",
+                dataset,
+                (spec,),
+                lang,
+                lambda: create_volume_chart(select_filter(spec, dataset), lang),
+            ),
         )
 
     except Exception as e:
@@ -1706,21 +2933,19 @@ def update_charts(
             end_date=end_date,
         )
         # Return empty figures on error
-        error_prefix = translations.t("common.error_prefix", lang)
-        error_fig = {"data": [], "layout": {"title": f"{error_prefix}: {str(e)}"}}
+        error_fig = error_figure(e, lang)
         return error_fig, error_fig
 
 
 @app.callback(
-    Output("scatter-chart", "figure"),
+    Output("scatter-chart-base", "data"),
     Input("region-filter", "value"),
     Input("type-filter", "value"),
     Input("date-range", "start_date"),
     Input("date-range", "end_date"),
     Input("x-axis-dropdown", "value"),
     Input("y-axis-dropdown", "value"),
-    Input("language-toggle", "value"),
-    Input("theme-resolved", "data"),
+    State("language-toggle", "value"),
 )
 def update_scatter_chart(
     regions: list[str] | None,
@@ -1730,26 +2955,32 @@ def update_scatter_chart(
     x_col: str,
     y_col: str,
     lang: str = "en",
-    theme: str | None = None,
 ) -> dict[str, Any]:
     """Update scatter chart based on filter selections and axis choices."""
-    theme = theme or "light"
     try:
         if not regions:
             return empty_state_figure(
-                translations.t("empty.select_region", lang), lang, theme
+                translations.localized(("t", "empty.select_region")), lang
             )
 
-        # Filter data based on selections
-        filtered_data = filter_data(regions, avocado_type, start_date, end_date)
+        dataset = current_dataset()
+        spec = filter_spec(regions, [avocado_type], start_date, end_date, dataset)
 
-        # Handle empty data case
-        if filtered_data.empty:
+        # Handle empty data case, without selecting the rows
+        if not count_filter(spec, dataset):
             return empty_state_figure(
-                translations.t("empty.try_adjusting", lang), lang, theme
+                translations.localized(("t", "empty.try_adjusting")), lang
             )
 
-        return create_scatter_chart(filtered_data, x_col, y_col, lang, theme)
+        return cached_figure(
+            "scatter",
+            dataset,
+            (spec, x_col, y_col),
+            lang,
+            lambda: create_scatter_chart(
+                select_filter(spec, dataset), x_col, y_col, lang, dataset=dataset
+            ),
+        )
 
     except Exception as e:
         logger.error(f"Error in scatter chart callback: {str(e)}", exc_info=True)
@@ -1762,20 +2993,18 @@ def update_scatter_chart(
             x_col=x_col,
             y_col=y_col,
         )
-        error_prefix = translations.t("common.error_prefix", lang)
-        return {"data": [], "layout": {"title": f"{error_prefix}: {str(e)}"}}
+        return error_figure(e, lang)
 
 
 @app.callback(
-    Output("box-plot-chart", "figure"),
+    Output("box-plot-chart-base", "data"),
     Input("region-filter", "value"),
     Input("type-filter", "value"),
     Input("date-range", "start_date"),
     Input("date-range", "end_date"),
     Input("box-plot-column", "value"),
     Input("box-plot-groupby", "value"),
-    Input("language-toggle", "value"),
-    Input("theme-resolved", "data"),
+    State("language-toggle", "value"),
 )
 def update_box_plot(
     regions: list[str] | None,
@@ -1785,40 +3014,50 @@ def update_box_plot(
     column: str,
     group_by: str,
     lang: str = "en",
-    theme: str | None = None,
 ) -> dict[str, Any]:
     """Update box plot based on filter selections and grouping choice."""
-    theme = theme or "light"
+    dataset = current_dataset()
     try:
         # For box plots, we might want to show data across different groups
         # So we'll modify the filtering based on the group_by selection
         if group_by == "region":
             # Show data for selected type across every region, regardless of
             # the region filter (grouping by region shouldn't also pin it).
-            filtered_data = data.query(
-                "type == @avocado_type and Date >= @start_date and Date <= @end_date"
-            )
+            spec = filter_spec(None, [avocado_type], start_date, end_date, dataset)
         else:
             if not regions:
                 return empty_state_figure(
-                    translations.t("empty.select_region", lang), lang, theme
+                    translations.localized(("t", "empty.select_region")), lang
                 )
             if group_by == "type":
                 # Show both types, but filter by regions and date
-                filtered_data = data.query(
-                    "region in @regions and Date >= @start_date and Date <= @end_date"
-                )
+                spec = filter_spec(regions, None, start_date, end_date, dataset)
             else:
                 # "year", or any other grouping: full region/type/date filter
-                filtered_data = filter_data(regions, avocado_type, start_date, end_date)
+                spec = filter_spec(
+                    regions, [avocado_type], start_date, end_date, dataset
+                )
+        sketches: SketchSelection | None = None
+        index = sketch_index(dataset) if BOX_PLOT_SKETCH else None
+        if index is not None:
+            sketches = index.select(
+                spec.regions, spec.avocado_types, spec.start_date, spec.end_date
+            )
+            empty = not sketches.sketch(column).count
+        else:
+            empty = not count_filter(spec, dataset)
 
         # Handle empty data case
-        if filtered_data.empty:
+        if empty:
             return empty_state_figure(
-                translations.t("empty.try_adjusting", lang), lang, theme
+                translations.localized(("t", "empty.try_adjusting")), lang
             )
 
-        return create_box_plot(filtered_data, column, group_by, lang, theme)
+        def build() -> dict[str, Any]:
+            source = select_filter(spec, dataset) if sketches is None else sketches
+            return create_box_plot(source, column, group_by, lang)
+
+        return cached_figure("box", dataset, (spec, column, group_by), lang, build)
 
     except Exception as e:
         logger.error(f"Error in box plot callback: {str(e)}", exc_info=True)
@@ -1831,8 +3070,7 @@ def update_box_plot(
             column=column,
             group_by=group_by,
         )
-        error_prefix = translations.t("common.error_prefix", lang)
-        return {"data": [], "layout": {"title": f"{error_prefix}: {str(e)}"}}
+        return error_figure(e, lang)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+# data_index.py
+"""Precomputed indexes over the loaded dataset, built once at load so the
+per-request filters don't have to scan every row."""
+
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+Positions = np.ndarray[Any, np.dtype[np.intp]]
+EMPTY_POSITIONS: Positions = np.empty(0, dtype=np.intp)
+
+
+def _bound(value: Any) -> np.datetime64 | None:
+    """A query date bound as numpy datetime64, or None for "unbounded".
+    Accepts whatever `data.query("Date >= @start_date")` accepted: ISO
+    strings, dates, Timestamps."""
+    if value is None:
+        return None
+    return pd.Timestamp(value).to_datetime64()
+
+
+class BlockIndex:
+    """Row positions of a frame clustered by (region, type, Date).
+
+    `order` lists the frame's row positions sorted by region, then type,
+    then Date; `blocks` maps each (region, type) pair to the [start, stop)
+    slice of `order` holding its rows. A date range resolves with two
+    `searchsorted` calls inside each selected block, so a query costs
+    O(selected blocks × log n) plus the size of its result instead of a
+    full boolean scan. The frame itself is left in its load order — the
+    matched positions are sorted back into that order before returning, so
+    `frame.iloc[positions]` is exactly what the equivalent `frame.query()`
+    would have produced."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        region_codes, region_values = pd.factorize(frame["region"], sort=True)
+        type_codes, type_values = pd.factorize(frame["type"], sort=True)
+        dates = frame["Date"].to_numpy()
+
+        # Rows with a missing region/type (code -1) belong to no block, like
+        # query()'s NaN-never-equal semantics. np.lexsort sorts by its *last*
+        # key first; NaT dates sort to the end of their block.
+        valid = np.flatnonzero((region_codes >= 0) & (type_codes >= 0))
+        self.order: Positions = valid[
+            np.lexsort((dates[valid], type_codes[valid], region_codes[valid]))
+        ]
+        self.dates = dates[self.order]
+        self.regions: list[str] = [str(region) for region in region_values]
+        self.avocado_types: list[str] = [str(kind) for kind in type_values]
+        self.blocks: dict[tuple[str, str], tuple[int, int]] = {}
+
+        block_keys = (
+            region_codes[self.order] * len(type_values) + type_codes[self.order]
+        )
+        boundaries = (np.flatnonzero(np.diff(block_keys)) + 1).tolist()
+        for start, stop in zip([0] + boundaries, boundaries + [len(self.order)]):
+            if start == stop:
+                continue
+            first_row = self.order[start]
+            key = (
+                self.regions[region_codes[first_row]],
+                self.avocado_types[type_codes[first_row]],
+            )
+            self.blocks[key] = (start, stop)
+
+    @classmethod
+    def from_parts(
+        cls,
+        order: Positions,
+        dates: np.ndarray[Any, Any],
+        regions: list[str],
+        avocado_types: list[str],
+        blocks: dict[tuple[str, str], tuple[int, int]],
+    ) -> "BlockIndex":
+        """Rebuild an index from previously computed parts (e.g. memory-mapped
+        from a datastore column store) without re-sorting the frame."""
+        index = cls.__new__(cls)
+        index.order = order
+        index.dates = dates
+        index.regions = regions
+        index.avocado_types = avocado_types
+        index.blocks = blocks
+        return index
+
+    def with_rows(
+        self,
+        frame_slots: Positions,
+        regions: np.ndarray[Any, Any],
+        avocado_types: np.ndarray[Any, Any],
+        dates: np.ndarray[Any, Any],
+    ) -> "BlockIndex":
+        """The index of the frame `np.insert(rows, frame_slots, new_rows)`
+        builds from this index's frame: `frame_slots` (ascending) are the
+        insertion points and `regions`/`avocado_types`/`dates` describe the
+        new rows, in the same order. Existing positions shift past the rows
+        inserted before them and each new row is spliced into its block at
+        its date — new (region, type) pairs get a block of their own — so
+        the cost is a few linear passes over `order`, not a re-sort."""
+        frame_slots = np.asarray(frame_slots, dtype=np.intp)
+        new_positions = frame_slots + np.arange(len(frame_slots))
+        order = self.order + np.searchsorted(frame_slots, self.order, side="right")
+
+        # Rows with a missing region/type belong to no block, as in __init__.
+        valid = np.array(
+            [not (pd.isna(r) or pd.isna(t)) for r, t in zip(regions, avocado_types)],
+            dtype=bool,
+        )
+        keys = [
+            (str(region), str(kind))
+            for region, kind, is_valid in zip(regions, avocado_types, valid)
+            if is_valid
+        ]
+        new_dates = np.asarray(dates)[valid].astype(self.dates.dtype)
+        new_positions = new_positions[valid]
+
+        all_keys = sorted(set(self.blocks) | set(keys))
+        rank = {key: position for position, key in enumerate(all_keys)}
+        # Where each block starts in the current `order`; a new block starts
+        # where the next existing block (in key order) does.
+        old_starts: dict[tuple[str, str], int] = {}
+        next_start = len(self.order)
+        for key in reversed(all_keys):
+            if key in self.blocks:
+                next_start = self.blocks[key][0]
+            old_starts[key] = next_start
+
+        # NaT dates sort last within a block, as in __init__.
+        date_keys = new_dates.astype(np.int64)
+        date_keys[np.isnat(new_dates)] = np.iinfo(np.int64).max
+        arrival = np.lexsort(
+            (
+                np.arange(len(keys)),
+                date_keys,
+                np.array([rank[key] for key in keys], dtype=np.intp),
+            )
+        )
+        slots = np.empty(len(keys), dtype=np.intp)
+        added: dict[tuple[str, str], int] = {}
+        for row in arrival:
+            key = keys[row]
+            added[key] = added.get(key, 0) + 1
+            start, stop = self.blocks.get(key, (old_starts[key], old_starts[key]))
+            slots[row] = start + int(
+                self.dates[start:stop].searchsorted(new_dates[row], "right")
+            )
+
+        blocks: dict[tuple[str, str], tuple[int, int]] = {}
+        start = 0
+        for key in all_keys:
+            old_start, old_stop = self.blocks.get(key, (0, 0))
+            stop = start + (old_stop - old_start) + added.get(key, 0)
+            blocks[key] = (start, stop)
+            start = stop
+
+        return BlockIndex.from_parts(
+            order=np.insert(order, slots[arrival], new_positions[arrival]),
+            dates=np.insert(self.dates, slots[arrival], new_dates[arrival]),
+            regions=sorted({region for region, _ in all_keys}),
+            avocado_types=sorted({kind for _, kind in all_keys}),
+            blocks=blocks,
+        )
+
+    def _selected_blocks(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+    ) -> list[tuple[int, int]]:
+        region_keys = self.regions if regions is None else list(dict.fromkeys(regions))
+        type_keys = (
+            self.avocado_types
+            if avocado_types is None
+            else list(dict.fromkeys(avocado_types))
+        )
+        return [
+            self.blocks[(region, kind)]
+            for region in region_keys
+            for kind in type_keys
+            if (region, kind) in self.blocks
+        ]
+
+    def _date_slice(
+        self, start: int, stop: int, first: Any, last: Any
+    ) -> tuple[int, int]:
+        """[low, high) slice of `order` within block [start, stop) whose
+        dates fall in [first, last]. NaT dates (sorted last) never match."""
+        block_dates = self.dates[start:stop]
+        lower = _bound(first)
+        upper = _bound(last)
+        low = 0 if lower is None else int(block_dates.searchsorted(lower, "left"))
+        if upper is None:
+            high = int(block_dates.searchsorted(np.datetime64("NaT"), "left"))
+        else:
+            high = int(block_dates.searchsorted(upper, "right"))
+        return start + low, start + max(low, high)
+
+    def positions(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> Positions:
+        """Frame row positions (in frame order) whose region is in `regions`,
+        type is in `avocado_types` and Date lies in [start_date, end_date].
+        None for `regions`/`avocado_types` means "every value"."""
+        chunks = []
+        for start, stop in self._selected_blocks(regions, avocado_types):
+            low, high = self._date_slice(start, stop, start_date, end_date)
+            if high > low:
+                chunks.append(self.order[low:high])
+        if not chunks:
+            return EMPTY_POSITIONS
+        positions = np.concatenate(chunks)
+        positions.sort()
+        return positions
+
+    def count(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> int:
+        """len(self.positions(...)) without gathering them: two binary
+        searches per selected (region, type) block."""
+        total = 0
+        for start, stop in self._selected_blocks(regions, avocado_types):
+            low, high = self._date_slice(start, stop, start_date, end_date)
+            total += high - low
+        return total
@@ -0,0 +1,555 @@
+# dataset.py
+"""The live dataset the dashboard serves from: an immutable snapshot of the
+loaded frame plus everything derived from it (or a stand-in serving
+partitions, or sidecar metadata, until the frame is needed), and a
+background reloader that swaps in a fresh snapshot when the source file
+changes on disk."""
+
+import abc
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property
+from typing import Any, Protocol
+
+import numpy as np
+import pandas as pd
+
+import datastore
+from data_index import BlockIndex
+from datastore import PARTITION_CACHE_BYTES, AppendResult, PartitionStore
+from dense_cube import DenseCube
+from filters import Dates
+from kpi_index import KpiIndex
+from utils import calculate_price_change, calculate_summary_stats, find_region_extremes
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset(Protocol):
+    """The query backend callbacks go through. Row selection plus the
+    aggregates the summary panel needs, so a backend can compute those
+    without handing rows back (see sqlite_backend); the in-memory datasets
+    below implement them in pandas (PandasQueries), and a loaded
+    DatasetSnapshot from its KpiIndex."""
+
+    @property
+    def regions(self) -> list[str]: ...
+
+    @property
+    def avocado_types(self) -> list[str]: ...
+
+    @property
+    def min_date(self) -> date: ...
+
+    @property
+    def max_date(self) -> date: ...
+
+    @property
+    def row_count(self) -> int: ...
+
+    @property
+    def dates(self) -> Dates | None:
+        """The sorted distinct Dates, which FilterSpec snaps ranges to; None
+        where the backend doesn't hold them without a scan."""
+        ...
+
+    @property
+    def data(self) -> pd.DataFrame: ...
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame: ...
+
+    def count(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> int: ...
+
+    def summary_stats(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any] | None: ...
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None: ...
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None: ...
+
+
+class PandasQueries(abc.ABC):
+    """Dataset's aggregates computed by utils over the rows `select` returns
+    — the pandas backend, shared by every in-memory dataset class, each of
+    which must implement `select`."""
+
+    @abc.abstractmethod
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame: ...
+
+    def count(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> int:
+        """How many rows `select` returns."""
+        return len(self.select(regions, avocado_types, start_date, end_date))
+
+    def summary_stats(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any] | None:
+        """utils.calculate_summary_stats of the rows `select` returns, or None
+        when there are none."""
+        rows = self.select(regions, avocado_types, start_date, end_date)
+        return None if rows.empty else calculate_summary_stats(rows)
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None:
+        rows = self.select(None, [avocado_type], start_date, end_date)
+        return find_region_extremes(rows, avocado_type, start_date, end_date)
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None:
+        # Open-ended start: the comparison period precedes `start_date`.
+        rows = self.select(regions, [avocado_type], None, end_date)
+        return calculate_price_change(rows, regions, avocado_type, start_date, end_date)
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot(PandasQueries):
+    """One loaded version of the dataset and the values derived from it.
+    Never mutated — a reload builds a whole new snapshot and swaps the
+    reference, so a callback that grabbed a snapshot up front keeps a
+    consistent view (frame, index, region list and date bounds all from the
+    same load) even if a reload lands halfway through it. With a `cube`
+    (see DenseCube), rows are selected from it rather than through `index`."""
+
+    data: pd.DataFrame
+    index: BlockIndex
+    regions: list[str]
+    avocado_types: list[str]
+    min_date: date
+    max_date: date
+    cube: DenseCube | None = None
+
+    @classmethod
+    def build(
+        cls, frame: pd.DataFrame, index: BlockIndex, dense_cube: bool = False
+    ) -> "DatasetSnapshot":
+        return cls(
+            data=frame,
+            index=index,
+            regions=sorted(frame["region"].unique()),
+            avocado_types=sorted(frame["type"].unique()),
+            min_date=frame["Date"].min().date(),
+            max_date=frame["Date"].max().date(),
+            cube=DenseCube(frame) if dense_cube else None,
+        )
+
+    @property
+    def row_count(self) -> int:
+        return len(self.data)
+
+    @cached_property
+    def dates(self) -> Dates:
+        return np.unique(self.data["Date"].dropna().to_numpy().astype("datetime64[D]"))
+
+    def metadata(self) -> dict[str, Any]:
+        """This snapshot as datastore.dataset_metadata describes a frame."""
+        return {
+            "regions": [str(region) for region in self.regions],
+            "avocado_types": [str(kind) for kind in self.avocado_types],
+            "min_date": self.min_date.isoformat(),
+            "max_date": self.max_date.isoformat(),
+            "rows": self.row_count,
+            "schema_hash": datastore.schema_hash(self.data),
+        }
+
+    def append(self, batch: pd.DataFrame) -> tuple["DatasetSnapshot", AppendResult]:
+        """A new snapshot with `batch` (see datastore.read_batch) merged in
+        by datastore.merge_sorted_batch. The region/type lists and date
+        bounds are extended from the batch alone, not re-derived from the
+        merged frame, and so are the distinct dates and a KpiIndex already
+        built here, where KpiIndex.extended can; the DenseCube, if any, is
+        rebuilt."""
+        frame, index, result = datastore.merge_sorted_batch(
+            self.data, self.index, batch
+        )
+        min_date, max_date = self.min_date, self.max_date
+        dates = batch["Date"].dropna()
+        if not dates.empty:
+            min_date = min(min_date, dates.min().date())
+            max_date = max(max_date, dates.max().date())
+        snapshot = DatasetSnapshot(
+            data=frame,
+            index=index,
+            regions=sorted(set(self.regions) | set(batch["region"].dropna())),
+            avocado_types=sorted(set(self.avocado_types) | set(batch["type"].dropna())),
+            min_date=min_date,
+            max_date=max_date,
+            cube=None if self.cube is None else DenseCube(frame),
+        )
+        # Seeds the new snapshot's cached_properties.
+        if "dates" in self.__dict__:
+            snapshot.__dict__["dates"] = np.union1d(
+                self.dates, dates.to_numpy().astype("datetime64[D]")
+            )
+        kpi_index = self.__dict__.get("kpi_index")
+        if kpi_index is not None:
+            extended = kpi_index.extended(batch)
+            if extended is not None:
+                snapshot.__dict__["kpi_index"] = extended
+        return snapshot, result
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame:
+        """Rows matching the given regions, types and inclusive date range, in
+        dataset order — None for `regions`/`avocado_types` means "all", and
+        None for a date means unbounded."""
+        if self.cube is not None:
+            return self.cube.select(regions, avocado_types, start_date, end_date)
+        return self.data.iloc[
+            self.index.positions(regions, avocado_types, start_date, end_date)
+        ]
+
+    def count(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> int:
+        """How many rows `select` returns, from `index` alone."""
+        return self.index.count(regions, avocado_types, start_date, end_date)
+
+    @cached_property
+    def kpi_index(self) -> KpiIndex:
+        """The summary panel's prefix-sum index, built on first use — so
+        every aggregate below costs array lookups, not a pass over rows."""
+        return KpiIndex(self.data)
+
+    def summary_stats(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any] | None:
+        return self.kpi_index.summary_stats(
+            regions, avocado_types, start_date, end_date
+        )
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None:
+        return self.kpi_index.region_extremes(avocado_type, start_date, end_date)
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None:
+        return self.kpi_index.price_change(regions, avocado_type, start_date, end_date)
+
+
+@dataclass(frozen=True)
+class PartitionedSnapshot(PandasQueries):
+    """A dataset served lazily from a datastore partition store: the
+    region/type lists, date bounds and row count come from its manifest,
+    and `select` reads only the partitions a query touches. Offers the same
+    `select`/metadata surface as DatasetSnapshot, so callbacks work against
+    either."""
+
+    store: PartitionStore
+    regions: list[str]
+    avocado_types: list[str]
+    min_date: date
+    max_date: date
+    row_count: int
+
+    @classmethod
+    def open(
+        cls, store_dir: str, cache_bytes: int = PARTITION_CACHE_BYTES
+    ) -> "PartitionedSnapshot":
+        store = PartitionStore(store_dir, cache_bytes)
+        if store.min_date is None or store.max_date is None:
+            raise ValueError(f"Partition store at {store_dir} holds no dated rows")
+        return cls(
+            store=store,
+            regions=store.regions,
+            avocado_types=store.avocado_types,
+            min_date=date.fromisoformat(store.min_date),
+            max_date=date.fromisoformat(store.max_date),
+            row_count=store.rows,
+        )
+
+    @property
+    def dates(self) -> None:
+        # The manifest holds each partition's date span, not its dates.
+        return None
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """The full dataset, read from every partition on each access."""
+        return self.store.read_all()
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame:
+        """Matching rows, ordered by Date then source row."""
+        return self.store.select(regions, avocado_types, start_date, end_date)
+
+
+class LazySnapshot(PandasQueries):
+    """A DatasetSnapshot that hasn't been loaded yet, standing in for it
+    from a datastore metadata sidecar: regions, types, date bounds and row
+    count are served from the sidecar, and the first `select`/`data` access
+    (or `warm_up`) runs `load` — once, however many threads ask at the same
+    time. After that, every attribute comes from the loaded snapshot."""
+
+    def __init__(
+        self, metadata: dict[str, Any], load: Callable[[], DatasetSnapshot]
+    ) -> None:
+        self.metadata = metadata
+        self._load = load
+        self._loaded: DatasetSnapshot | None = None
+        self._lock = threading.Lock()
+
+    def loaded(self) -> DatasetSnapshot:
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._loaded = self._load()
+                    if self._loaded.row_count != self.metadata["rows"]:
+                        logger.warning(
+                            "Loaded %d rows where the metadata sidecar listed "
+                            "%d; serving the loaded data",
+                            self._loaded.row_count,
+                            self.metadata["rows"],
+                        )
+        return self._loaded
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded is not None
+
+    def warm_up(self) -> threading.Thread:
+        """Load in a background daemon thread, so the first request doesn't
+        pay for it. A failure is logged; the next access retries."""
+        thread = threading.Thread(
+            target=self._warm_up, name="dataset-warmup", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _warm_up(self) -> None:
+        started = time.perf_counter()
+        try:
+            snapshot = self.loaded()
+        except Exception:
+            logger.error("Dataset warm-up load failed", exc_info=True)
+            return
+        logger.info(
+            "Warmed up dataset in %.2fs: %d rows",
+            time.perf_counter() - started,
+            snapshot.row_count,
+        )
+
+    @property
+    def regions(self) -> list[str]:
+        if self._loaded is not None:
+            return self._loaded.regions
+        regions: list[str] = self.metadata["regions"]
+        return regions
+
+    @property
+    def avocado_types(self) -> list[str]:
+        if self._loaded is not None:
+            return self._loaded.avocado_types
+        avocado_types: list[str] = self.metadata["avocado_types"]
+        return avocado_types
+
+    @property
+    def min_date(self) -> date:
+        if self._loaded is not None:
+            return self._loaded.min_date
+        return date.fromisoformat(self.metadata["min_date"])
+
+    @property
+    def max_date(self) -> date:
+        if self._loaded is not None:
+            return self._loaded.max_date
+        return date.fromisoformat(self.metadata["max_date"])
+
+    @property
+    def row_count(self) -> int:
+        if self._loaded is not None:
+            return self._loaded.row_count
+        rows: int = self.metadata["rows"]
+        return rows
+
+    @property
+    def dates(self) -> Dates | None:
+        # The sidecar doesn't list them; until loaded, ranges aren't snapped.
+        if self._loaded is not None:
+            return self._loaded.dates
+        return None
+
+    @property
+    def data(self) -> pd.DataFrame:
+        return self.loaded().data
+
+    @property
+    def index(self) -> BlockIndex:
+        return self.loaded().index
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame:
+        return self.loaded().select(regions, avocado_types, start_date, end_date)
+
+    def count(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> int:
+        return self.loaded().count(regions, avocado_types, start_date, end_date)
+
+    def summary_stats(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any] | None:
+        return self.loaded().summary_stats(regions, avocado_types, start_date, end_date)
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None:
+        return self.loaded().region_extremes(avocado_type, start_date, end_date)
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None:
+        return self.loaded().price_change(regions, avocado_type, start_date, end_date)
+
+
+def _stat_key(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class DataReloader(threading.Thread):
+    """Daemon thread polling `watch_path` every `interval_seconds`. Once the
+    file has changed *and* then held still for one full interval (so a copy
+    still in progress isn't read half-written), `load` builds a new
+    snapshot here, off the request path, and `swap` installs it — `swap`
+    returns the snapshot it replaced, for the row-count log line. A load
+    that fails is logged and not retried until the file changes again; the
+    previous snapshot keeps serving in the meantime."""
+
+    def __init__(
+        self,
+        watch_path: str,
+        load: Callable[[], Dataset],
+        swap: Callable[[Dataset], Dataset],
+        interval_seconds: float,
+    ) -> None:
+        super().__init__(name="dataset-reloader", daemon=True)
+        self.watch_path = watch_path
+        self.load = load
+        self.swap = swap
+        self.interval_seconds = interval_seconds
+        self._loaded_key = _stat_key(watch_path)
+        self._pending_key = self._loaded_key
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            self.poll()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def mark_loaded(self) -> None:
+        """Take the watched file as it is now to be loaded already: for a
+        change the app made itself and has swapped in (see app.append_batch),
+        which would otherwise be reloaded in full."""
+        self._loaded_key = self._pending_key = _stat_key(self.watch_path)
+
+    def poll(self) -> bool:
+        """Check the watched file once; True if a new snapshot was swapped in."""
+        key = _stat_key(self.watch_path)
+        settled = key == self._pending_key
+        self._pending_key = key
+        if key is None or key == self._loaded_key or not settled:
+            return False
+
+        # Recorded before loading so a broken file is attempted once per
+        # change rather than on every poll.
+        self._loaded_key = key
+        started = time.perf_counter()
+        try:
+            snapshot = self.load()
+        except Exception:
+            logger.error(
+                "Dataset reload from %s failed; keeping the current data",
+                self.watch_path,
+                exc_info=True,
+            )
+            return False
+        previous = self.swap(snapshot)
+        logger.info(
+            "Reloaded dataset from %s in %.2fs: %d -> %d rows",
+            self.watch_path,
+            time.perf_counter() - started,
+            previous.row_count,
+            snapshot.row_count,
+        )
+        return True
@@ -0,0 +1,998 @@
+# datastore.py
+"""On-disk formats for the avocado dataset. The columnar cache stores a parsed,
+typed and sorted frame next to its source CSV as one `.npy` file per column
+plus a JSON manifest, so later process starts skip `pd.read_csv` entirely.
+Plain NumPy files rather than Parquet/Arrow IPC: numpy already ships with
+pandas, so the cache adds no dependency to the production image."""
+
+import argparse
+import concurrent.futures
+import functools
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+
+from data_index import BlockIndex
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes — older caches are then ignored.
+COLUMN_CACHE_VERSION = 1
+COLUMN_CACHE_SUFFIX = ".cache"
+MANIFEST_NAME = "manifest.json"
+INDEX_FILE_NAME = "index.npy"
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+REQUIRED_DATA_COLUMNS = {"Date", "AveragePrice", "Total Volume", "type", "region"}
+# What identifies a row: one weekly observation per region and type.
+ROW_KEY = ["Date", "region", "type"]
+
+
+def _read_csv_file(csv_path: str) -> pd.DataFrame:
+    """Read `csv_path`, check it has REQUIRED_DATA_COLUMNS and parse `Date`,
+    leaving rows in file order. Module-level so a process pool can run it."""
+    try:
+        raw_data = pd.read_csv(csv_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Could not find avocado.csv at {csv_path}")
+    except Exception as e:
+        raise Exception(f"Error loading data: {str(e)}")
+
+    missing_columns = REQUIRED_DATA_COLUMNS - set(raw_data.columns)
+    if missing_columns:
+        raise ValueError(
+            f"CSV at {csv_path} is missing required columns: "
+            f"{', '.join(sorted(missing_columns))}"
+        )
+
+    return raw_data.assign(
+        Date=lambda df: pd.to_datetime(df["Date"], format="%Y-%m-%d")
+    )
+
+
+def drop_superseded_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """`frame` without rows whose ROW_KEY a later row repeats: a source is
+    an append log (see append_csv_rows), so the last delivery of a key wins."""
+    return frame.drop_duplicates(subset=ROW_KEY, keep="last")
+
+
+def parse_csv(csv_path: str) -> pd.DataFrame:
+    """Read `csv_path`, check it has REQUIRED_DATA_COLUMNS, parse `Date`,
+    drop superseded rows and sort by Date — the frame every storage format
+    in this module persists."""
+    return drop_superseded_rows(_read_csv_file(csv_path)).sort_values(by="Date")
+
+
+def read_csv_header(csv_path: str) -> list[str]:
+    """Column names of `csv_path`, checked against REQUIRED_DATA_COLUMNS,
+    reading only its header line."""
+    try:
+        columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Could not find avocado.csv at {csv_path}")
+    except Exception as e:
+        raise Exception(f"Error loading data: {str(e)}")
+
+    missing_columns = REQUIRED_DATA_COLUMNS - set(columns)
+    if missing_columns:
+        raise ValueError(
+            f"CSV at {csv_path} is missing required columns: "
+            f"{', '.join(sorted(missing_columns))}"
+        )
+    return columns
+
+
+def source_files(source: str) -> list[str]:
+    """The CSV files `source` names: the file itself, every `*.csv` directly
+    inside a directory, or the matches of a glob pattern. Sorted, so the
+    files are always concatenated in the same order."""
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(glob.escape(source), "*.csv")))
+    elif glob.has_magic(source):
+        files = sorted(path for path in glob.glob(source) if os.path.isfile(path))
+    else:
+        return [source]
+    if not files:
+        raise FileNotFoundError(f"No CSV files found at {source}")
+    return files
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Where it exists, the "forkserver" start method, else "spawn": never
+    "fork". parse_sources runs on the warm-up and reload threads, and a
+    forked child inherits any lock another thread held at the fork, held
+    forever. The fork server imports this module (and pandas) once, so
+    workers start from it without re-importing either."""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def parse_sources(source: str, workers: int | None = None) -> pd.DataFrame:
+    """parse_csv() for a file, directory or glob (see source_files). Every
+    file's header is checked up front — for the required columns and for
+    matching the first file's column list — so a bad file fails the load
+    before any parsing starts. The files are then parsed across a pool of
+    `workers` processes (default: one per CPU, at most one per file) and
+    concatenated in source_files order into one frame, indexed 0..n-1 and
+    deduplicated and sorted by Date exactly as parse_csv would treat the
+    files joined end to end."""
+    files = source_files(source)
+    if len(files) == 1:
+        return parse_csv(files[0])
+
+    expected = read_csv_header(files[0])
+    for path in files[1:]:
+        columns = read_csv_header(path)
+        if columns != expected:
+            raise ValueError(
+                f"CSV at {path} has columns {columns}, but {files[0]} has "
+                f"{expected}; every file of a source must share one schema"
+            )
+
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    if workers == 1:
+        frames = [_read_csv_file(path) for path in files]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=_pool_context()
+        ) as pool:
+            # Batched so hundreds of small files don't cost one round trip
+            # to a worker each.
+            batch = max(1, len(files) // (workers * 4))
+            frames = list(pool.map(_read_csv_file, files, chunksize=batch))
+    joined = pd.concat(frames, ignore_index=True)
+    return drop_superseded_rows(joined).sort_values(by="Date")
+
+
+def column_cache_dir(source_path: str) -> str:
+    """Cache directory for `source_path`: a sibling named `<source>.cache`."""
+    return source_path + COLUMN_CACHE_SUFFIX
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source_path: str, with_hash: bool = True) -> dict[str, Any]:
+    """Cache key for `source_path`: absolute path, size, mtime and (unless
+    `with_hash` is False) the SHA-256 of its contents. Size/mtime alone miss
+    same-second rewrites of equal length; the hash alone would force a full
+    read just to discover an obviously stale cache — so callers compare the
+    cheap fields first and only hash when those already match."""
+    stat = os.stat(source_path)
+    fingerprint: dict[str, Any] = {
+        "path": os.path.abspath(source_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if with_hash:
+        fingerprint["sha256"] = file_sha256(source_path)
+    return fingerprint
+
+
+def _atomic_write_bytes(path: str, payload: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as target:
+        target.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _atomic_save_array(path: str, array: np.ndarray[Any, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as target:
+        np.save(target, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _is_string_column(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def write_column_cache(
+    source_path: str,
+    frame: pd.DataFrame,
+    fingerprint: dict[str, Any] | None = None,
+) -> bool:
+    """Persist `frame` (already parsed from `source_path`) as a columnar
+    cache, keyed by `fingerprint`: the source_fingerprint taken before the
+    parse (see parse_and_cache). A source rewritten during the parse then
+    fails that key on the next read, rather than its old rows being cached
+    under the new contents' key; the default, a fingerprint taken now, is
+    only safe when the source can't have changed since it was read. String
+    columns are stored as int32 codes plus their distinct values in the
+    manifest — `.npy` can't hold Python strings without pickling. Every
+    file is written to a temp name and renamed into place, and the
+    manifest goes last, so a concurrently starting worker sees either the
+    previous complete cache or the new one, never a mix. Returns False
+    (after logging) instead of raising when the directory isn't writable —
+    the cache is an optimization, not a requirement."""
+    cache_dir = column_cache_dir(source_path)
+    try:
+        if fingerprint is None:
+            fingerprint = source_fingerprint(source_path)
+        # Column files are namespaced by content hash, so two workers writing
+        # caches for different versions of the source never clobber each other.
+        prefix = fingerprint["sha256"][:16]
+        os.makedirs(cache_dir, exist_ok=True)
+
+        columns: list[dict[str, Any]] = []
+        for position, name in enumerate(frame.columns):
+            series = frame[name]
+            file_name = f"{prefix}.{position:03d}.npy"
+            entry: dict[str, Any] = {
+                "name": name,
+                "dtype": str(series.dtype),
+                "file": file_name,
+            }
+            if _is_string_column(series):
+                codes, uniques = pd.factorize(series)
+                entry["categories"] = [str(value) for value in uniques]
+                values = codes.astype(np.int32)
+            else:
+                values = series.to_numpy()
+            _atomic_save_array(os.path.join(cache_dir, file_name), values)
+            columns.append(entry)
+
+        index_file = f"{prefix}.{INDEX_FILE_NAME}"
+        _atomic_save_array(
+            os.path.join(cache_dir, index_file), frame.index.to_numpy(dtype=np.int64)
+        )
+        manifest = {
+            "version": COLUMN_CACHE_VERSION,
+            "source": fingerprint,
+            "rows": len(frame),
+            "index_file": index_file,
+            "columns": columns,
+        }
+        _atomic_write_bytes(
+            os.path.join(cache_dir, MANIFEST_NAME),
+            json.dumps(manifest, indent=2).encode("utf-8"),
+        )
+        _prune_stale_files(cache_dir, prefix)
+    except OSError:
+        logger.warning(
+            "Could not write column cache to %s; continuing without it",
+            cache_dir,
+            exc_info=True,
+        )
+        return False
+    return True
+
+
+def parse_and_cache(csv_path: str, workers: int | None = None) -> pd.DataFrame:
+    """parse_sources(csv_path), written to its column cache under the
+    fingerprint the file had before the parse began."""
+    fingerprint = source_fingerprint(csv_path)
+    frame = parse_sources(csv_path, workers)
+    write_column_cache(csv_path, frame, fingerprint)
+    return frame
+
+
+def _prune_stale_files(cache_dir: str, keep_prefix: str) -> None:
+    for file_name in os.listdir(cache_dir):
+        if file_name == MANIFEST_NAME or file_name.startswith(keep_prefix + "."):
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, file_name))
+        except OSError:
+            pass
+
+
+def read_cache_manifest(source_path: str) -> dict[str, Any] | None:
+    """The cache manifest for `source_path` if it is still valid for the
+    source's current path, size, mtime and content hash, else None."""
+    manifest_path = os.path.join(column_cache_dir(source_path), MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest: dict[str, Any] = json.load(manifest_file)
+        current = source_fingerprint(source_path, with_hash=False)
+    except (OSError, ValueError):
+        return None
+
+    cached = manifest.get("source", {})
+    if manifest.get("version") != COLUMN_CACHE_VERSION or any(
+        cached.get(key) != value for key, value in current.items()
+    ):
+        return None
+    try:
+        if cached.get("sha256") != file_sha256(source_path):
+            return None
+    except OSError:
+        return None
+    return manifest
+
+
+def _restore_column(array: np.ndarray[Any, Any], entry: dict[str, Any]) -> Any:
+    if "categories" in entry:
+        return pd.Categorical.from_codes(array, entry["categories"]).astype(
+            entry["dtype"]
+        )
+    return array
+
+
+def read_column_cache(source_path: str) -> pd.DataFrame | None:
+    """Load the cached frame for `source_path`, or None when there is no
+    cache or it no longer matches the source. A cache that fails to load
+    (e.g. pruned mid-read by a concurrent writer) is also a miss — the
+    caller just re-parses the CSV."""
+    manifest = read_cache_manifest(source_path)
+    if manifest is None:
+        return None
+
+    cache_dir = column_cache_dir(source_path)
+    try:
+        index = np.load(os.path.join(cache_dir, manifest["index_file"]))
+        columns = {
+            entry["name"]: _restore_column(
+                np.load(os.path.join(cache_dir, entry["file"])), entry
+            )
+            for entry in manifest["columns"]
+        }
+    except (OSError, ValueError, KeyError):
+        logger.warning(
+            "Ignoring unreadable column cache at %s", cache_dir, exc_info=True
+        )
+        return None
+    return pd.DataFrame(columns, index=pd.Index(index))
+
+
+# --- Metadata sidecar --------------------------------------------------------
+#
+# A few hundred bytes next to the source CSV (`<csv>.meta.json`) holding what
+# the layout and URL decoding need — region/type lists, date bounds, row
+# count — so app import can serve them without parsing the data. Validated
+# by the source's size and mtime only: hashing the source would cost the
+# full read the sidecar exists to avoid.
+METADATA_VERSION = 1
+METADATA_SUFFIX = ".meta.json"
+
+
+def metadata_sidecar_path(source_path: str) -> str:
+    return source_path + METADATA_SUFFIX
+
+
+def schema_hash(frame: pd.DataFrame) -> str:
+    """Short hash of `frame`'s column names and dtypes, in order."""
+    schema = [[str(name), str(dtype)] for name, dtype in frame.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode("utf-8")).hexdigest()[:16]
+
+
+def dataset_metadata(frame: pd.DataFrame) -> dict[str, Any]:
+    """The sidecar's description of a loaded (non-empty) dataset frame."""
+    return {
+        "regions": sorted(str(region) for region in frame["region"].unique()),
+        "avocado_types": sorted(str(kind) for kind in frame["type"].unique()),
+        "min_date": frame["Date"].min().date().isoformat(),
+        "max_date": frame["Date"].max().date().isoformat(),
+        "rows": len(frame),
+        "schema_hash": schema_hash(frame),
+    }
+
+
+def write_metadata_sidecar(source_path: str, metadata: dict[str, Any]) -> bool:
+    """Write `metadata` (see dataset_metadata) as the sidecar of
+    `source_path`. Like write_column_cache, returns False after logging
+    rather than raising when the directory isn't writable."""
+    sidecar_path = metadata_sidecar_path(source_path)
+    try:
+        payload = {
+            "version": METADATA_VERSION,
+            "source": source_fingerprint(source_path, with_hash=False),
+            "metadata": metadata,
+        }
+        _atomic_write_bytes(sidecar_path, json.dumps(payload, indent=2).encode("utf-8"))
+    except OSError:
+        logger.warning(
+            "Could not write metadata sidecar %s; continuing without it",
+            sidecar_path,
+            exc_info=True,
+        )
+        return False
+    return True
+
+
+def read_metadata_sidecar(source_path: str) -> dict[str, Any] | None:
+    """The metadata stored for `source_path`, or None when there is no
+    sidecar or the source's path, size or mtime no longer match it."""
+    try:
+        with open(metadata_sidecar_path(source_path), encoding="utf-8") as sidecar:
+            payload: dict[str, Any] = json.load(sidecar)
+        current = source_fingerprint(source_path, with_hash=False)
+    except (OSError, ValueError):
+        return None
+    if payload.get("version") != METADATA_VERSION or payload.get("source") != current:
+        return None
+    metadata: dict[str, Any] | None = payload.get("metadata")
+    return metadata
+
+
+# --- Incremental appends ---------------------------------------------------
+
+
+@dataclass(frozen=True)
+class AppendResult:
+    inserted: int
+    replaced: int
+
+
+def read_batch(csv_path: str) -> pd.DataFrame:
+    """A batch of new rows from `csv_path`, validated like a source (and
+    only it — the history isn't read) and deduplicated on ROW_KEY."""
+    return drop_superseded_rows(_read_csv_file(csv_path))
+
+
+def _batch_as(frame: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """`batch` with `frame`'s column order and dtypes (less any unused
+    columns compact_frame dropped from `frame`). Categorical columns
+    of `frame` (compact mode, column stores) must have any new labels added
+    to `frame` by the caller first — see _with_batch_categories."""
+    batch = batch.drop(
+        columns=[
+            name
+            for name in batch.columns
+            if name not in frame.columns and _is_unused_column(name)
+        ]
+    )
+    if set(batch.columns) != set(frame.columns):
+        raise ValueError(
+            f"Batch columns {sorted(batch.columns)} don't match the dataset's "
+            f"{sorted(frame.columns)}"
+        )
+    try:
+        return batch[list(frame.columns)].astype(frame.dtypes.to_dict())
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Batch values don't fit the dataset's dtypes: {e}")
+
+
+def _with_batch_categories(frame: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    for name in frame.columns:
+        dtype = frame[name].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and name in batch.columns:
+            new_labels = set(batch[name].dropna()) - set(dtype.categories)
+            if new_labels:
+                frame = frame.assign(
+                    **{name: frame[name].cat.add_categories(sorted(new_labels))}
+                )
+    return frame
+
+
+def merge_sorted_batch(
+    frame: pd.DataFrame, index: BlockIndex, batch: pd.DataFrame
+) -> tuple[pd.DataFrame, BlockIndex, AppendResult]:
+    """Merge `batch` (see read_batch) into the Date-sorted `frame` and its
+    BlockIndex. A batch row whose ROW_KEY is already present replaces that
+    row in place; the others are inserted after the existing rows of their
+    Date. Existing rows are looked up through `index` and the new rows are
+    spliced in with a single take, so the work beyond copying the columns
+    scales with the batch, not the history — nothing is re-sorted and
+    the index is extended (BlockIndex.with_rows) rather than rebuilt."""
+    frame = _with_batch_categories(frame, batch)
+    batch = _batch_as(frame, drop_superseded_rows(batch))
+    batch_dates = batch["Date"].to_numpy()
+
+    replaces = np.full(len(batch), -1, dtype=np.intp)
+    groups = batch.groupby(["region", "type"], sort=False, observed=True).indices
+    for key, rows in groups.items():
+        region, avocado_type = cast(tuple[Any, Any], key)
+        block = index.blocks.get((str(region), str(avocado_type)))
+        if block is None:
+            continue
+        start, stop = block
+        block_dates = index.dates[start:stop]
+        targets = batch_dates[rows].astype(block_dates.dtype)
+        at = block_dates.searchsorted(targets, "left")
+        found = at < len(block_dates)
+        found[found] = block_dates[at[found]] == targets[found]
+        replaces[rows[found]] = index.order[start + at[found]]
+
+    replaced_rows = np.flatnonzero(replaces >= 0)
+    new_rows = np.flatnonzero(replaces < 0)
+    new_rows = new_rows[np.argsort(batch_dates[new_rows], kind="stable")]
+    frame_slots = frame["Date"].to_numpy().searchsorted(batch_dates[new_rows], "right")
+
+    next_label = int(frame.index.max()) + 1 if len(frame) else 0
+    labels = np.empty(len(batch), dtype=np.int64)
+    labels[replaced_rows] = frame.index.to_numpy()[replaces[replaced_rows]]
+    labels[new_rows] = np.arange(next_label, next_label + len(new_rows))
+    batch = batch.set_axis(pd.Index(labels), axis=0)
+
+    take = np.arange(len(frame))
+    take[replaces[replaced_rows]] = len(frame) + replaced_rows
+    take = np.insert(take, frame_slots, len(frame) + new_rows)
+    merged = pd.concat([frame, batch]).iloc[take]
+
+    merged_index = index.with_rows(
+        frame_slots,
+        batch["region"].to_numpy()[new_rows],
+        batch["type"].to_numpy()[new_rows],
+        batch_dates[new_rows],
+    )
+    return merged, merged_index, AppendResult(len(new_rows), len(replaced_rows))
+
+
+def append_csv_rows(csv_path: str, batch: pd.DataFrame) -> None:
+    """Append `batch` (see read_batch) to the source CSV at `csv_path` in
+    the source's own column order — O(batch), the history isn't rewritten.
+    Replacement rows are appended too: parse_csv keeps the last row per key."""
+    columns = read_csv_header(csv_path)
+    if set(batch.columns) != set(columns):
+        raise ValueError(
+            f"Batch columns {sorted(batch.columns)} don't match {csv_path}'s "
+            f"{sorted(columns)}"
+        )
+    with open(csv_path, "rb+") as source:
+        source.seek(0, os.SEEK_END)
+        if source.tell():
+            source.seek(-1, os.SEEK_END)
+            needs_newline = source.read(1) != b"\n"
+        else:
+            needs_newline = False
+    with open(csv_path, "a", encoding="utf-8", newline="") as source:
+        if needs_newline:
+            source.write("\n")
+        batch[columns].to_csv(source, header=False, index=False, date_format="%Y-%m-%d")
+
+
+def append_to_source(
+    csv_path: str,
+    batch: pd.DataFrame,
+    merged: pd.DataFrame,
+    metadata: dict[str, Any],
+    cache: bool = True,
+) -> None:
+    """Append `batch` to the source CSV at `csv_path` (see append_csv_rows)
+    and bring what is derived from the file up to `merged`, the frame
+    merge_sorted_batch returned for it: the metadata sidecar (`metadata`,
+    see dataset_metadata) and, unless `cache` is False, the column cache —
+    so the next load reads the merged frame back instead of re-parsing a
+    source the append has invalidated."""
+    append_csv_rows(csv_path, batch)
+    if cache:
+        write_column_cache(csv_path, merged)
+    write_metadata_sidecar(csv_path, metadata)
+
+
+# Columns kept as pandas categoricals in compact mode: low-cardinality labels
+# repeated on every row (54 regions, 2 types across ~18k rows).
+CATEGORICAL_COLUMNS = ("region", "type")
+
+
+def _is_unused_column(name: str) -> bool:
+    # "Unnamed: 0" is how pandas names the CSV's leading index column — a
+    # row counter no view, filter or export relies on.
+    return name.startswith("Unnamed:")
+
+
+def compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """A smaller in-memory copy of `frame`: CATEGORICAL_COLUMNS become
+    categoricals, integer columns shrink to the narrowest integer dtype that
+    holds them, float columns become float32 only where every value round-
+    trips exactly, and unused columns are dropped. Every cell that remains
+    compares equal to the original."""
+    compact = frame.drop(columns=[c for c in frame.columns if _is_unused_column(c)])
+    for name in compact.columns:
+        series = compact[name]
+        if name in CATEGORICAL_COLUMNS:
+            compact[name] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            compact[name] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype):
+            original = series.to_numpy(dtype=np.float64)
+            narrowed = original.astype(np.float32)
+            if np.array_equal(narrowed.astype(np.float64), original, equal_nan=True):
+                compact[name] = narrowed
+    return compact
+
+
+def frame_memory_bytes(frame: pd.DataFrame) -> int:
+    """Total bytes held by `frame`, counting string payloads (deep=True)."""
+    return int(frame.memory_usage(deep=True).sum())
+
+
+# --- Memory-mapped column store -------------------------------------------
+#
+# A precomputed, read-only directory every worker process maps instead of
+# parsing: one contiguous `.npy` per column, region/type as integer codes,
+# Date as int64 days (datetime64[D]), plus the BlockIndex arrays. Opened with
+# mmap_mode="r", the column data lives in the OS page cache once and is
+# shared by every worker on the host rather than copied into each one.
+COLUMN_STORE_VERSION = 1
+
+
+def _smallest_code_dtype(category_count: int) -> np.dtype[Any]:
+    # Categorical.from_codes keeps (rather than copies) codes that already
+    # have the narrowest dtype pandas would pick for this many categories.
+    for dtype in (np.int8, np.int16, np.int32):
+        if category_count < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def write_column_store(frame: pd.DataFrame, store_dir: str) -> None:
+    """Write `frame` and its BlockIndex as a column store in `store_dir`."""
+    os.makedirs(store_dir, exist_ok=True)
+    columns: list[dict[str, Any]] = []
+    for position, name in enumerate(frame.columns):
+        series = frame[name]
+        entry: dict[str, Any] = {
+            "name": name,
+            "dtype": str(series.dtype),
+            "file": f"column.{position:03d}.npy",
+        }
+        if pd.api.types.is_datetime64_dtype(series.dtype):
+            entry["encoding"] = "days"
+            values = series.to_numpy().astype("datetime64[D]")
+        elif _is_string_column(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            entry["encoding"] = "codes"
+            codes, uniques = pd.factorize(series, sort=True)
+            entry["categories"] = [str(value) for value in uniques]
+            values = codes.astype(_smallest_code_dtype(len(uniques)))
+        else:
+            entry["encoding"] = "values"
+            values = np.ascontiguousarray(series.to_numpy())
+        _atomic_save_array(os.path.join(store_dir, entry["file"]), values)
+        columns.append(entry)
+
+    _atomic_save_array(
+        os.path.join(store_dir, INDEX_FILE_NAME), frame.index.to_numpy(dtype=np.int64)
+    )
+    block_index = BlockIndex(frame)
+    _atomic_save_array(
+        os.path.join(store_dir, "block_order.npy"), block_index.order.astype(np.int64)
+    )
+    _atomic_save_array(
+        os.path.join(store_dir, "block_dates.npy"),
+        block_index.dates.astype("datetime64[D]"),
+    )
+    manifest = {
+        "version": COLUMN_STORE_VERSION,
+        "rows": len(frame),
+        "columns": columns,
+        "block_index": {
+            "regions": block_index.regions,
+            "avocado_types": block_index.avocado_types,
+            "blocks": [
+                [region, avocado_type, start, stop]
+                for (region, avocado_type), (start, stop) in block_index.blocks.items()
+            ],
+        },
+    }
+    _atomic_write_bytes(
+        os.path.join(store_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode("utf-8"),
+    )
+
+
+def open_column_store(store_dir: str) -> tuple[pd.DataFrame, BlockIndex]:
+    """Map the column store in `store_dir` as a DataFrame plus its BlockIndex.
+    Numeric columns and region/type codes are views over the read-only
+    memory maps; only Date is materialized per process, since pandas has no
+    day-resolution datetime dtype to view the stored days through. String
+    columns come back as categoricals (as in compact_frame)."""
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest: dict[str, Any] = json.load(manifest_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No column store manifest at {manifest_path}")
+    if manifest.get("version") != COLUMN_STORE_VERSION:
+        raise ValueError(
+            f"Column store at {store_dir} has version {manifest.get('version')}, "
+            f"expected {COLUMN_STORE_VERSION}; rebuild it with build-store"
+        )
+
+    def mapped(file_name: str) -> np.ndarray[Any, Any]:
+        array: np.ndarray[Any, Any] = np.load(
+            os.path.join(store_dir, file_name), mmap_mode="r"
+        )
+        return array
+
+    columns: dict[str, Any] = {}
+    for entry in manifest["columns"]:
+        values = mapped(entry["file"])
+        if entry["encoding"] == "days":
+            columns[entry["name"]] = values.astype(entry["dtype"])
+        elif entry["encoding"] == "codes":
+            columns[entry["name"]] = pd.Categorical.from_codes(
+                values, entry["categories"]
+            )
+        else:
+            columns[entry["name"]] = values
+    frame = pd.DataFrame(columns, index=pd.Index(mapped(INDEX_FILE_NAME)), copy=False)
+
+    block_manifest = manifest["block_index"]
+    block_index = BlockIndex.from_parts(
+        order=mapped("block_order.npy"),
+        dates=mapped("block_dates.npy"),
+        regions=block_manifest["regions"],
+        avocado_types=block_manifest["avocado_types"],
+        blocks={
+            (region, avocado_type): (start, stop)
+            for region, avocado_type, start, stop in block_manifest["blocks"]
+        },
+    )
+    return frame, block_index
+
+
+# --- Streaming partition ingest --------------------------------------------
+#
+# For sources too large to hold in memory: the CSV is read in fixed-size
+# chunks and each chunk's rows are appended to one CSV file per (region,
+# type), so ingest memory is bounded by the chunk size plus per-partition
+# stats however large the input is. Queries then read only the partitions
+# they select (see PartitionStore), never the whole dataset.
+PARTITION_STORE_VERSION = 1
+DEFAULT_INGEST_CHUNK_ROWS = 100_000
+# Source row numbers are kept as the partition files' first column, so rows
+# read back from several partitions can be restored to source order.
+_ROW_LABEL = "_row"
+
+
+def ingest_partitions(
+    csv_path: str,
+    store_dir: str,
+    chunk_rows: int = DEFAULT_INGEST_CHUNK_ROWS,
+) -> dict[str, Any]:
+    """Stream `csv_path` into a partition store in `store_dir`, `chunk_rows`
+    rows at a time, and return the store's manifest. Partition files carry a
+    per-run prefix and the manifest is written last (then the previous
+    run's files removed), so a reader never sees a half-written store."""
+    columns = read_csv_header(csv_path)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            stale_files = [
+                entry["file"] for entry in json.load(manifest_file)["partitions"]
+            ]
+    except (OSError, ValueError, KeyError):
+        stale_files = []
+    prefix = os.urandom(8).hex()
+    partitions: dict[tuple[str, str], dict[str, Any]] = {}
+    dtypes: dict[str, str] = {}
+    rows = 0
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        chunk = chunk.assign(
+            Date=lambda df: pd.to_datetime(df["Date"], format="%Y-%m-%d")
+        )
+        chunk.index = pd.RangeIndex(rows, rows + len(chunk), name=_ROW_LABEL)
+        rows += len(chunk)
+        if not dtypes:
+            dtypes = {str(name): str(dtype) for name, dtype in chunk.dtypes.items()}
+        for (region, avocado_type), part in chunk.groupby(
+            ["region", "type"], sort=False
+        ):
+            key = (str(region), str(avocado_type))
+            entry = partitions.get(key)
+            if entry is None:
+                entry = partitions[key] = {
+                    "region": key[0],
+                    "type": key[1],
+                    "file": f"{prefix}.{len(partitions):04d}.csv",
+                    "rows": 0,
+                    "min_date": None,
+                    "max_date": None,
+                }
+            part.to_csv(
+                os.path.join(store_dir, entry["file"]),
+                mode="a",
+                header=entry["rows"] == 0,
+                date_format="%Y-%m-%d",
+            )
+            entry["rows"] += len(part)
+            dates = part["Date"].dropna()
+            if not dates.empty:
+                low = dates.min().date().isoformat()
+                high = dates.max().date().isoformat()
+                entry["min_date"] = min(filter(None, [entry["min_date"], low]))
+                entry["max_date"] = max(filter(None, [entry["max_date"], high]))
+
+    manifest = {
+        "version": PARTITION_STORE_VERSION,
+        "source": source_fingerprint(csv_path, with_hash=False),
+        "rows": rows,
+        "columns": columns,
+        "dtypes": dtypes,
+        "partitions": sorted(
+            partitions.values(), key=lambda entry: (entry["region"], entry["type"])
+        ),
+    }
+    _atomic_write_bytes(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+    # Only the previous run's partitions: the store may share its directory.
+    for file_name in stale_files:
+        try:
+            os.remove(os.path.join(store_dir, file_name))
+        except OSError:
+            pass
+    return manifest
+
+
+# Parsed partitions a PartitionStore keeps for later queries, by default.
+PARTITION_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _read_partition(path: str) -> pd.DataFrame:
+    frame = pd.read_csv(path, index_col=_ROW_LABEL)
+    frame["Date"] = pd.to_datetime(frame["Date"], format="%Y-%m-%d")
+    frame.index.name = None
+    return drop_superseded_rows(frame)
+
+
+class PartitionStore:
+    """Read side of a partition store written by ingest_partitions. Only the
+    manifest is loaded up front; `select` reads the partitions a query
+    touches (skipping those whose date span misses the range), so memory
+    follows the queries rather than the size of the dataset. Parsed
+    partitions are kept for later queries up to `cache_bytes` in all."""
+
+    def __init__(
+        self, store_dir: str, cache_bytes: int = PARTITION_CACHE_BYTES
+    ) -> None:
+        manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as manifest_file:
+                manifest: dict[str, Any] = json.load(manifest_file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No partition store manifest at {manifest_path}")
+        if manifest.get("version") != PARTITION_STORE_VERSION:
+            raise ValueError(
+                f"Partition store at {store_dir} has version "
+                f"{manifest.get('version')}, expected {PARTITION_STORE_VERSION}; "
+                "re-ingest it with ingest"
+            )
+        self.store_dir = store_dir
+        self.rows: int = manifest["rows"]
+        self.columns: list[str] = manifest["columns"]
+        self.dtypes: dict[str, str] = manifest["dtypes"]
+        self.partitions: dict[tuple[str, str], dict[str, Any]] = {
+            (entry["region"], entry["type"]): entry for entry in manifest["partitions"]
+        }
+        self.regions = sorted({region for region, _ in self.partitions})
+        self.avocado_types = sorted({kind for _, kind in self.partitions})
+        dated = [entry for entry in self.partitions.values() if entry["min_date"]]
+        self.min_date = min((entry["min_date"] for entry in dated), default=None)
+        self.max_date = max((entry["max_date"] for entry in dated), default=None)
+        # Keyed by file name, and every ingest run writes new file names, so
+        # a cached partition can never be stale.
+        self._cache: ResultCache[pd.DataFrame] = ResultCache(
+            max_entries=len(self.partitions),
+            max_bytes=cache_bytes,
+            sizeof=frame_memory_bytes,
+        )
+
+    def _empty_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {name: pd.Series(dtype=self.dtypes[name]) for name in self.columns}
+        )
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> pd.DataFrame:
+        """Rows whose region is in `regions`, type in `avocado_types` (None
+        meaning "all") and Date in [start_date, end_date] (None meaning
+        unbounded), ordered by Date and then source row."""
+        region_keys = self.regions if regions is None else regions
+        type_keys = self.avocado_types if avocado_types is None else avocado_types
+        first = None if start_date is None else pd.Timestamp(start_date)
+        last = None if end_date is None else pd.Timestamp(end_date)
+
+        pieces = []
+        for key in dict.fromkeys(
+            (region, kind) for region in region_keys for kind in type_keys
+        ):
+            entry = self.partitions.get(key)
+            if entry is None or entry["min_date"] is None:
+                continue
+            if (first is not None and pd.Timestamp(entry["max_date"]) < first) or (
+                last is not None and pd.Timestamp(entry["min_date"]) > last
+            ):
+                continue
+            path = os.path.join(self.store_dir, entry["file"])
+            part = self._cache.get_or_compute(
+                path, functools.partial(_read_partition, path)
+            )
+            mask = part["Date"].notna()
+            if first is not None:
+                mask &= part["Date"] >= first
+            if last is not None:
+                mask &= part["Date"] <= last
+            pieces.append(part[mask])
+        if not pieces:
+            return self._empty_frame()
+        return pd.concat(pieces).sort_index().sort_values("Date", kind="stable")
+
+    def read_all(self) -> pd.DataFrame:
+        """The whole dataset in memory — what a partition store exists to
+        avoid; for tooling and tests, not request paths."""
+        return self.select(None, None, None, None)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="datastore.py", description="Build on-disk formats of the dataset."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_store = commands.add_parser(
+        "build-store", help="Precompute a memory-mappable column store from a CSV."
+    )
+    build_store.add_argument("csv_path")
+    build_store.add_argument("store_dir")
+    build_metadata = commands.add_parser(
+        "build-metadata",
+        help="Write the metadata sidecar that lets the app start without "
+        "parsing the CSV.",
+    )
+    build_metadata.add_argument("csv_path")
+    append = commands.add_parser(
+        "append",
+        help="Validate a batch of new rows and append it to a source CSV.",
+    )
+    append.add_argument("csv_path")
+    append.add_argument("batch_path")
+    ingest = commands.add_parser(
+        "ingest",
+        help="Stream a CSV of any size into per-(region, type) partitions.",
+    )
+    ingest.add_argument("csv_path")
+    ingest.add_argument("store_dir")
+    ingest.add_argument("--chunk-rows", type=int, default=DEFAULT_INGEST_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if args.command == "build-store":
+        frame = parse_csv(args.csv_path)
+        write_column_store(frame, args.store_dir)
+        print(f"Wrote {len(frame)} rows to column store {args.store_dir}")
+    elif args.command == "build-metadata":
+        metadata = dataset_metadata(parse_csv(args.csv_path))
+        if not write_metadata_sidecar(args.csv_path, metadata):
+            raise SystemExit(1)
+        print(
+            f"Wrote metadata for {metadata['rows']} rows to "
+            f"{metadata_sidecar_path(args.csv_path)}"
+        )
+    elif args.command == "append":
+        # The history comes from the column cache when there is one, and the
+        # merged frame goes back into it, so neither this nor the next start
+        # parses the source.
+        history = read_column_cache(args.csv_path)
+        if history is None:
+            history = parse_csv(args.csv_path)
+        batch = read_batch(args.batch_path)
+        merged, _, result = merge_sorted_batch(history, BlockIndex(history), batch)
+        append_to_source(args.csv_path, batch, merged, dataset_metadata(merged))
+        print(
+            f"Appended {result.inserted} new and {result.replaced} replaced rows "
+            f"to {args.csv_path}"
+        )
+    elif args.command == "ingest":
+        manifest = ingest_partitions(args.csv_path, args.store_dir, args.chunk_rows)
+        print(
+            f"Wrote {manifest['rows']} rows in {len(manifest['partitions'])} "
+            f"partitions to {args.store_dir}"
+        )
+
+
+if __name__ == "__main__":
+    main()
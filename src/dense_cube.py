@@ -0,0 +1,157 @@
+# dense_cube.py
+"""The dataset as a dense date × region × type × metric array. The data is
+a regular weekly panel — one row per (Date, region, type), nearly every
+cell filled — so it fits a NumPy array with NaN in the cells no row fills.
+A date range is then a contiguous slice along the first axis, and one
+series a strided view, neither of which copies or scans anything; rows are
+only rebuilt (in the frame's own order and dtypes) when a caller needs the
+long frame, as filter_data and the CSV export do."""
+
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+Floats = np.ndarray[Any, np.dtype[np.float64]]
+Positions = np.ndarray[Any, np.dtype[np.intp]]
+
+KEY_COLUMNS = ("Date", "region", "type")
+
+
+class DenseCube:
+    """`values[date, region, type, metric]` for every column of a frame
+    besides its Date/region/type keys (the metrics, all numeric), along
+    axes of its sorted distinct dates, regions and types; `rows` holds the
+    frame position of each cell's row, or -1 for an empty cell. Rows
+    missing a key have no cell and are left out, as every filter leaves
+    them out. Raises ValueError when two rows share a (Date, region, type)
+    cell, or a metric isn't numeric."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.columns: list[str] = list(frame.columns)
+        self.dtypes: dict[str, Any] = dict(frame.dtypes)
+        self.metrics: list[str] = [
+            column for column in self.columns if column not in KEY_COLUMNS
+        ]
+        for column in self.metrics:
+            if not pd.api.types.is_numeric_dtype(self.dtypes[column]):
+                raise ValueError(f"Column {column!r} isn't numeric; cannot cube it")
+
+        date_codes, date_values = pd.factorize(frame["Date"], sort=True)
+        region_codes, region_values = pd.factorize(frame["region"], sort=True)
+        type_codes, type_values = pd.factorize(frame["type"], sort=True)
+        self.dates = np.asarray(date_values, dtype="datetime64[us]")
+        self.regions: list[str] = [str(region) for region in region_values]
+        self.avocado_types: list[str] = [str(kind) for kind in type_values]
+        self.region_codes = {region: code for code, region in enumerate(self.regions)}
+        self.type_codes = {kind: code for code, kind in enumerate(self.avocado_types)}
+        self.metric_codes = {metric: code for code, metric in enumerate(self.metrics)}
+        self._region_values = np.asarray(region_values, dtype=object)
+        self._type_values = np.asarray(type_values, dtype=object)
+        self.index = frame.index
+
+        shape = (len(self.dates), len(self.regions), len(self.avocado_types))
+        keyed = np.flatnonzero(
+            (date_codes >= 0) & (region_codes >= 0) & (type_codes >= 0)
+        )
+        cells = np.ravel_multi_index(
+            (date_codes[keyed], region_codes[keyed], type_codes[keyed]), shape
+        )
+        size = int(np.prod(shape))
+        if len(np.unique(cells)) != len(cells):
+            raise ValueError("Rows repeat a (Date, region, type); cannot cube them")
+
+        rows = np.full(size, -1, dtype=np.intp)
+        rows[cells] = keyed
+        self.rows: Positions = rows.reshape(shape)
+        values = np.full((size, len(self.metrics)), np.nan)
+        values[cells] = frame[self.metrics].to_numpy(dtype=np.float64, na_value=np.nan)[
+            keyed
+        ]
+        self.values: Floats = values.reshape(shape + (len(self.metrics),))
+
+    @property
+    def fill_ratio(self) -> float:
+        """The share of cells holding a row."""
+        return float((self.rows >= 0).mean()) if self.rows.size else 0.0
+
+    def span(self, start_date: Any, end_date: Any) -> slice:
+        """The date positions within the inclusive date range — None means
+        unbounded."""
+        first, last = 0, len(self.dates)
+        if start_date is not None:
+            first = int(np.searchsorted(self.dates, _stamp(start_date), side="left"))
+        if end_date is not None:
+            last = int(np.searchsorted(self.dates, _stamp(end_date), side="right"))
+        return slice(first, max(first, last))
+
+    def window(self, start_date: Any, end_date: Any) -> Floats:
+        """Every cell within the date range: a view, not a copy."""
+        return self.values[self.span(start_date, end_date)]
+
+    def series(
+        self,
+        region: str,
+        avocado_type: str,
+        metric: str,
+        start_date: Any = None,
+        end_date: Any = None,
+    ) -> Floats:
+        """One (region, type)'s `metric` along the date range, NaN where it
+        has no row: a view, not a copy. KeyError for an unknown region, type
+        or metric."""
+        return self.values[
+            self.span(start_date, end_date),
+            self.region_codes[region],
+            self.type_codes[avocado_type],
+            self.metric_codes[metric],
+        ]
+
+    def _codes(self, values: Iterable[str] | None, codes: dict[str, int]) -> list[int]:
+        if values is None:
+            return list(codes.values())
+        return sorted({codes[value] for value in values if value in codes})
+
+    def select(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> pd.DataFrame:
+        """The long frame of the cells matching the given regions, types and
+        inclusive date range — the rows, columns, dtypes, order and index
+        labels the source frame has for them. None for `regions` or
+        `avocado_types` means "all", and None for a date means unbounded."""
+        span = self.span(start_date, end_date)
+        region_codes = self._codes(regions, self.region_codes)
+        type_codes = self._codes(avocado_types, self.type_codes)
+        block: tuple[Any, ...] = (span, *np.ix_(region_codes, type_codes))
+        rows = self.rows[block]
+        filled = rows >= 0
+        positions = rows[filled]
+        # Cells come out date-major; the frame's order is its row order.
+        order = np.argsort(positions, kind="stable")
+        dates, regions_at, types_at = (axis[order] for axis in np.nonzero(filled))
+        values = self.values[block][filled][order]
+
+        columns: dict[str, Any] = {}
+        for column in self.columns:
+            if column == "Date":
+                raw: Any = self.dates[span][dates]
+            elif column == "region":
+                raw = self._region_values[
+                    np.asarray(region_codes, dtype=np.intp)[regions_at]
+                ]
+            elif column == "type":
+                raw = self._type_values[np.asarray(type_codes, dtype=np.intp)[types_at]]
+            else:
+                raw = values[:, self.metric_codes[column]]
+            columns[column] = pd.array(raw).astype(self.dtypes[column])
+        return pd.DataFrame(columns, index=self.index[positions[order]], copy=False)
+
+
+def _stamp(value: Any) -> Any:
+    """A date bound at the resolution of the cube's datetime64[us] axis."""
+    return pd.Timestamp(value).as_unit("us").to_datetime64()
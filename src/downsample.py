@@ -0,0 +1,114 @@
+# downsample.py
+"""Largest-Triangle-Three-Buckets (LTTB) downsampling for line charts: a
+series longer than the chart is wide is cut to about one point per pixel
+while keeping its visual shape — each bucket of points is represented by
+the one forming the largest triangle with its neighbours' picks, so peaks
+and troughs survive where plain decimation would skip them."""
+
+from typing import Any
+
+import numpy as np
+
+Positions = np.ndarray[Any, np.dtype[np.intp]]
+
+
+def lttb_indices(
+    xs: list[np.ndarray[Any, Any]],
+    ys: list[np.ndarray[Any, Any]],
+    max_points: int,
+    keep: list[np.ndarray[Any, Any]] | None = None,
+) -> list[Positions]:
+    """For each series (xs[i], ys[i]), with x ascending (numbers or
+    datetimes), the sorted positions of the points LTTB keeps to draw it in
+    `max_points` (at least 3): the first and last points, plus one per
+    bucket of the rest. Positions where `keep[i]` is True are never
+    dropped: they are reserved first and LTTB picks the rest within what
+    is left of the budget, so a series exceeds `max_points` only when its
+    kept points (plus the endpoints LTTB needs) don't fit in it alone. A
+    series within the budget keeps every point.
+
+    LTTB is sequential — each bucket's pick depends on the previous one —
+    so the loop runs over bucket number, once, and each step picks that
+    bucket's point in every series at once (in one batch per distinct
+    remaining budget)."""
+    if max_points < 3:
+        raise ValueError(f"max_points must be at least 3, got {max_points}")
+    picked: list[Positions] = [np.arange(len(x), dtype=np.intp) for x in xs]
+    kept: list[Positions] = [
+        np.flatnonzero(keep[i]) if keep is not None else np.empty(0, dtype=np.intp)
+        for i in range(len(xs))
+    ]
+    budgets: dict[int, list[int]] = {}
+    for i, x in enumerate(xs):
+        if len(x) > max_points:
+            budget = max(max_points - len(kept[i]), 3)
+            budgets.setdefault(budget, []).append(i)
+    for budget, series in budgets.items():
+        chosen = _lttb(
+            [np.asarray(xs[i]).astype(np.float64) for i in series],
+            [np.asarray(ys[i], dtype=np.float64) for i in series],
+            budget,
+        )
+        for i, positions in zip(series, chosen):
+            picked[i] = np.union1d(positions, kept[i]).astype(np.intp)
+    return picked
+
+
+def _lttb(
+    xs: list[np.ndarray[Any, Any]], ys: list[np.ndarray[Any, Any]], max_points: int
+) -> list[Positions]:
+    """LTTB picks for series all longer than `max_points`, batched: the
+    buckets of every series are laid out in one (series, bucket, slot)
+    array, padded where a series' buckets are narrower."""
+    buckets = max_points - 2
+    # Bucket b of a series of n points holds positions [edges[b], edges[b+1])
+    # of its n - 2 inner points (1 to n - 2).
+    edges = np.stack(
+        [np.floor(np.linspace(1, len(x) - 1, buckets + 1)).astype(np.intp) for x in xs]
+    )
+    widths = np.diff(edges, axis=1)
+    slots = np.arange(widths.max())
+    positions = edges[:, :-1, None] + slots
+    padding = slots >= widths[:, :, None]
+    positions[padding] = 0
+
+    x = np.full(positions.shape, np.nan)
+    y = np.full(positions.shape, np.nan)
+    for series in range(len(xs)):
+        x[series] = xs[series][positions[series]]
+        y[series] = ys[series][positions[series]]
+    x[padding] = np.nan
+    y[padding] = np.nan
+
+    # Each bucket's pick is weighed against the next bucket's average point
+    # (the last point, for the last bucket). A bucket of missing values
+    # averages to NaN and keeps one of them, so the line keeps its gap.
+    valid = ~np.isnan(y)
+    present = valid.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(valid, x, 0).sum(axis=2) / present
+        mean_y = np.where(valid, y, 0).sum(axis=2) / present
+    next_x = np.column_stack([mean_x[:, 1:], [series[-1] for series in xs]])
+    next_y = np.column_stack([mean_y[:, 1:], [series[-1] for series in ys]])
+
+    rows = np.arange(len(xs))
+    anchor_x = np.array([series[0] for series in xs])
+    anchor_y = np.array([series[0] for series in ys])
+    picks = np.empty((len(xs), buckets), dtype=np.intp)
+    for bucket in range(buckets):
+        bucket_x = x[:, bucket]
+        bucket_y = y[:, bucket]
+        areas = np.abs(
+            (anchor_x - next_x[:, bucket])[:, None] * (bucket_y - anchor_y[:, None])
+            - (anchor_x[:, None] - bucket_x) * (next_y[:, bucket] - anchor_y)[:, None]
+        )
+        # Padding and missing values never win over a real point.
+        best = np.argmax(np.nan_to_num(areas, nan=-1.0), axis=1)
+        picks[:, bucket] = positions[rows, bucket, best]
+        anchor_x = bucket_x[rows, best]
+        anchor_y = bucket_y[rows, best]
+
+    return [
+        np.concatenate([[0], picks[series], [len(xs[series]) - 1]]).astype(np.intp)
+        for series in range(len(xs))
+    ]
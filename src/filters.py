@@ -0,0 +1,95 @@
+# filters.py
+"""Canonical filter state. Callbacks receive the filter bar's values as
+loose arguments — regions in selection order, dates as strings, possibly
+outside the data — and many different combinations select exactly the same
+rows. FilterSpec normalizes them into one hashable value per distinct
+selection, for keying shared caches."""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# A dataset's sorted distinct Dates, at day resolution.
+Dates = np.ndarray[Any, np.dtype[np.datetime64]]
+
+
+@dataclass(frozen=True, slots=True)
+class FilterSpec:
+    """Regions and types as sorted, de-duplicated tuples (None: all of
+    them) and an inclusive date range clamped to the data's bounds and,
+    where the data's dates are known, snapped inward to them. Equal
+    selections compare and hash equal. A range covering no date of the
+    data has `start_date > end_date`."""
+
+    regions: tuple[str, ...] | None
+    avocado_types: tuple[str, ...] | None
+    start_date: date
+    end_date: date
+
+    @classmethod
+    def build(
+        cls,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: Any,
+        end_date: Any,
+        min_date: date,
+        max_date: date,
+        dates: Dates | None = None,
+    ) -> "FilterSpec":
+        """Normalize filter values against data spanning `min_date` to
+        `max_date`, whose sorted distinct `dates` (when given) the range
+        snaps to: its start up to the first of them on or after it, its
+        end down to the last on or before it. Without them the range is
+        only clamped. A missing date means unbounded."""
+        start = min_date if start_date is None else pd.Timestamp(start_date).date()
+        end = max_date if end_date is None else pd.Timestamp(end_date).date()
+        start = max(start, min_date)
+        end = min(end, max_date)
+        if dates is not None:
+            first = int(np.searchsorted(dates, np.datetime64(start, "D"), "left"))
+            last = int(np.searchsorted(dates, np.datetime64(end, "D"), "right")) - 1
+            # Past the last date (or before the first) the range is empty
+            # already, and stays as clamped.
+            if first < len(dates):
+                start = dates[first].item()
+            if last >= 0:
+                end = dates[last].item()
+        return cls(
+            regions=_canonical(regions),
+            avocado_types=_canonical(avocado_types),
+            start_date=start,
+            end_date=end,
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the spec can match no rows, whatever the data."""
+        return (
+            self.regions == ()
+            or self.avocado_types == ()
+            or self.start_date > self.end_date
+        )
+
+    def digest(self) -> str:
+        """A hash of the spec that is stable across processes (the builtin
+        hash of its strings is salted per process), for logs and keys
+        shared between workers."""
+        payload = json.dumps(
+            [
+                self.regions,
+                self.avocado_types,
+                self.start_date.isoformat(),
+                self.end_date.isoformat(),
+            ]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _canonical(values: list[str] | None) -> tuple[str, ...] | None:
+    return None if values is None else tuple(sorted(set(values)))
@@ -0,0 +1,376 @@
+# kpi_index.py
+"""Prefix sums of the summary panel's aggregates per (region, type) over
+the dataset's date axis, built once per dataset, so every KPI card for any
+date range — the summary stats, the change against the preceding period
+and the best/worst region ranking — comes from a few array lookups per
+(region, type) pair instead of a scan of the rows.
+
+Sums and counts are differences of cumulative sums; minimum and maximum,
+which don't subtract, come from sparse tables (the extreme of each
+power-of-two run of dates), so any range is covered by two overlapping
+runs. Results match utils.calculate_summary_stats, calculate_price_change
+and find_region_extremes to floating-point rounding."""
+
+import copy
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+Floats = np.ndarray[Any, np.dtype[np.float64]]
+Positions = np.ndarray[Any, np.dtype[np.intp]]
+
+# Relative difference below which two regions' averages count as equal: far
+# above the rounding error of a difference of prefix sums, far below any
+# real gap between two average prices.
+TIE_TOLERANCE = 1e-9
+
+
+class KpiIndex:
+    """Cumulative price sum, price count, row count and volume sum of each
+    (region, type) pair along the frame's sorted distinct Dates, plus
+    min/max price sparse tables over the same axis. The axis is the
+    distinct dates themselves (weekly, for this dataset), so any date
+    bounds resolve exactly by binary search. Rows missing a region, type
+    or Date are left out, as every filter leaves them out."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        region_codes, region_values = pd.factorize(frame["region"], sort=True)
+        type_codes, type_values = pd.factorize(frame["type"], sort=True)
+        date_codes, date_values = pd.factorize(frame["Date"], sort=True)
+        self.regions: list[str] = [str(region) for region in region_values]
+        self.avocado_types: list[str] = [str(kind) for kind in type_values]
+        self.dates = np.asarray(date_values, dtype="datetime64[us]")
+
+        shape = (len(self.regions), len(self.avocado_types), len(self.dates))
+        cells = _per_date_cells(frame, region_codes, type_codes, date_codes, shape)
+        self.price_sum = _cumulative(cells["price_sum"])
+        self.price_count = _cumulative(cells["price_count"])
+        self.row_count = _cumulative(cells["rows"])
+        self.volume_sum = _cumulative(cells["volume_sum"])
+        self.price_min = _sparse_table(cells["price_min"], np.minimum)
+        self.price_max = _sparse_table(cells["price_max"], np.maximum)
+
+        # For date_range: per pair, the first date position holding rows at
+        # or after each position, and the last one before it.
+        positions = np.arange(len(self.dates))
+        present = cells["rows"] > 0
+        after = np.where(present, positions, len(self.dates))
+        self.next_row: Positions = np.concatenate(
+            [
+                np.minimum.accumulate(after[..., ::-1], axis=-1)[..., ::-1],
+                np.full(shape[:2] + (1,), len(self.dates)),
+            ],
+            axis=-1,
+        ).astype(np.intp)
+        before = np.where(present, positions, -1)
+        self.last_row: Positions = np.concatenate(
+            [np.full(shape[:2] + (1,), -1), np.maximum.accumulate(before, axis=-1)],
+            axis=-1,
+        ).astype(np.intp)
+
+    def extended(self, batch: pd.DataFrame) -> "KpiIndex | None":
+        """This index with `batch`'s rows added, built from the batch alone
+        — or None when that can't be done and the merged frame needs a
+        KpiIndex of its own: when the batch holds a region or type this
+        index hasn't got, or a Date not after its last one (a batch of the
+        weeks after the data, the usual append, never does)."""
+        keyed = batch[["region", "type", "Date"]].notna().all(axis=1).to_numpy()
+        batch = batch[keyed]
+        if not (
+            batch["region"].isin(self.regions).all()
+            and batch["type"].isin(self.avocado_types).all()
+        ):
+            return None
+        if len(self.dates) and (batch["Date"] <= self.dates[-1]).any():
+            return None
+        date_codes, date_values = pd.factorize(batch["Date"], sort=True)
+        region_codes = pd.Categorical(batch["region"], categories=self.regions).codes
+        type_codes = pd.Categorical(batch["type"], categories=self.avocado_types).codes
+        shape = (len(self.regions), len(self.avocado_types), len(date_values))
+        cells = _per_date_cells(batch, region_codes, type_codes, date_codes, shape)
+
+        index = copy.copy(self)
+        index.dates = np.concatenate(
+            [self.dates, np.asarray(date_values, dtype="datetime64[us]")]
+        )
+        index.price_sum = _extend_cumulative(self.price_sum, cells["price_sum"])
+        index.price_count = _extend_cumulative(self.price_count, cells["price_count"])
+        index.row_count = _extend_cumulative(self.row_count, cells["rows"])
+        index.volume_sum = _extend_cumulative(self.volume_sum, cells["volume_sum"])
+        index.price_min = _extend_sparse_table(
+            self.price_min, cells["price_min"], np.minimum
+        )
+        index.price_max = _extend_sparse_table(
+            self.price_max, cells["price_max"], np.maximum
+        )
+
+        old, total = len(self.dates), len(index.dates)
+        positions = np.arange(old, total)
+        present = cells["rows"] > 0
+        after = np.where(present, positions, total)
+        next_new = np.concatenate(
+            [
+                np.minimum.accumulate(after[..., ::-1], axis=-1)[..., ::-1],
+                np.full(present.shape[:2] + (1,), total),
+            ],
+            axis=-1,
+        )
+        # Positions that had no rows after them now point into the batch.
+        next_old = self.next_row[..., :old]
+        index.next_row = np.concatenate(
+            [np.where(next_old == old, next_new[..., :1], next_old), next_new],
+            axis=-1,
+        ).astype(np.intp)
+        before = np.where(present, positions, -1)
+        last_new = np.maximum.accumulate(
+            np.concatenate([self.last_row[..., -1:], before], axis=-1), axis=-1
+        )
+        index.last_row = np.concatenate(
+            [self.last_row, last_new[..., 1:]], axis=-1
+        ).astype(np.intp)
+        return index
+
+    def _codes(self, values: Iterable[str] | None, known: list[str]) -> list[int]:
+        if values is None:
+            return list(range(len(known)))
+        codes = {value: code for code, value in enumerate(known)}
+        return sorted({codes[value] for value in values if value in codes})
+
+    def _span(self, start_date: Any, end_date: Any) -> tuple[int, int]:
+        """[first, last) date positions within the inclusive date range."""
+        first, last = 0, len(self.dates)
+        if start_date is not None:
+            first = int(np.searchsorted(self.dates, _stamp(start_date), side="left"))
+        if end_date is not None:
+            last = int(np.searchsorted(self.dates, _stamp(end_date), side="right"))
+        return first, max(first, last)
+
+    def _totals(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        first: int,
+        last: int,
+    ) -> tuple[list[int], list[int], dict[str, Floats]]:
+        """The selected region and type codes, and each cumulative array's
+        (region, type) totals over positions [first, last)."""
+        region_codes = self._codes(regions, self.regions)
+        type_codes = self._codes(avocado_types, self.avocado_types)
+        pairs = np.ix_(region_codes, type_codes)
+        totals = {
+            name: cumulative[pairs + (last,)] - cumulative[pairs + (first,)]
+            for name, cumulative in (
+                ("price_sum", self.price_sum),
+                ("price_count", self.price_count),
+                ("rows", self.row_count),
+                ("volume_sum", self.volume_sum),
+            )
+        }
+        return region_codes, type_codes, totals
+
+    def _extreme(
+        self,
+        table: list[Floats],
+        reduce: Any,
+        region_codes: list[int],
+        type_codes: list[int],
+        first: int,
+        last: int,
+    ) -> Floats:
+        """Per selected (region, type) pair, the min or max (by `reduce`)
+        price over the non-empty positions [first, last): the two
+        overlapping power-of-two runs covering it."""
+        pairs = np.ix_(region_codes, type_codes)
+        level = (last - first).bit_length() - 1
+        runs = table[level]
+        extremes: Floats = reduce(
+            runs[pairs + (first,)], runs[pairs + (last - (1 << level),)]
+        )
+        return extremes
+
+    def summary_stats(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> dict[str, Any] | None:
+        """utils.calculate_summary_stats of the matching rows, or None when
+        no row matches. None for `regions`/`avocado_types` means "all", and
+        None for a date means unbounded."""
+        first, last = self._span(start_date, end_date)
+        region_codes, type_codes, totals = self._totals(
+            regions, avocado_types, first, last
+        )
+        if totals["rows"].sum() == 0:
+            return None
+        pairs = np.ix_(region_codes, type_codes)
+        low = self._extreme(
+            self.price_min, np.minimum, region_codes, type_codes, first, last
+        ).min()
+        high = self._extreme(
+            self.price_max, np.maximum, region_codes, type_codes, first, last
+        ).max()
+        count = totals["price_count"].sum()
+        return {
+            "avg_price": totals["price_sum"].sum() / count if count else np.nan,
+            "max_price": high if np.isfinite(high) else np.nan,
+            "min_price": low if np.isfinite(low) else np.nan,
+            "total_volume": totals["volume_sum"].sum(),
+            "date_range": {
+                "start": pd.Timestamp(
+                    self.dates[self.next_row[pairs + (first,)].min()]
+                ),
+                "end": pd.Timestamp(self.dates[self.last_row[pairs + (last,)].max()]),
+            },
+        }
+
+    def _average(
+        self, regions: Iterable[str], avocado_type: str, start: Any, end: Any
+    ) -> tuple[float, float] | None:
+        """(sum, count) of the prices of the matching rows, or None when no
+        row matches."""
+        _, _, totals = self._totals(regions, [avocado_type], *self._span(start, end))
+        if totals["rows"].sum() == 0:
+            return None
+        return float(totals["price_sum"].sum()), float(totals["price_count"].sum())
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None:
+        """utils.calculate_price_change: percent change in average price
+        against the preceding period of equal length."""
+        start = pd.to_datetime(start_date)
+        end = pd.to_datetime(end_date)
+        period_length_days = (end - start).days + 1
+        previous_start = start - timedelta(days=period_length_days)
+        previous_end = start - timedelta(days=1)
+
+        current = self._average(regions, avocado_type, start, end)
+        previous = self._average(regions, avocado_type, previous_start, previous_end)
+        if current is None or previous is None:
+            return None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            previous_avg = np.float64(previous[0]) / previous[1]
+            current_avg = np.float64(current[0]) / current[1]
+        if previous_avg == 0:
+            return None
+        return float((current_avg - previous_avg) / previous_avg * 100)
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None:
+        """utils.find_region_extremes: the regions with the highest and
+        lowest average price (the first in region order, on a tie), or None
+        when no row matches."""
+        _, _, totals = self._totals(
+            None, [avocado_type], *self._span(start_date, end_date)
+        )
+        rows = totals["rows"][:, 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = totals["price_sum"][:, 0] / totals["price_count"][:, 0]
+        # Regions without rows are out; regions whose prices are all missing
+        # have no average to rank, as idxmax/idxmin skip NaN.
+        ranked = np.flatnonzero((rows > 0) & ~np.isnan(averages))
+        if len(ranked) == 0:
+            return None
+        # Averages a rounding error apart are a tie, which idxmax/idxmin
+        # settle on the first region.
+        candidates = averages[ranked]
+        tolerance = TIE_TOLERANCE * np.abs(candidates).max()
+        best = ranked[np.argmax(candidates >= candidates.max() - tolerance)]
+        worst = ranked[np.argmax(candidates <= candidates.min() + tolerance)]
+        return {
+            "best_region": self.regions[best],
+            "best_price": averages[best],
+            "worst_region": self.regions[worst],
+            "worst_price": averages[worst],
+        }
+
+
+def _stamp(value: Any) -> Any:
+    """A date bound at the resolution of the index's datetime64[us] axis."""
+    return pd.Timestamp(value).as_unit("us").to_datetime64()
+
+
+def _per_date_cells(
+    frame: pd.DataFrame,
+    region_codes: Any,
+    type_codes: Any,
+    date_codes: Any,
+    shape: tuple[int, int, int],
+) -> dict[str, Floats]:
+    """Per (region, type, date) cell of a `shape` array, the row count,
+    price sum, price count, volume sum and min/max price (±inf where none
+    is priced) of `frame`'s rows at those codes; -1 codes are left out."""
+    keyed = (region_codes >= 0) & (type_codes >= 0) & (date_codes >= 0)
+    cells = np.ravel_multi_index(
+        (region_codes[keyed], type_codes[keyed], date_codes[keyed]), shape
+    )
+    size = int(np.prod(shape))
+    prices = frame["AveragePrice"].to_numpy(dtype=float, na_value=np.nan)[keyed]
+    volumes = frame["Total Volume"].to_numpy(dtype=float, na_value=np.nan)[keyed]
+    priced = ~np.isnan(prices)
+
+    def per_date(weights: Any) -> Floats:
+        counts = np.bincount(cells, weights=weights, minlength=size)
+        return counts.astype(np.float64).reshape(shape)
+
+    low = np.full(size, np.inf)
+    high = np.full(size, -np.inf)
+    np.minimum.at(low, cells[priced], prices[priced])
+    np.maximum.at(high, cells[priced], prices[priced])
+    return {
+        "rows": per_date(None),
+        "price_sum": per_date(np.where(priced, prices, 0.0)),
+        "price_count": per_date(priced.astype(np.float64)),
+        "volume_sum": per_date(np.nan_to_num(volumes, nan=0.0)),
+        "price_min": low.reshape(shape),
+        "price_max": high.reshape(shape),
+    }
+
+
+def _cumulative(per_date: Floats) -> Floats:
+    """Cumulative sums along the date axis, with a leading 0, so the total
+    over positions [first, last) is cumulative[last] - cumulative[first]."""
+    padded = np.zeros(per_date.shape[:-1] + (per_date.shape[-1] + 1,))
+    np.cumsum(per_date, axis=-1, out=padded[..., 1:])
+    return padded
+
+
+def _extend_cumulative(cumulative: Floats, per_date: Floats) -> Floats:
+    """`cumulative` (see _cumulative) continued over `per_date`'s dates."""
+    tail = cumulative[..., -1:] + np.cumsum(per_date, axis=-1)
+    return np.concatenate([cumulative, tail], axis=-1)
+
+
+def _sparse_table(values: Floats, reduce: Any) -> list[Floats]:
+    """table[k][..., i] is the `reduce` of values[..., i : i + 2**k]."""
+    table = [values]
+    width = 1
+    while 2 * width <= values.shape[-1]:
+        previous = table[-1]
+        table.append(reduce(previous[..., :-width], previous[..., width:]))
+        width *= 2
+    return table
+
+
+def _extend_sparse_table(
+    table: list[Floats], values: Floats, reduce: Any
+) -> list[Floats]:
+    """`table` (see _sparse_table) over its values followed by `values`:
+    only the runs reaching into the new values are computed."""
+    extended = [np.concatenate([table[0], values], axis=-1)]
+    width = 1
+    while 2 * width <= extended[0].shape[-1]:
+        previous = extended[-1]
+        level = len(extended)
+        known = table[level] if level < len(table) else previous[..., :0]
+        start = known.shape[-1]
+        tail = reduce(previous[..., start:-width], previous[..., start + width :])
+        extended.append(np.concatenate([known, tail], axis=-1))
+        width *= 2
+    return extended
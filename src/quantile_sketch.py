@@ -0,0 +1,512 @@
+# quantile_sketch.py
+"""Mergeable quantile sketches, and an index of them per (region, type,
+date) built once per dataset, so distribution queries over any filter
+selection — box plots, medians, percentiles — merge the selected dates'
+sketches instead of gathering and sorting the selected rows.
+
+The sketch is a relative-error one (as in DDSketch): values fall into
+logarithmic bins whose width is set by the relative accuracy α, and a bin
+stands for all of its values. Any quantile it reports is within α
+(relative) of the exact value at that rank, sketches with the same α merge
+exactly by adding bin counts, and their size grows with the range of
+magnitudes rather than the number of values."""
+
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+Bins = np.ndarray[Any, np.dtype[np.int64]]
+Counts = np.ndarray[Any, np.dtype[np.int64]]
+Floats = np.ndarray[Any, np.dtype[np.float64]]
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+@dataclass(frozen=True)
+class LogMapping:
+    """Maps values to integer bins and back. A positive value v falls in bin
+    ceil(log_γ v) with γ = (1 + α) / (1 - α), whose representative value is
+    within α of every value in it; zero has a bin of its own, and negative
+    values mirror the positive ones below it, so bin order is value order."""
+
+    relative_accuracy: float
+
+    def __post_init__(self) -> None:
+        if not 0 < self.relative_accuracy < 1:
+            raise ValueError(
+                f"relative_accuracy must be in (0, 1), got {self.relative_accuracy}"
+            )
+
+    @property
+    def gamma(self) -> float:
+        return (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+
+    @property
+    def _offset(self) -> int:
+        # Shifts every finite positive value's log bin to 1 or above, even
+        # the smallest subnormal's, leaving 0 for zero.
+        return math.ceil(-math.log(5e-324) / math.log(self.gamma)) + 1
+
+    def bins(self, values: np.ndarray[Any, Any]) -> Bins:
+        """The bin of each (finite) value."""
+        values = np.asarray(values, dtype=float)
+        magnitudes = np.abs(values)
+        nonzero = magnitudes > 0
+        logs = np.zeros(len(values))
+        logs[nonzero] = np.ceil(np.log(magnitudes[nonzero]) / math.log(self.gamma))
+        signs = np.sign(values).astype(np.int64)
+        bins: Bins = (logs.astype(np.int64) + self._offset) * signs
+        return bins
+
+    def values(self, bins: Bins) -> Floats:
+        """Each bin's representative value: the point of the bin's interval
+        (γ^(k-1), γ^k] within α of both ends."""
+        bins = np.asarray(bins, dtype=np.int64)
+        exponents = np.abs(bins) - self._offset
+        gamma = self.gamma
+        magnitudes = 2 * np.power(gamma, exponents.astype(float)) / (gamma + 1)
+        return np.where(bins == 0, 0.0, np.sign(bins) * magnitudes)
+
+
+@dataclass(frozen=True)
+class QuantileSketch:
+    """A merged distribution: the count of values in each (ascending) bin,
+    plus their exact sum, for the mean."""
+
+    mapping: LogMapping
+    bins: Bins
+    counts: Counts
+    total: float
+
+    @classmethod
+    def from_values(
+        cls,
+        values: Iterable[float],
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    ) -> "QuantileSketch":
+        """Sketch of the finite values among `values` (NaN are skipped)."""
+        mapping = LogMapping(relative_accuracy)
+        points = np.fromiter(values, dtype=float)
+        points = points[np.isfinite(points)]
+        bins, counts = np.unique(mapping.bins(points), return_counts=True)
+        return cls(mapping, bins, counts.astype(np.int64), float(points.sum()))
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """The sketch of both sketches' values together."""
+        if other.mapping != self.mapping:
+            raise ValueError(
+                "Cannot merge sketches of different relative accuracy: "
+                f"{self.mapping.relative_accuracy} and "
+                f"{other.mapping.relative_accuracy}"
+            )
+        bins, inverse = np.unique(
+            np.concatenate([self.bins, other.bins]), return_inverse=True
+        )
+        counts = np.bincount(
+            inverse, weights=np.concatenate([self.counts, other.counts])
+        )
+        return QuantileSketch(
+            self.mapping, bins, counts.astype(np.int64), self.total + other.total
+        )
+
+    def values_at(self, ranks: np.ndarray[Any, Any]) -> Floats:
+        """The (representative) values at 0-based `ranks` in sorted order."""
+        ends = np.cumsum(self.counts)
+        positions = np.searchsorted(ends, np.asarray(ranks), side="right")
+        return self.mapping.values(self.bins[positions])
+
+    def quantiles(self, qs: Iterable[float], method: str = "lower") -> Floats:
+        """The `qs` quantiles, with numpy's `method` "lower" (the value at
+        rank floor(q(n-1))) or "hazen" (interpolated at rank nq - 1/2, the
+        one Plotly's box plots use). Each is within the relative accuracy of
+        the exact quantile of the sketched values by the same method."""
+        n = self.count
+        if not n:
+            raise ValueError("Cannot take quantiles of an empty sketch")
+        qs = np.asarray(list(qs), dtype=float)
+        if method == "lower":
+            return self.values_at(np.floor(qs * (n - 1)).astype(np.int64))
+        if method != "hazen":
+            raise ValueError(f"Unknown quantile method: {method!r}")
+        ranks = np.clip(qs * n - 0.5, 0, n - 1)
+        low = np.floor(ranks).astype(np.int64)
+        below = self.values_at(low)
+        above = self.values_at(np.ceil(ranks).astype(np.int64))
+        return below + (ranks - low) * (above - below)
+
+    def quantile(self, q: float, method: str = "lower") -> float:
+        return float(self.quantiles([q], method)[0])
+
+    def box(self) -> dict[str, Any]:
+        """A box plot's statistics as Plotly computes them from the values
+        (see app._box_summary), from the sketch: Hazen quartiles, fences at
+        the outermost bins within 1.5 IQR of them, the exact mean, and the
+        bins beyond the fences as outliers — each bin's representative value
+        repeated once per value in it."""
+        q1, median, q3 = self.quantiles([0.25, 0.5, 0.75], method="hazen")
+        points = self.mapping.values(self.bins)
+        low = np.searchsorted(points, q1 - 1.5 * (q3 - q1), side="left")
+        high = np.searchsorted(points, q3 + 1.5 * (q3 - q1), side="right") - 1
+        lowerfence = min(q1, points[min(low, len(points) - 1)])
+        upperfence = max(q3, points[max(high, 0)])
+        beyond = (points < lowerfence) | (points > upperfence)
+        return {
+            "q1": float(q1),
+            "median": float(median),
+            "q3": float(q3),
+            "lowerfence": float(lowerfence),
+            "upperfence": float(upperfence),
+            "mean": self.mean,
+            "outliers": np.repeat(points[beyond], self.counts[beyond]).tolist(),
+        }
+
+
+@dataclass(frozen=True)
+class _ColumnSketches:
+    """One column's sketches for every group of one level, stored like a
+    sparse matrix: group g's bins and counts are `bins[starts[g]:starts[g +
+    1]]`, and `sums[g]` is its values' sum."""
+
+    bins: Bins
+    counts: Counts
+    starts: Bins
+    sums: Floats
+
+    def merged(self, parents: Bins, parent_count: int) -> "_ColumnSketches":
+        """The sketches of `parent_count` groups, each merging the groups
+        `parents` maps to it."""
+        entry_groups = np.repeat(parents, np.diff(self.starts))
+        return _sketch_groups(
+            entry_groups, self.bins, self.counts, self.sums, parents, parent_count
+        )
+
+
+def _sketch_groups(
+    entry_groups: Bins,
+    bins: Bins,
+    counts: Counts,
+    sums: Floats,
+    sum_groups: Bins,
+    group_count: int,
+) -> _ColumnSketches:
+    """Adds up the `counts` of equal (group, bin) entries and the `sums`
+    falling in each group, into the sketches of `group_count` groups."""
+    low = int(bins.min()) if len(bins) else 0
+    span = int(bins.max()) - low + 1 if len(bins) else 1
+    # A stable sort runs in about linear time over the already sorted runs
+    # that the entries of a merged level come in.
+    keyed = entry_groups * span + (bins - low)
+    order = np.argsort(keyed, kind="stable")
+    keyed = keyed[order]
+    firsts = np.flatnonzero(np.diff(keyed, prepend=-1))
+    keys = keyed[firsts]
+    key_groups = keys // span
+    return _ColumnSketches(
+        bins=keys % span + low,
+        counts=np.add.reduceat(counts[order], firsts) if len(keys) else counts[:0],
+        starts=np.searchsorted(key_groups, np.arange(group_count + 1)).astype(np.int64),
+        sums=np.bincount(sum_groups, weights=sums, minlength=group_count).astype(
+            np.float64
+        ),
+    )
+
+
+def _dyadic_blocks(first: int, last: int) -> list[tuple[int, int]]:
+    """The (level, block) pieces that tile date positions [first, last),
+    block b of level k covering positions [b * 2^k, (b + 1) * 2^k): at most
+    two per level, so O(log dates) in all."""
+    pieces = []
+    level = 0
+    while first < last:
+        if first & 1:
+            pieces.append((level, first))
+            first += 1
+        if last & 1:
+            last -= 1
+            pieces.append((level, last))
+        first >>= 1
+        last >>= 1
+        level += 1
+    return pieces
+
+
+def _ranges(starts: Bins, stops: Bins) -> Bins:
+    """The positions of every [start, stop) range, concatenated."""
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    ranges: Bins = offsets + np.arange(int(lengths.sum()), dtype=np.int64)
+    return ranges
+
+
+class SketchIndex:
+    """QuantileSketch of each column's values per (region, type, Date) of a
+    frame, along its sorted distinct Dates (as KpiIndex's axis), so any
+    date bounds select whole groups. Each (region, type) pair also keeps
+    the merged sketches of its aligned power-of-two runs of dates (level k
+    merging 2^k dates), so any date range is tiled by O(log dates) of them:
+    a query's cost follows the number of (region, type) pairs, levels and
+    bins it merges, not the dates or rows behind them."""
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        columns: Iterable[str],
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    ) -> None:
+        self.mapping = LogMapping(relative_accuracy)
+        region_codes, region_values = pd.factorize(frame["region"], sort=True)
+        type_codes, type_values = pd.factorize(frame["type"], sort=True)
+        self.regions: list[str] = [str(region) for region in region_values]
+        self.avocado_types: list[str] = [str(kind) for kind in type_values]
+        date_codes, date_values = pd.factorize(frame["Date"], sort=True)
+        self.dates = np.asarray(date_values, dtype="datetime64[us]")
+        self.date_years: Bins = (
+            pd.DatetimeIndex(self.dates).year.to_numpy().astype(np.int64)
+        )
+
+        # Rows missing a region, type or Date belong to no group. Groups
+        # are numbered run * dates + date, run being region * types + type.
+        keyed = (region_codes >= 0) & (type_codes >= 0) & (date_codes >= 0)
+        runs = region_codes.astype(np.int64) * len(self.avocado_types) + type_codes
+        groups = runs * len(self.dates) + np.where(keyed, date_codes, 0)
+        self.run_count = len(self.regions) * len(self.avocado_types)
+        self.columns: dict[str, list[_ColumnSketches]] = {}
+        for column in columns:
+            values = frame[column].to_numpy(dtype=float, na_value=np.nan)
+            valid = keyed & np.isfinite(values)
+            self.columns[column] = self._levels(groups[valid], values[valid])
+
+    def _blocks(self, level: int) -> int:
+        """How many blocks of 2^level dates each run has at `level`."""
+        return -(-len(self.dates) // (1 << level))
+
+    def _levels(self, groups: Bins, values: Floats) -> list[_ColumnSketches]:
+        """Per-date sketches, then each level's from the one below: block b
+        of a run merges blocks 2b and 2b + 1 of the level below."""
+        levels = [
+            _sketch_groups(
+                groups,
+                self.mapping.bins(values),
+                np.ones(len(values), dtype=np.int64),
+                values,
+                groups,
+                self.run_count * len(self.dates),
+            )
+        ]
+        level = 0
+        while self._blocks(level) > 1:
+            below, above = self._blocks(level), self._blocks(level + 1)
+            group_ids = np.arange(self.run_count * below, dtype=np.int64)
+            parents = group_ids // below * above + group_ids % below // 2
+            levels.append(levels[-1].merged(parents, self.run_count * above))
+            level += 1
+        return levels
+
+    def _span(self, start_date: Any, end_date: Any) -> tuple[int, int]:
+        """[first, last) date positions within the inclusive date range."""
+        first, last = 0, len(self.dates)
+        if start_date is not None:
+            start = pd.Timestamp(start_date).to_datetime64()
+            first = int(np.searchsorted(self.dates, start, side="left"))
+        if end_date is not None:
+            end = pd.Timestamp(end_date).to_datetime64()
+            last = int(np.searchsorted(self.dates, end, side="right"))
+        return first, max(first, last)
+
+    def _codes(self, values: Iterable[str] | None, known: list[str]) -> list[int]:
+        if values is None:
+            return list(range(len(known)))
+        codes = {value: code for code, value in enumerate(known)}
+        return sorted({codes[value] for value in values if value in codes})
+
+    def _pieces(self, first: int, last: int, by: str | None) -> list[list[int]]:
+        """The (level, block, year) pieces tiling [first, last) — split at
+        year boundaries when splitting by year, so no piece spans two."""
+        if by != "year":
+            return [[level, block, 0] for level, block in _dyadic_blocks(first, last)]
+        years = self.date_years[first:last]
+        bounds = [first, *(np.flatnonzero(np.diff(years)) + first + 1).tolist(), last]
+        return [
+            [level, block, int(self.date_years[start])]
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            for level, block in _dyadic_blocks(start, stop)
+        ]
+
+    def sketches(
+        self,
+        column: str,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+        by: str | None = None,
+    ) -> list[tuple[Any, QuantileSketch]]:
+        """`column`'s sketch over the rows the filter would select (None:
+        every region/type, or an unbounded date), split by "region",
+        "type" or "year" when `by` is given — one (key, sketch) per key
+        with any values, in key order. Without `by` the key is None."""
+        if by not in (None, "region", "type", "year"):
+            raise ValueError(f"Cannot split sketches by {by!r}")
+        levels = self.columns[column]
+        first, last = self._span(start_date, end_date)
+        type_count = len(self.avocado_types)
+        runs = np.asarray(
+            [
+                region * type_count + kind
+                for region in self._codes(regions, self.regions)
+                for kind in self._codes(avocado_types, self.avocado_types)
+            ],
+            dtype=np.int64,
+        )
+        if last <= first or not len(runs):
+            return []
+        pieces = np.asarray(self._pieces(first, last, by), dtype=np.int64)
+        if by == "region":
+            run_labels = runs // type_count
+        elif by == "type":
+            run_labels = runs % type_count
+        else:
+            run_labels = np.zeros(len(runs), dtype=np.int64)
+
+        bins, counts, entry_labels, sum_labels, sums = [], [], [], [], []
+        for level in np.unique(pieces[:, 0]).tolist():
+            sketched = levels[level]
+            blocks = pieces[pieces[:, 0] == level]
+            group_ids = (runs[:, None] * self._blocks(level) + blocks[:, 1]).ravel()
+            if by == "year":
+                labels = np.tile(blocks[:, 2], len(runs))
+            else:
+                labels = np.repeat(run_labels, len(blocks))
+            starts = sketched.starts[group_ids]
+            stops = sketched.starts[group_ids + 1]
+            entries = _ranges(starts, stops)
+            bins.append(sketched.bins[entries])
+            counts.append(sketched.counts[entries])
+            entry_labels.append(np.repeat(labels, stops - starts))
+            sum_labels.append(labels)
+            sums.append(sketched.sums[group_ids])
+
+        all_labels = np.concatenate(sum_labels)
+        keys = np.unique(all_labels)
+        merged = _sketch_groups(
+            np.searchsorted(keys, np.concatenate(entry_labels)),
+            np.concatenate(bins),
+            np.concatenate(counts),
+            np.concatenate(sums),
+            np.searchsorted(keys, all_labels),
+            len(keys),
+        )
+        result: list[tuple[Any, QuantileSketch]] = []
+        for code, label in enumerate(keys.tolist()):
+            start, stop = merged.starts[code], merged.starts[code + 1]
+            if start == stop:
+                continue
+            sketch = QuantileSketch(
+                self.mapping,
+                merged.bins[start:stop],
+                merged.counts[start:stop],
+                float(merged.sums[code]),
+            )
+            result.append((self._key(by, label), sketch))
+        return result
+
+    def _key(self, by: str | None, label: int) -> Any:
+        if by == "region":
+            return self.regions[label]
+        if by == "type":
+            return self.avocado_types[label]
+        if by == "year":
+            return label
+        return None
+
+    def sketch(
+        self,
+        column: str,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> QuantileSketch:
+        """`column`'s sketch over the rows the filter would select."""
+        merged = self.sketches(column, regions, avocado_types, start_date, end_date)
+        if merged:
+            return merged[0][1]
+        return QuantileSketch(
+            self.mapping,
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            0.0,
+        )
+
+    def select(
+        self,
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> "SketchSelection":
+        """A filter selection to query sketches of, like Dataset.select's
+        rows (None: every region/type, or an unbounded date)."""
+        return SketchSelection(
+            self,
+            None if regions is None else tuple(regions),
+            None if avocado_types is None else tuple(avocado_types),
+            start_date,
+            end_date,
+        )
+
+    def quantiles(
+        self,
+        column: str,
+        qs: Iterable[float],
+        regions: Iterable[str] | None,
+        avocado_types: Iterable[str] | None,
+        start_date: Any,
+        end_date: Any,
+        method: str = "lower",
+    ) -> Floats | None:
+        """Percentiles of `column` over the selection (see
+        QuantileSketch.quantiles), or None if it has no values."""
+        sketch = self.sketch(column, regions, avocado_types, start_date, end_date)
+        return sketch.quantiles(qs, method) if sketch.count else None
+
+
+@dataclass(frozen=True)
+class SketchSelection:
+    """The sketches of one filter selection, standing in for its rows where
+    only their distribution is needed (see app.create_box_plot)."""
+
+    index: SketchIndex
+    regions: tuple[str, ...] | None
+    avocado_types: tuple[str, ...] | None
+    start_date: Any
+    end_date: Any
+
+    def sketch(self, column: str) -> QuantileSketch:
+        return self.index.sketch(
+            column, self.regions, self.avocado_types, self.start_date, self.end_date
+        )
+
+    def split(self, column: str, by: str) -> list[tuple[Any, QuantileSketch]]:
+        """`column`'s sketch per "region", "type" or "year" (see
+        SketchIndex.sketches)."""
+        return self.index.sketches(
+            column,
+            self.regions,
+            self.avocado_types,
+            self.start_date,
+            self.end_date,
+            by=by,
+        )
@@ -0,0 +1,152 @@
+# result_cache.py
+"""A bounded, thread-safe LRU cache for values that are expensive to
+compute and shared between callbacks — filtered frames, finished figures.
+Bounded by entry count and optionally by an approximate byte budget, and
+single-flight: callbacks asking for the same missing key at the same time
+(one filter change fires several at once) wait for one computation rather
+than each running it."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar, cast
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    # Compute time the hits didn't spend: each hit counts the time its
+    # value originally took to compute.
+    saved_seconds: float
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _Pending(Generic[V]):
+    """A computation in flight, for the threads waiting on its key."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: V | None = None
+        self.seconds = 0.0
+        self.failed = False
+
+
+class ResultCache(Generic[V]):
+    """LRU cache of at most `max_entries` values and, given `sizeof`, at
+    most `max_bytes` as measured by it. A value larger than the whole
+    budget is returned but never stored; `max_entries=0` disables caching.
+    A hit is any lookup served without computing — including one that
+    waited for another thread's computation of the same key."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = 0,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # key -> (value, size, seconds it took to compute)
+        self._entries: OrderedDict[Hashable, tuple[V, int, float]] = OrderedDict()
+        self._pending: dict[Hashable, _Pending[V]] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        if self.max_entries <= 0:
+            with self._lock:
+                self._misses += 1
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                self._saved_seconds += entry[2]
+                return entry[0]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+
+        if not owner:
+            pending.done.wait()
+            if not pending.failed:
+                with self._lock:
+                    self._hits += 1
+                    self._saved_seconds += pending.seconds
+                return cast(V, pending.value)
+            # The computation we waited on raised; run it ourselves so this
+            # caller gets its own exception (or, if that was transient, a value).
+            with self._lock:
+                self._misses += 1
+            return compute()
+
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException:
+            pending.failed = True
+            with self._lock:
+                self._misses += 1
+                del self._pending[key]
+            pending.done.set()
+            raise
+        seconds = time.perf_counter() - started
+        size = 0 if self.sizeof is None else self.sizeof(value)
+        with self._lock:
+            self._misses += 1
+            del self._pending[key]
+            if self.sizeof is None or size <= self.max_bytes:
+                self._entries[key] = (value, size, seconds)
+                self._bytes += size
+                self._evict()
+        pending.value = value
+        pending.seconds = seconds
+        pending.done.set()
+        return value
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries or (
+            self.sizeof is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (the counters keep counting). A computation in
+        flight still completes and stores its value, so callers that must
+        never see an older generation put that generation in the key."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                saved_seconds=self._saved_seconds,
+            )
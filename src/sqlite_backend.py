@@ -0,0 +1,395 @@
+# sqlite_backend.py
+"""The dataset as one SQLite file: a query backend that keeps rows on disk
+and pushes filtering and the summary aggregates down into SQL, so a worker's
+memory doesn't grow with the history and every worker on the host reads the
+same file. sqlite3 is in the standard library — no new dependency."""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import datastore
+from filters import Dates
+
+SQLITE_STORE_VERSION = 1
+SQLITE_SUFFIX = ".sqlite"
+TABLE = "avocado"
+# The source row number: the frame index pandas would give the row.
+_ROW = "_row"
+
+
+def default_sqlite_path(source_path: str) -> str:
+    return source_path + SQLITE_SUFFIX
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _date_value(value: Any) -> int:
+    """A date bound as stored: integer microseconds since the epoch, the
+    resolution of the frame's datetime64[us] Date column."""
+    return int(pd.Timestamp(value).value // 1_000)
+
+
+def build_sqlite_store(
+    csv_path: str,
+    db_path: str,
+    chunk_rows: int = datastore.DEFAULT_INGEST_CHUNK_ROWS,
+) -> int:
+    """Stream `csv_path` into a SQLite file at `db_path`, `chunk_rows` rows
+    at a time (memory stays bounded like datastore.ingest_partitions), and
+    return the row count. A later row repeating a (Date, region, type)
+    replaces the earlier one, as parse_csv keeps the last. Built under a
+    temporary name and renamed into place, so readers never open a
+    half-written file."""
+    columns = datastore.read_csv_header(csv_path)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        dtypes: dict[str, str] = {}
+        first_row = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            chunk = chunk.assign(
+                Date=lambda df: pd.to_datetime(df["Date"], format="%Y-%m-%d")
+            )
+            if not dtypes:
+                dtypes = {str(name): str(dtype) for name, dtype in chunk.dtypes.items()}
+                _create_table(connection, columns, dtypes)
+            values = chunk.astype(object).where(chunk.notna(), None)
+            values["Date"] = [
+                None if pd.isna(day) else _date_value(day) for day in chunk["Date"]
+            ]
+            values.insert(0, _ROW, range(first_row, first_row + len(chunk)))
+            first_row += len(chunk)
+            placeholders = ", ".join("?" for _ in values.columns)
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {TABLE} VALUES ({placeholders})",
+                values.itertuples(index=False, name=None),
+            )
+        if not dtypes:
+            dtypes = {name: "str" for name in columns}
+            _create_table(connection, columns, dtypes)
+        rows = connection.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+        manifest = {
+            "version": SQLITE_STORE_VERSION,
+            "source": datastore.source_fingerprint(csv_path, with_hash=False),
+            "columns": columns,
+            "dtypes": dtypes,
+            "rows": rows,
+        }
+        connection.execute("CREATE TABLE manifest (body TEXT)")
+        connection.execute("INSERT INTO manifest VALUES (?)", [json.dumps(manifest)])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+    return int(rows)
+
+
+def _create_table(
+    connection: sqlite3.Connection, columns: list[str], dtypes: dict[str, str]
+) -> None:
+    def sql_type(name: str) -> str:
+        if name == "Date" or pd.api.types.is_integer_dtype(dtypes[name]):
+            return "INTEGER"
+        if pd.api.types.is_float_dtype(dtypes[name]):
+            return "REAL"
+        return "TEXT"
+
+    definitions = ", ".join(f"{_quote(name)} {sql_type(name)}" for name in columns)
+    connection.execute(
+        f"CREATE TABLE {TABLE} ({_ROW} INTEGER PRIMARY KEY, {definitions}, "
+        'UNIQUE (region, type, "Date"))'
+    )
+    # Covers region_extremes and price_change: they filter on region/type/
+    # Date and read nothing but AveragePrice, so they never touch the table
+    # itself. summary_stats also reads "Total Volume" from the table rows.
+    connection.execute(
+        f'CREATE INDEX {TABLE}_price ON {TABLE} (region, type, "Date", AveragePrice)'
+    )
+
+
+def read_sqlite_manifest(db_path: str) -> dict[str, Any]:
+    try:
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        raise FileNotFoundError(f"No SQLite store at {db_path}")
+    try:
+        (body,) = connection.execute("SELECT body FROM manifest").fetchone()
+    except sqlite3.DatabaseError:
+        raise ValueError(
+            f"{db_path} is not a SQLite store; rebuild it with sqlite_backend.py"
+        )
+    finally:
+        connection.close()
+    manifest: dict[str, Any] = json.loads(body)
+    if manifest.get("version") != SQLITE_STORE_VERSION:
+        raise ValueError(
+            f"SQLite store at {db_path} has version {manifest.get('version')}, "
+            f"expected {SQLITE_STORE_VERSION}; rebuild it with sqlite_backend.py"
+        )
+    return manifest
+
+
+def sqlite_store_is_current(db_path: str, source_path: str) -> bool:
+    """Whether `db_path` is a store built from `source_path` as it is now."""
+    try:
+        manifest = read_sqlite_manifest(db_path)
+        current = datastore.source_fingerprint(source_path, with_hash=False)
+    except (OSError, ValueError):
+        return False
+    return bool(manifest["source"] == current)
+
+
+class SqliteSnapshot:
+    """A Dataset (see dataset.py) served from a SQLite store. Each thread
+    gets its own read-only connection; rows come back with the frame's
+    dtypes and source-row index, ordered by Date then source row."""
+
+    def __init__(self, db_path: str) -> None:
+        manifest = read_sqlite_manifest(db_path)
+        self.db_path = db_path
+        self.columns: list[str] = manifest["columns"]
+        self.dtypes: dict[str, str] = manifest["dtypes"]
+        self._local = threading.local()
+
+        connection = self._connection()
+        self.regions = [
+            region
+            for (region,) in connection.execute(
+                f"SELECT DISTINCT region FROM {TABLE} "
+                "WHERE region IS NOT NULL ORDER BY region"
+            )
+        ]
+        self.avocado_types = [
+            kind
+            for (kind,) in connection.execute(
+                f"SELECT DISTINCT type FROM {TABLE} "
+                "WHERE type IS NOT NULL ORDER BY type"
+            )
+        ]
+        rows, low, high = connection.execute(
+            f'SELECT COUNT(*), MIN("Date"), MAX("Date") FROM {TABLE}'
+        ).fetchone()
+        if low is None:
+            raise ValueError(f"SQLite store at {db_path} holds no dated rows")
+        self.row_count: int = rows
+        self.min_date: date = pd.Timestamp(low, unit="us").date()
+        self.max_date: date = pd.Timestamp(high, unit="us").date()
+        stamps = connection.execute(
+            f'SELECT DISTINCT "Date" FROM {TABLE} '
+            'WHERE "Date" IS NOT NULL ORDER BY "Date"'
+        ).fetchall()
+        self.dates: Dates = np.unique(
+            np.array([stamp for (stamp,) in stamps], dtype="datetime64[us]").astype(
+                "datetime64[D]"
+            )
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._local.connection = connection
+        return connection
+
+    def _where(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: Any,
+        end_date: Any,
+    ) -> tuple[str, list[Any]]:
+        # Rows missing a region, type or Date never match, as in BlockIndex.
+        clauses = [
+            "region IS NOT NULL",
+            "type IS NOT NULL",
+            '"Date" IS NOT NULL',
+        ]
+        params: list[Any] = []
+        for column, values in (("region", regions), ("type", avocado_types)):
+            if values is not None:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if start_date is not None:
+            clauses.append('"Date" >= ?')
+            params.append(_date_value(start_date))
+        if end_date is not None:
+            clauses.append('"Date" <= ?')
+            params.append(_date_value(end_date))
+        return " AND ".join(clauses), params
+
+    def select(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> pd.DataFrame:
+        if regions == [] or avocado_types == []:
+            return self._frame([])
+        where, params = self._where(regions, avocado_types, start_date, end_date)
+        names = ", ".join(_quote(name) for name in [_ROW, *self.columns])
+        cursor = self._connection().execute(
+            f'SELECT {names} FROM {TABLE} WHERE {where} ORDER BY "Date", {_ROW}',
+            params,
+        )
+        return self._frame(cursor.fetchall())
+
+    def _frame(self, records: list[tuple[Any, ...]]) -> pd.DataFrame:
+        raw = pd.DataFrame.from_records(
+            records, columns=[_ROW, *self.columns], coerce_float=True
+        )
+        columns: dict[str, Any] = {}
+        for name in self.columns:
+            dtype = pd.api.types.pandas_dtype(self.dtypes[name])
+            if name == "Date":
+                # Never NULL here: select() only returns dated rows.
+                stamps = raw[name].to_numpy(np.int64).astype("datetime64[us]")
+                columns[name] = pd.Series(stamps).astype(dtype)
+            else:
+                columns[name] = raw[name].astype(dtype)
+        frame = pd.DataFrame(columns)
+        frame.index = pd.Index(raw[_ROW].to_numpy(np.int64))
+        return frame
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Every row, read from the store on each access."""
+        return self.select(None, None, None, None)
+
+    def count(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> int:
+        """How many rows `select` returns, counted in SQL."""
+        if regions == [] or avocado_types == []:
+            return 0
+        where, params = self._where(regions, avocado_types, start_date, end_date)
+        (rows,) = (
+            self._connection()
+            .execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params)
+            .fetchone()
+        )
+        return int(rows)
+
+    def summary_stats(
+        self,
+        regions: list[str] | None,
+        avocado_types: list[str] | None,
+        start_date: str | None,
+        end_date: str | None,
+    ) -> dict[str, Any] | None:
+        """utils.calculate_summary_stats, as one aggregate query."""
+        if regions == [] or avocado_types == []:
+            return None
+        where, params = self._where(regions, avocado_types, start_date, end_date)
+        rows, avg_price, max_price, min_price, total_volume, low, high = (
+            self._connection()
+            .execute(
+                "SELECT COUNT(*), AVG(AveragePrice), MAX(AveragePrice), "
+                'MIN(AveragePrice), TOTAL("Total Volume"), MIN("Date"), '
+                f'MAX("Date") FROM {TABLE} WHERE {where}',
+                params,
+            )
+            .fetchone()
+        )
+        if rows == 0:
+            return None
+        return {
+            "avg_price": np.nan if avg_price is None else avg_price,
+            "max_price": np.nan if max_price is None else max_price,
+            "min_price": np.nan if min_price is None else min_price,
+            "total_volume": total_volume,
+            "date_range": {
+                "start": pd.Timestamp(low, unit="us"),
+                "end": pd.Timestamp(high, unit="us"),
+            },
+        }
+
+    def region_extremes(
+        self, avocado_type: str, start_date: str, end_date: str
+    ) -> dict[str, Any] | None:
+        where, params = self._where(None, [avocado_type], start_date, end_date)
+        averages = (
+            self._connection()
+            .execute(
+                f"SELECT region, AVG(AveragePrice) FROM {TABLE} WHERE {where} "
+                "GROUP BY region HAVING AVG(AveragePrice) IS NOT NULL "
+                "ORDER BY region",
+                params,
+            )
+            .fetchall()
+        )
+        if not averages:
+            return None
+        # max()/min() keep the first of equal values, like idxmax/idxmin.
+        best_region, best_price = max(averages, key=lambda row: row[1])
+        worst_region, worst_price = min(averages, key=lambda row: row[1])
+        return {
+            "best_region": best_region,
+            "best_price": best_price,
+            "worst_region": worst_region,
+            "worst_price": worst_price,
+        }
+
+    def price_change(
+        self, regions: list[str], avocado_type: str, start_date: str, end_date: str
+    ) -> float | None:
+        """utils.calculate_price_change, as one aggregate query."""
+        if not regions:
+            return None
+        start = pd.to_datetime(start_date)
+        end = pd.to_datetime(end_date)
+        previous_start = start - timedelta(days=(end - start).days + 1)
+        where, params = self._where(regions, [avocado_type], previous_start, end)
+        current_avg, previous_avg = (
+            self._connection()
+            .execute(
+                'SELECT AVG(CASE WHEN "Date" >= ? THEN AveragePrice END), '
+                'AVG(CASE WHEN "Date" < ? THEN AveragePrice END) '
+                f"FROM {TABLE} WHERE {where}",
+                [_date_value(start), _date_value(start), *params],
+            )
+            .fetchone()
+        )
+        if current_avg is None or previous_avg is None or previous_avg == 0:
+            return None
+        return float((current_avg - previous_avg) / previous_avg * 100)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="sqlite_backend.py",
+        description="Build the SQLite store AVOCADO_QUERY_BACKEND=sqlite serves.",
+    )
+    parser.add_argument("csv_path")
+    parser.add_argument(
+        "db_path", nargs="?", help="Defaults to <csv_path>" + SQLITE_SUFFIX
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=datastore.DEFAULT_INGEST_CHUNK_ROWS
+    )
+    args = parser.parse_args(argv)
+    db_path = args.db_path or default_sqlite_path(args.csv_path)
+    rows = build_sqlite_store(args.csv_path, db_path, args.chunk_rows)
+    print(f"Wrote {rows} rows to SQLite store {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 Analytics" brand name, and every `data.query()`/DataFrame column value stay
 untranslated by design — only display text goes through this module."""
 
+from dataclasses import dataclass
+
 TRANSLATIONS = {
     "es": {
         "header.subtitle_by": "por ",
@@ -14,6 +16,7 @@ TRANSLATIONS = {
         "footer.created_by": "Creado por ",
         "sections.scatter_title": "Análisis de Dispersión",
         "sections.box_plot_title": "Análisis de Caja y Bigotes",
+        "sections.anomaly_feed_title": "Precios Anómalos en Todas las Regiones",
         "filters.region.label": "Región",
         "filters.region.placeholder": "Selecciona una región...",
         "filters.region.tooltip": (
@@ -44,6 +47,11 @@ TRANSLATIONS = {
         "filters.box_plot_groupby.tooltip": (
             "Elige cómo agrupar el gráfico de caja: por tipo de aguacate, región o año."
         ),
+        "filters.anomaly_threshold.label": "Umbral de Anomalía",
+        "filters.anomaly_threshold.tooltip": (
+            "Marca los precios a más de estas desviaciones estándar del"
+            " promedio de su región en las fechas seleccionadas."
+        ),
         "download.button": "Descargar CSV",
         "download.no_data": "No hay datos para exportar.",
         "empty.select_region": "Selecciona al menos una región para ver los datos.",
@@ -66,6 +74,8 @@ TRANSLATIONS = {
         "summary.price_change": "Cambio de Precio vs. Periodo Anterior",
         "summary.best_region": "Mejor Región (precio prom.)",
         "summary.worst_region": "Peor Región (precio prom.)",
+        "anomaly_feed.deviation": "Desviación (σ)",
+        "anomaly_feed.empty": "No hay precios anómalos en este rango de fechas.",
     },
     "en": {
         "header.subtitle_by": "by ",
@@ -77,6 +87,7 @@ TRANSLATIONS = {
         "footer.created_by": "Created by ",
         "sections.scatter_title": "Scatter Plot Analysis",
         "sections.box_plot_title": "Box Plot Analysis",
+        "sections.anomaly_feed_title": "Anomalous Prices Across Regions",
         "filters.region.label": "Region",
         "filters.region.placeholder": "Select a region...",
         "filters.region.tooltip": (
@@ -104,6 +115,11 @@ TRANSLATIONS = {
         "filters.box_plot_groupby.tooltip": (
             "Choose how to group the box plot: by avocado type, region, or year."
         ),
+        "filters.anomaly_threshold.label": "Anomaly Threshold",
+        "filters.anomaly_threshold.tooltip": (
+            "Mark prices more than this many standard deviations from their"
+            " region's average over the selected dates."
+        ),
         "download.button": "Download CSV",
         "download.no_data": "No data to export.",
         "empty.select_region": "Select at least one region to see data.",
@@ -124,6 +140,8 @@ TRANSLATIONS = {
         "summary.price_change": "Price Change vs. Previous Period",
         "summary.best_region": "Best Region (avg. price)",
         "summary.worst_region": "Worst Region (avg. price)",
+        "anomaly_feed.deviation": "Deviation (σ)",
+        "anomaly_feed.empty": "No anomalous prices in this date range.",
     },
 }
 
@@ -196,6 +214,39 @@ TYPE_LABELS = {
 }
 
 
+# The label tables LocalizedText can look strings up in, by name. Also
+# shipped to the browser whole, so charts can be relabeled there.
+STRING_TABLES = {
+    "t": TRANSLATIONS,
+    "column": COLUMN_LABELS,
+    "groupby": GROUPBY_LABELS,
+    "type": TYPE_LABELS,
+}
+
+# A literal string, or a (table, key) lookup into STRING_TABLES.
+TextPart = str | tuple[str, str]
+
+
+@dataclass(frozen=True)
+class LocalizedText:
+    """Display text kept as the parts it's assembled from rather than as a
+    string in one language, so it can be rendered in either — here by
+    `render`, or in the browser from the same parts and STRING_TABLES."""
+
+    parts: tuple[TextPart, ...]
+
+    def render(self, lang: str) -> str:
+        return "".join(
+            part if isinstance(part, str) else STRING_TABLES[part[0]][lang][part[1]]
+            for part in self.parts
+        )
+
+
+def localized(*parts: TextPart) -> LocalizedText:
+    """E.g. `localized(("t", "common.date"), ": %{x}")`."""
+    return LocalizedText(parts)
+
+
 def t(key: str, lang: str) -> str:
     """Look up a translated string. Raises KeyError for an unknown key/lang."""
     return TRANSLATIONS[lang][key]
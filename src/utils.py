@@ -87,19 +87,22 @@ def find_region_extremes(
     data: pd.DataFrame, avocado_type: str, start_date: str, end_date: str
 ) -> dict[str, Any] | None:
     """Find the best/worst average-price regions for a type + date filter,
-    across all regions. Returns None if the filter matches no rows."""
+    across all regions (skipping any without a price). Returns None if the
+    filter matches no rows with a price."""
     filtered = data.query(
         "type == @avocado_type and Date >= @start_date and Date <= @end_date"
     )
-    if filtered.empty:
+    region_avg = (
+        filtered.groupby("region", observed=True)["AveragePrice"].mean().dropna()
+    )
+    if region_avg.empty:
         return None
 
-    region_avg = filtered.groupby("region")["AveragePrice"].mean()
     best_region = region_avg.idxmax()
     worst_region = region_avg.idxmin()
     return {
         "best_region": best_region,
-        "best_price": region_avg[best_region],
+        "best_price": region_avg.max(),
         "worst_region": worst_region,
-        "worst_price": region_avg[worst_region],
+        "worst_price": region_avg.min(),
     }
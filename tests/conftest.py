@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+# Keep the test run deterministic: with a metadata sidecar present, importing
+# app would otherwise load the dataset on a background thread while tests
+# monkeypatch the environment and datastore underneath it.
+os.environ.setdefault("AVOCADO_DATA_WARMUP", "false")
+
+
+@pytest.fixture(autouse=True)
+def empty_shared_caches():
+    """Start every test with no cached selections, figures, summaries,
+    sketches, date labels or anomaly scores, so a test patching a chart
+    builder sees it called."""
+    import app  # Not at module level: the environment above must come first.
+
+    app.filter_cache.clear()
+    for cache in app.figure_caches.values():
+        cache.clear()
+    app.summary_cache.clear()
+    app.sketch_cache.clear()
+    app.date_label_cache.clear()
+    app.anomaly_cache.clear()
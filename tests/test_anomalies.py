@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalies import MAD_SCALE, AnomalyScores, flag_anomalies, price_zscores
+from app import data
+from utils import detect_price_anomalies
+
+
+def random_ranges(count, seed=0):
+    rng = np.random.default_rng(seed)
+    origin = pd.Timestamp("2014-11-01")
+    for first, last in np.sort(rng.integers(0, 1_300, (count, 2)), axis=1):
+        yield (
+            origin + pd.Timedelta(days=int(first)),
+            origin + pd.Timedelta(days=int(last)),
+        )
+
+
+def test_flags_match_detect_price_anomalies_over_random_ranges():
+    for start_date, end_date in random_ranges(40):
+        rows = data[data["Date"].between(start_date, end_date)]
+
+        flagged = flag_anomalies(price_zscores(rows), 2.0)
+
+        for _, series in rows.groupby(["region", "type"]):
+            expected = detect_price_anomalies(series["AveragePrice"], 2.0)
+            pd.testing.assert_series_equal(
+                flagged[series.index], expected, check_names=False
+            )
+
+
+def test_scores_are_nan_where_a_series_defines_no_deviation():
+    frame = pd.DataFrame(
+        {
+            "region": ["Albany", "Boise", "Boise", "Chicago", "Chicago", None],
+            "type": ["organic"] * 6,
+            "AveragePrice": [1.5, 1.0, 1.0, 2.0, float("nan"), 9.0],
+        }
+    )
+
+    for method in ("std", "mad"):
+        scores = price_zscores(frame, method)
+
+        # One point, a flat series, a single price, and a row in no series.
+        assert scores.isna().all()
+        assert not flag_anomalies(scores, 0.0).any()
+
+
+def test_scores_are_strictly_above_the_threshold_to_flag():
+    prices = pd.Series([1.0] * 9 + [1.2])
+    frame = pd.DataFrame(
+        {"region": "Albany", "type": "organic", "AveragePrice": prices}
+    )
+    exact = (prices - prices.mean()).abs().iloc[-1] / prices.std()
+
+    scores = price_zscores(frame)
+
+    assert not flag_anomalies(scores, exact).iloc[-1]
+    assert flag_anomalies(scores, exact - 1e-9).iloc[-1]
+
+
+def test_robust_scores_use_the_scaled_median_absolute_deviation():
+    prices = [1.0, 1.1, 1.2, 1.3, 9.0]
+    frame = pd.DataFrame(
+        {"region": "Albany", "type": "organic", "AveragePrice": prices}
+    )
+
+    scores = price_zscores(frame, "mad")
+
+    # Median 1.2; deviations 0.2, 0.1, 0, 0.1, 7.8 have median 0.1.
+    assert scores.tolist() == pytest.approx(
+        [0.2 / (0.1 * MAD_SCALE), 1 / MAD_SCALE, 0.0, 1 / MAD_SCALE, 78 / MAD_SCALE]
+    )
+    # The spike inflates the standard deviation enough to hide itself.
+    assert price_zscores(frame).iloc[-1] < price_zscores(frame, "mad").iloc[-1]
+
+
+def test_unknown_methods_are_rejected():
+    with pytest.raises(ValueError, match="method"):
+        price_zscores(data.head(3), "iqr")
+
+
+def test_most_extreme_lists_flagged_points_by_score():
+    scores = AnomalyScores(data)
+
+    points = scores.most_extreme(["organic"], 2.0, 5)
+
+    assert len(points) == 5
+    assert set(points["type"]) == {"organic"}
+    assert points["zscore"].is_monotonic_decreasing
+    assert (points["zscore"] > 2.0).all()
+    organic = scores.zscores[data["type"] == "organic"]
+    assert points["zscore"].iloc[0] == organic.max()
+    pd.testing.assert_frame_equal(
+        points.drop(columns="zscore"),
+        data.loc[points.index, AnomalyScores.FEED_COLUMNS],
+    )
+
+
+def test_most_extreme_of_an_unflagged_range_is_empty():
+    scores = AnomalyScores(data[data["Date"] == data["Date"].min()])
+
+    assert scores.most_extreme(None, 2.0, 10).empty
+    assert AnomalyScores(data.head(0)).most_extreme(None, 2.0, 10).empty
+
+
+def test_for_rows_aligns_scores_to_a_selection():
+    scores = AnomalyScores(data)
+    rows = data[data["region"] == "Albany"].iloc[::-1]
+
+    aligned = scores.for_rows(rows.index)
+
+    assert aligned.index.equals(rows.index)
+    assert aligned.equals(scores.zscores[rows.index])
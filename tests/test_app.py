@@ -1,16 +1,23 @@
 import io
+import json
 import logging
+import shutil
+import subprocess
 from pathlib import Path
 from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 import pytest
 import sentry_sdk
 from dash import dcc, no_update
 from dash._callback_context import context_value
 from dash._utils import AttributeDict
+from plotly.io.json import to_json_plotly
 
 from app import (
+    ANOMALY_THRESHOLD_MIN,
+    APPLY_PRICE_CHART_STYLE,
     DATA_MAX_DATE,
     DATA_MIN_DATE,
     DEFAULT_URL_BOX_PLOT_COLUMN,
@@ -21,6 +28,7 @@ from app import (
     DEFAULT_URL_Y_AXIS,
     EMPTY_REGION_MESSAGE,
     REGION_COLOR_PALETTE,
+    anomaly_cache,
     app,
     avocado_types,
     create_box_plot,
@@ -28,16 +36,26 @@ from app import (
     create_scatter_chart,
     create_summary_panel,
     create_volume_chart,
+    current_dataset,
     data,
+    date_label_cache,
     decode_query_to_filters,
     download_filtered_csv,
+    empty_state_figure,
     encode_filters_to_query,
     external_stylesheets,
     filter_data,
     init_sentry,
     load_data,
+    select_filter,
+    sketch_cache,
+    sketch_index,
+    summary_cache,
+    summary_kpis,
     summary_stat_card,
     sync_url_and_filters,
+    translate_figure,
+    update_anomaly_feed,
     update_box_plot,
     update_charts,
     update_download_controls,
@@ -45,7 +63,7 @@ from app import (
     update_summary_panel,
     update_ui_language,
 )
-from translations import column_label, t
+from translations import STRING_TABLES, column_label, localized, t
 from utils import (
     calculate_price_change,
     detect_price_anomalies,
@@ -61,6 +79,7 @@ CONTROL_LABEL_IDS = [
     "y-axis-label",
     "box-plot-column-label",
     "box-plot-groupby-label",
+    "anomaly-threshold-label",
 ]
 
 METRIC_DROPDOWN_IDS = [
@@ -428,6 +447,85 @@ def test_update_charts_empty_filtered_data_skips_anomaly_logic():
     assert "no data available" in price_fig["layout"]["title"].lower()
 
 
+def test_update_charts_marks_the_anomalies_create_price_chart_finds():
+    filtered = filter_data(["Albany", "Boise"], "organic", "2015-01-01", "2016-12-31")
+
+    price_fig, _ = update_charts(
+        ["Albany", "Boise"], "organic", "2015-01-01", "2016-12-31"
+    )
+
+    expected = create_price_chart(filtered)
+    assert [trace["x"].tolist() for trace in price_fig["data"]] == [
+        trace["x"].tolist() for trace in expected["data"]
+    ]
+
+
+def test_anomaly_feeds_of_one_type_and_date_range_share_its_scores():
+    before = anomaly_cache.stats()
+
+    update_charts(["Albany"], "organic", "2015-01-01", "2015-12-31")
+    update_anomaly_feed("organic", "2015-01-01", "2015-12-31", "en")
+    update_anomaly_feed("organic", "2015-01-01", "2015-12-31", "es")
+    update_anomaly_feed("conventional", "2015-01-01", "2015-12-31", "en")
+
+    after = anomaly_cache.stats()
+    # The price chart scores its own rows; each type's feed scores once.
+    assert (after.misses - before.misses, after.hits - before.hits) == (2, 1)
+
+
+def test_update_anomaly_feed_lists_the_most_extreme_points_across_regions():
+    start_date, end_date = "2017-01-01", "2017-12-31"
+
+    with patch("app.ANOMALY_FEED_LIMIT", 3):
+        feed = update_anomaly_feed("organic", start_date, end_date, "en")
+
+    header, body = feed.children.children
+    assert collect_text(header) == ["Region", "Date", "Price", "Deviation (σ)"]
+    rows = [collect_text(row) for row in body.children]
+    assert len(rows) == 3
+    flagged = []
+    for region, series in filter_data(
+        sorted(data["region"].unique()), "organic", start_date, end_date
+    ).groupby("region"):
+        prices = series["AveragePrice"]
+        deviations = (prices - prices.mean()).abs() / prices.std()
+        flagged += [(deviation, region) for deviation in deviations[deviations > 2.0]]
+    expected = sorted(flagged, reverse=True)[:3]
+    assert [row[0] for row in rows] == [region for _, region in expected]
+    assert [row[3] for row in rows] == [f"{score:.1f}" for score, _ in expected]
+
+
+def test_update_anomaly_feed_ignores_the_region_filter_and_translates():
+    feed = update_anomaly_feed("organic", "2017-01-01", "2017-12-31", "es")
+
+    header = feed.children.children[0]
+    assert collect_text(header)[0] == t("common.region", "es")
+    assert collect_text(header)[3] == t("anomaly_feed.deviation", "es")
+
+
+def test_update_anomaly_feed_shows_a_message_when_nothing_is_flagged():
+    feed = update_anomaly_feed("organic", "2015-01-04", "2015-01-11", "es")
+
+    assert feed.className == "summary-empty"
+    assert feed.children == t("anomaly_feed.empty", "es")
+
+
+def test_update_anomaly_feed_handles_exception_without_crashing(caplog):
+    with caplog.at_level(logging.ERROR):
+        with patch("app.AnomalyScores", side_effect=RuntimeError("boom")):
+            with patch("app.sentry_sdk.capture_exception") as mock_capture:
+                feed = update_anomaly_feed("organic", "2015-01-01", "2015-12-31")
+
+    assert feed.className == "summary-empty"
+    assert "boom" in feed.children.lower()
+    assert len(caplog.records) == 1
+    assert mock_capture.call_args.kwargs["extras"] == {
+        "type": "organic",
+        "start_date": "2015-01-01",
+        "end_date": "2015-12-31",
+    }
+
+
 def find_info_icon(component):
     """Recursively search a Dash component tree for the first info-icon span."""
     if getattr(component, "className", None) == "info-icon":
@@ -654,9 +752,28 @@ def test_update_summary_panel_shows_message_when_no_regions_selected():
     assert panel.children == EMPTY_REGION_MESSAGE
 
 
+@pytest.mark.parametrize(
+    "regions,start_date,end_date",
+    [
+        (["Albany"], "2015-01-01", "2015-12-31"),
+        (["Albany", "Boston", "Chicago"], "2016-02-10", "2017-07-04"),
+        (["Albany"], "1999-01-01", "1999-12-31"),
+    ],
+)
+def test_update_summary_panel_matches_the_panel_of_the_filtered_rows(
+    regions, start_date, end_date
+):
+    filtered = filter_data(regions, "organic", start_date, end_date)
+
+    panel = update_summary_panel(regions, "organic", start_date, end_date)
+
+    expected = create_summary_panel(filtered, regions, "organic", start_date, end_date)
+    assert collect_text(panel) == collect_text(expected)
+
+
 def test_update_summary_panel_callback_handles_exception_without_crashing(caplog):
     with caplog.at_level(logging.ERROR):
-        with patch("app.filter_data", side_effect=RuntimeError("boom")):
+        with patch("app.summary_kpis", side_effect=RuntimeError("boom")):
             with patch("app.sentry_sdk.capture_exception") as mock_capture:
                 panel = update_summary_panel(
                     ["Albany"], "organic", "2015-01-01", "2015-12-31"
@@ -741,6 +858,320 @@ def test_create_box_plot_produces_one_trace_per_group(
     assert all(trace["type"] == "box" for trace in figure["data"])
 
 
+@pytest.mark.parametrize("group_by", ["region", "year"])
+def test_create_box_plot_traces_hold_each_groups_rows_in_data_order(group_by):
+    filtered = data.query("type == 'organic' and region in ['Boise', 'Albany']")
+
+    figure = create_box_plot(filtered, "Total Bags", group_by, summary=False)
+
+    groups = sorted(filtered[group_by].unique())
+    assert [trace["name"] for trace in figure["data"]] == [str(g) for g in groups]
+    for trace, group in zip(figure["data"], groups):
+        expected = filtered[filtered[group_by] == group]["Total Bags"]
+        pd.testing.assert_series_equal(trace["y"], expected)
+
+
+BOX_SUMMARY_FIELDS = (
+    "x",
+    "q1",
+    "median",
+    "q3",
+    "lowerfence",
+    "upperfence",
+    "mean",
+    "y",
+)
+
+
+def test_box_summary_computes_plotlys_box_statistics():
+    # Plotly's "linear" quartiles of 11 points: q1 at position 2.25, q3 at
+    # 7.75; fences snap to the outermost points within 1.5 IQR.
+    values = [100.0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, None]
+    frame = pd.DataFrame(
+        {"AveragePrice": values, "type": "organic", "region": "Albany", "year": 2015}
+    )
+
+    (trace,) = create_box_plot(frame, "AveragePrice", "year", summary=True)["data"]
+
+    assert {key: trace[key] for key in BOX_SUMMARY_FIELDS} == {
+        "x": ["2015"],
+        "q1": [3.25],
+        "median": [6.0],
+        "q3": [8.75],
+        "lowerfence": [1.0],
+        "upperfence": [10.0],
+        "mean": [pytest.approx(155 / 11)],
+        "y": [[100.0]],
+    }
+
+
+@pytest.mark.parametrize("group_by", ["type", "region", "year"])
+def test_create_box_plot_summary_sends_statistics_and_outliers_only(group_by):
+    raw = create_box_plot(data, "AveragePrice", group_by, summary=False)
+
+    summary = create_box_plot(data, "AveragePrice", group_by, summary=True)
+
+    assert [trace["name"] for trace in summary["data"]] == [
+        trace["name"] for trace in raw["data"]
+    ]
+    for raw_trace, trace in zip(raw["data"], summary["data"]):
+        values = raw_trace["y"]
+        positions = raw_trace["x"].unique() if "x" in raw_trace else [trace["name"]]
+        assert trace["x"] == list(positions)
+        assert trace["boxpoints"] == "outliers"
+        for i, position in enumerate(positions):
+            box = values if "x" not in raw_trace else values[raw_trace["x"] == position]
+            assert trace["median"][i] == pytest.approx(box.median())
+            assert trace["mean"][i] == pytest.approx(box.mean())
+            inside = box.between(trace["lowerfence"][i], trace["upperfence"][i])
+            assert sorted(trace["y"][i]) == sorted(box[~inside])
+    assert len(to_json_plotly(summary)) * 20 < len(to_json_plotly(raw))
+
+
+@pytest.mark.parametrize(
+    "group_by,regions,avocado_types",
+    [
+        ("type", ["Albany", "Boston"], None),
+        ("region", None, ["organic"]),
+        ("region", ["Albany", "Boise", "Chicago"], None),
+        ("year", ["Albany"], ["organic"]),
+    ],
+)
+def test_create_box_plot_from_sketches_approximates_the_exact_boxes(
+    group_by, regions, avocado_types
+):
+    rows = data
+    if regions is not None:
+        rows = rows[rows["region"].isin(regions)]
+    if avocado_types is not None:
+        rows = rows[rows["type"].isin(avocado_types)]
+    index = sketch_index(current_dataset())
+    assert index is not None
+    selection = index.select(regions, avocado_types, None, None)
+
+    exact = create_box_plot(rows, "AveragePrice", group_by, summary=True)
+    sketched = create_box_plot(selection, "AveragePrice", group_by, summary=False)
+
+    assert [trace["name"] for trace in sketched["data"]] == [
+        trace["name"] for trace in exact["data"]
+    ]
+    for exact_trace, trace in zip(exact["data"], sketched["data"]):
+        # Sketched boxes sit in key order (exact ones: in the rows' order).
+        order = sorted(range(len(trace["x"])), key=lambda i: trace["x"][i])
+        assert sorted(exact_trace["x"]) == [trace["x"][i] for i in order]
+        exact_boxes = dict(zip(exact_trace["x"], exact_trace["median"]))
+        for position, median, mean in zip(trace["x"], trace["median"], trace["mean"]):
+            assert median == pytest.approx(exact_boxes[position], rel=0.01)
+            assert mean == pytest.approx(
+                exact_trace["mean"][exact_trace["x"].index(position)]
+            )
+
+
+def test_update_box_plot_draws_from_sketches_when_enabled():
+    builds = sketch_cache.stats().misses
+
+    with (
+        patch("app.BOX_PLOT_SKETCH", True),
+        patch("app.select_filter") as select_filter,
+    ):
+        figure = update_box_plot(
+            None, "organic", "2016-01-01", "2016-12-31", "AveragePrice", "region"
+        )
+        empty = update_box_plot(
+            ["Albany"], "organic", "1999-01-01", "1999-12-31", "AveragePrice", "year"
+        )
+
+    select_filter.assert_not_called()
+    assert [trace["x"] for trace in figure["data"]] == [
+        [region] for region in current_dataset().regions
+    ]
+    assert all(trace["median"] for trace in figure["data"])
+    assert empty["data"] == []
+    assert "no data available" in empty["layout"]["title"].lower()
+    assert sketch_cache.stats().misses == builds + 1
+
+
+def test_create_box_plot_summary_positions_follow_the_language():
+    filtered = data.query("region == 'Albany'")
+
+    figure = create_box_plot(filtered, "AveragePrice", "type", lang="es")
+
+    assert [trace["x"] for trace in figure["data"]] == [["Convencional"], ["Orgánico"]]
+    english = translate_figure(figure, "en")
+    assert [trace["x"] for trace in english["data"]] == [["Conventional"], ["Organic"]]
+
+
+def test_chart_traces_split_categorical_columns_like_plain_ones():
+    filtered = data.query("region in ['Boise', 'Albany', 'Chicago']")
+    compact = filtered.astype({"region": "category", "type": "category"})
+
+    for build in (
+        lambda rows: create_price_chart(rows),
+        lambda rows: create_box_plot(rows, "AveragePrice", "region"),
+        lambda rows: create_scatter_chart(rows, "AveragePrice", "Total Volume"),
+    ):
+        plain, categorical = build(filtered), build(compact)
+        assert [trace["name"] for trace in categorical["data"]] == [
+            trace["name"] for trace in plain["data"]
+        ]
+        for plain_trace, categorical_trace in zip(plain["data"], categorical["data"]):
+            assert list(categorical_trace["y"]) == list(plain_trace["y"])
+
+
+def unpacked_customdata(trace):
+    """The `customdata` rows the clientside callback unpacks from a
+    scatter trace's packed (codes, labels) columns."""
+    packed = trace["meta"]["customdata"]
+    columns = [
+        [labels[code] for code in codes]
+        for codes, labels in zip(packed["codes"], packed["labels"])
+    ]
+    return list(zip(*columns))
+
+
+def test_create_scatter_chart_labels_each_point_with_its_region_and_date():
+    filtered = data.query("region in ['Boise', 'Albany']").tail(200)
+
+    figure = create_scatter_chart(filtered, "AveragePrice", "Total Volume")
+
+    for trace in figure["data"]:
+        rows = filtered.loc[trace["x"].index]
+        assert unpacked_customdata(trace) == list(
+            zip(rows["region"], rows["Date"].dt.strftime("%Y-%m-%d"))
+        )
+        # Each distinct label is sent once.
+        assert sorted(trace["meta"]["customdata"]["labels"][0]) == ["Albany", "Boise"]
+    assert sum(len(unpacked_customdata(trace)) for trace in figure["data"]) == len(
+        filtered
+    )
+
+
+def test_create_scatter_chart_reuses_the_datasets_date_labels():
+    dataset = current_dataset()
+    filtered = data.query("region in ['Boise', 'Albany']").tail(200)
+    builds = date_label_cache.stats().misses
+
+    with patch("app.pd.DatetimeIndex", wraps=pd.DatetimeIndex) as formatted:
+        first = create_scatter_chart(
+            filtered, "AveragePrice", "Total Volume", dataset=dataset
+        )
+        formatted.reset_mock()
+        second = create_scatter_chart(
+            filtered, "AveragePrice", "Total Volume", dataset=dataset
+        )
+
+    formatted.assert_not_called()
+    assert date_label_cache.stats().misses == builds + 1
+    expected = create_scatter_chart(filtered, "AveragePrice", "Total Volume")
+    for figure in (first, second):
+        for trace, expected_trace in zip(figure["data"], expected["data"]):
+            assert unpacked_customdata(trace) == unpacked_customdata(expected_trace)
+            dates = trace["meta"]["customdata"]["labels"][1]
+            assert len(dates) == len(set(dates)) == filtered["Date"].nunique()
+
+
+def test_create_scatter_chart_switches_to_webgl_past_the_point_threshold():
+    filtered = data.query("region == 'Albany'")
+
+    with patch("app.SCATTER_GL_POINTS", len(filtered)):
+        svg = create_scatter_chart(filtered, "AveragePrice", "Total Volume")
+        webgl = create_scatter_chart(
+            data.head(len(filtered) + 1), "AveragePrice", "Total Volume"
+        )
+
+    assert {trace["type"] for trace in svg["data"]} == {"scatter"}
+    assert {trace["type"] for trace in webgl["data"]} == {"scattergl"}
+
+
+def test_packed_scatter_labels_are_unpacked_by_the_clientside_callback():
+    app_source = Path(__file__).parent.parent.joinpath("src", "app.py").read_text()
+    style = app_source.split('APPLY_CHART_STYLE = """')[1].split('"""')[0]
+
+    assert "(trace.meta || {}).customdata" in style
+    assert "packed.labels[column][codes[i]]" in style
+
+
+def run_price_chart_style(figure, thresholds, lang="en"):
+    """The price chart APPLY_PRICE_CHART_STYLE draws in the browser from
+    `figure` (as Dash sends it) at each of `thresholds`, run under node."""
+    script = f"""
+    var dash_clientside = {{no_update: {{}}}};
+    var style = ({APPLY_PRICE_CHART_STYLE.strip()});
+    var figure = {to_json_plotly(figure)};
+    var themes = {{light: {{background: "", text: "", grid: ""}}}};
+    var tables = {json.dumps(STRING_TABLES)};
+    console.log(JSON.stringify({json.dumps(thresholds)}.map(function(threshold) {{
+        return style(figure, "light", "{lang}", threshold, themes, tables);
+    }})));
+    """
+    result = subprocess.run(
+        ["node", "-e", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def anomaly_points(figure):
+    return [
+        [
+            trace["hovertemplate"],
+            list(trace["x"]),
+            list(trace["y"]),
+            trace["showlegend"],
+        ]
+        for trace in figure["data"]
+        if trace.get("legendgroup") == "anomaly"
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_the_threshold_slider_marks_what_detect_price_anomalies_flags():
+    regions = ["Albany", "Boise", "Chicago"]
+    filtered = filter_data(regions, "organic", "2015-01-01", "2016-12-31")
+    figure = create_price_chart(filtered)
+    thresholds = [1.5, 2.0, 2.4, 3.1, 4.0]
+
+    drawn = run_price_chart_style(figure, thresholds)
+
+    # At the initial threshold the browser draws the server's markers.
+    assert anomaly_points(drawn[1]) == json.loads(
+        to_json_plotly(anomaly_points(figure))
+    )
+    for threshold, styled in zip(thresholds, drawn):
+        expected = {}
+        for region in regions:
+            rows = filtered[filtered["region"] == region]
+            flagged = detect_price_anomalies(rows["AveragePrice"], threshold)
+            if flagged.any():
+                expected[region] = rows.loc[flagged, "AveragePrice"].tolist()
+        marked = {
+            hovertemplate.split("(")[1].split(")")[0]: y
+            for hovertemplate, _, y, _ in anomaly_points(styled)
+        }
+        assert marked == expected
+        assert [legend for *_, legend in anomaly_points(styled)] == [
+            index == 0 for index in range(len(expected))
+        ]
+        assert region_traces_only(styled) == region_traces_only(drawn[0])
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_the_threshold_slider_never_marks_flat_or_one_point_series():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2015-01-04", "2015-01-04", "2015-01-11"]),
+            "region": ["Albany", "Boise", "Boise"],
+            "AveragePrice": [1.5, 1.0, 1.0],
+        }
+    )
+
+    drawn = run_price_chart_style(create_price_chart(frame), [0.0, 1.5], lang="es")
+
+    assert [anomaly_points(styled) for styled in drawn] == [[], []]
+    assert drawn[0]["data"][0]["meta"]["anomaly"]["trace"]["name"] == t(
+        "charts.price.anomaly_label", "es"
+    )
+
+
 CHART_BUILDERS_WITH_FILTERED_DATA = [
     lambda filtered: create_price_chart(filtered),
     lambda filtered: create_volume_chart(filtered),
@@ -872,6 +1303,73 @@ def test_type_color_map_is_reused_unchanged_in_dark_mode():
     assert colors_by_name["Organic"] == "#B4432E"
 
 
+def test_long_price_lines_are_downsampled_keeping_every_anomaly():
+    filtered = data.query("region in ['Albany', 'Boise'] and type == 'organic'")
+
+    with patch("app.CHART_WIDTH_PX", 40):
+        figure = create_price_chart(filtered, downsample=True)
+        full = create_price_chart(filtered, downsample=False)
+
+    assert [len(trace["x"]) for trace in region_traces_only(full)] == [169, 169]
+    lines = {trace["name"]: trace for trace in region_traces_only(figure)}
+    anomalies = [
+        trace for trace in figure["data"] if trace.get("legendgroup") == "anomaly"
+    ]
+    assert anomalies
+    for trace in anomalies:
+        region = trace["hovertemplate"].split("(")[1].split(")")[0]
+        line = lines[region]
+        # Every point the slider can flag is kept, not just today's marks.
+        prices = filtered.loc[filtered["region"] == region, "AveragePrice"]
+        flaggable = detect_price_anomalies(prices, ANOMALY_THRESHOLD_MIN)
+        assert len(line["x"]) <= max(40, flaggable.sum() + 3)
+        assert set(filtered.loc[flaggable[flaggable].index, "Date"]) <= set(line["x"])
+        assert set(trace["x"]) <= set(line["x"])
+        assert line["x"].is_monotonic_increasing
+    assert [trace["x"].tolist() for trace in anomalies] == [
+        trace["x"].tolist()
+        for trace in full["data"]
+        if trace.get("legendgroup") == "anomaly"
+    ]
+
+
+def test_downsampling_keeps_adjacent_anomalies():
+    dates = pd.date_range("2000-01-02", periods=5_000, freq="D")
+    prices = pd.Series(1.0 + 0.01 * np.sin(np.arange(5_000) / 50.0))
+    prices[2_500:2_503] = 5.0
+    frame = pd.DataFrame(
+        {"Date": dates, "region": "Albany", "type": "organic", "AveragePrice": prices}
+    )
+
+    with patch("app.CHART_WIDTH_PX", 200):
+        figure = create_price_chart(frame, downsample=True)
+
+    (line,) = region_traces_only(figure)
+    (markers,) = [
+        trace for trace in figure["data"] if trace.get("legendgroup") == "anomaly"
+    ]
+    assert detect_price_anomalies(prices).sum() == 3
+    assert list(markers["x"]) == list(dates[2_500:2_503])
+    assert set(markers["x"]) <= set(line["x"])
+    assert len(line["x"]) <= 200
+
+
+def test_long_volume_lines_are_downsampled_unless_disabled():
+    filtered = data.query("region == 'Albany' and type == 'organic'")
+
+    with patch("app.CHART_WIDTH_PX", 40):
+        (line,) = create_volume_chart(filtered, downsample=True)["data"]
+        with patch("app.LINE_DOWNSAMPLE", False):
+            (full,) = create_volume_chart(filtered)["data"]
+
+    assert len(line["x"]) == 40
+    assert (line["x"].iloc[0], line["x"].iloc[-1]) == (
+        filtered["Date"].min(),
+        filtered["Date"].max(),
+    )
+    assert len(full["x"]) == len(filtered)
+
+
 def test_update_charts_shows_one_line_per_selected_region():
     price_fig, volume_fig = update_charts(
         ["Albany", "Chicago"], "organic", "2015-01-01", "2015-12-31"
@@ -894,16 +1392,7 @@ def test_update_charts_single_region_behaves_like_before():
     assert volume_fig["data"][0]["name"] == "Albany"
 
 
-def test_update_charts_honors_the_resolved_theme_input():
-    price_fig, volume_fig = update_charts(
-        ["Albany"], "organic", "2015-01-01", "2015-12-31", "en", "dark"
-    )
-
-    assert price_fig["layout"]["plot_bgcolor"] == "#241C13"
-    assert volume_fig["layout"]["plot_bgcolor"] == "#241C13"
-
-
-def test_update_charts_defaults_to_light_theme_when_resolved_theme_is_none():
+def test_chart_callbacks_build_light_figures_for_the_client_to_theme():
     price_fig, volume_fig = update_charts(
         ["Albany"], "organic", "2015-01-01", "2015-12-31"
     )
@@ -912,6 +1401,51 @@ def test_update_charts_defaults_to_light_theme_when_resolved_theme_is_none():
     assert volume_fig["layout"]["plot_bgcolor"] == "#F6F1E4"
 
 
+def test_theme_toggle_reaches_no_server_callback():
+    """A theme change must not re-filter or rebuild any chart server-side:
+    every callback reading theme-resolved is clientside, so toggling it
+    issues no _dash-update-component request."""
+    theme_readers = [
+        entry
+        for entry in app.callback_map.values()
+        if "theme-resolved" in {item["id"] for item in entry["inputs"] + entry["state"]}
+    ]
+
+    assert theme_readers
+    assert all("callback" not in entry for entry in theme_readers)
+
+
+@pytest.mark.parametrize(
+    "graph_id", ["price-chart", "volume-chart", "scatter-chart", "box-plot-chart"]
+)
+def test_each_chart_is_styled_clientside_from_its_base_figure(graph_id):
+    entry = app.callback_map[f"{graph_id}.figure"]
+
+    assert "callback" not in entry
+    # The price chart also re-marks its anomalies at the slider's threshold.
+    threshold = ["anomaly-threshold"] if graph_id == "price-chart" else []
+    assert [item["id"] for item in entry["inputs"]] == [
+        f"{graph_id}-base",
+        "theme-resolved",
+        "language-toggle",
+        *threshold,
+    ]
+    assert [item["id"] for item in entry["state"]] == [
+        "chart-themes",
+        "string-tables",
+    ]
+    assert find_component_by_id(app.layout, f"{graph_id}-base") is not None
+
+
+def test_chart_themes_store_carries_both_themes_chrome_tokens():
+    store = find_component_by_id(app.layout, "chart-themes")
+
+    assert store.data["light"]["background"] == "#F6F1E4"
+    assert store.data["dark"]["background"] == "#241C13"
+    assert store.data["dark"]["text"] == "#EDE6D6"
+    assert set(store.data["dark"]["legend"]) == {"bgcolor", "bordercolor"}
+
+
 def test_update_charts_returns_empty_state_for_no_matching_data():
     price_fig, volume_fig = update_charts(
         ["Albany"], "organic", "1999-01-01", "1999-12-31"
@@ -1007,21 +1541,6 @@ def test_update_scatter_chart_returns_valid_figure_for_matching_data():
     assert figure["layout"]["title"]["text"] == "Average Price vs Total Volume"
 
 
-def test_update_scatter_chart_honors_the_resolved_theme_input():
-    figure = update_scatter_chart(
-        ["Albany"],
-        "organic",
-        "2015-01-01",
-        "2015-12-31",
-        "AveragePrice",
-        "Total Volume",
-        "en",
-        "dark",
-    )
-
-    assert figure["layout"]["plot_bgcolor"] == "#241C13"
-
-
 def test_update_scatter_chart_pools_data_from_multiple_regions():
     figure = update_scatter_chart(
         ["Albany", "Chicago"],
@@ -1111,21 +1630,6 @@ def test_update_box_plot_applies_query_for_each_group_by_mode(
     assert figure["data"]
 
 
-def test_update_box_plot_honors_the_resolved_theme_input():
-    figure = update_box_plot(
-        ["Albany"],
-        "organic",
-        "2015-01-01",
-        "2015-12-31",
-        "AveragePrice",
-        "type",
-        "en",
-        "dark",
-    )
-
-    assert figure["layout"]["plot_bgcolor"] == "#241C13"
-
-
 def test_update_box_plot_pools_data_from_multiple_regions_when_grouped_by_type():
     figure = update_box_plot(
         ["Albany", "Chicago"],
@@ -1293,9 +1797,41 @@ def test_update_download_controls_disables_button_when_no_regions_selected():
     assert status == EMPTY_REGION_MESSAGE
 
 
+def test_update_download_controls_counts_rows_without_selecting_them():
+    with patch("app.select_filter") as select:
+        enabled = update_download_controls(
+            ["Albany"], "organic", "2015-01-01", "2015-12-31"
+        )
+        disabled = update_download_controls(
+            ["Albany"], "organic", "1999-01-01", "1999-12-31"
+        )
+
+    assert enabled == (False, "")
+    assert disabled == (True, t("download.no_data", "en"))
+    select.assert_not_called()
+
+
+def test_chart_callbacks_select_rows_only_to_build_a_figure():
+    filters = (["Albany"], "organic", "2015-01-01", "2015-12-31")
+    empty_filters = (["Albany"], "organic", "1999-01-01", "1999-12-31")
+
+    with patch("app.select_filter", wraps=select_filter) as select:
+        update_charts(*filters)
+        update_scatter_chart(*filters, "Total Volume", "AveragePrice")
+        built = select.call_count
+        update_charts(*filters)
+        update_scatter_chart(*filters, "Total Volume", "AveragePrice")
+        update_charts(*empty_filters)
+        update_scatter_chart(*empty_filters, "Total Volume", "AveragePrice")
+
+    # Price, volume and scatter figures; cached and empty ones select nothing.
+    assert built == 3
+    assert select.call_count == built
+
+
 def test_update_download_controls_callback_handles_exception_without_crashing(caplog):
     with caplog.at_level(logging.ERROR):
-        with patch("app.filter_data", side_effect=RuntimeError("boom")):
+        with patch("app.count_filter", side_effect=RuntimeError("boom")):
             with patch("app.sentry_sdk.capture_exception") as mock_capture:
                 disabled, status = update_download_controls(
                     ["Albany"], "organic", "2015-01-01", "2015-12-31"
@@ -1418,6 +1954,8 @@ def test_update_ui_language_translates_static_text_to_spanish():
         box_plot_column_options,
         box_plot_groupby_label,
         box_plot_groupby_options,
+        anomaly_feed_title,
+        anomaly_threshold_label,
     ) = update_ui_language("es")
 
     assert header_subtitle[0] == t("header.subtitle_by", "es")
@@ -1434,6 +1972,8 @@ def test_update_ui_language_translates_static_text_to_spanish():
     assert y_axis_label[0] == t("filters.y_axis.label", "es")
     assert box_plot_column_label[0] == t("filters.box_plot_column.label", "es")
     assert box_plot_groupby_label[0] == t("filters.box_plot_groupby.label", "es")
+    assert anomaly_feed_title == t("sections.anomaly_feed_title", "es")
+    assert anomaly_threshold_label[0] == t("filters.anomaly_threshold.label", "es")
 
     assert {opt["value"] for opt in type_options} == {"conventional", "organic"}
     assert {opt["label"] for opt in type_options} == {"Convencional", "Orgánico"}
@@ -1511,6 +2051,98 @@ def test_create_box_plot_region_grouping_spanish_xaxis_title():
     assert {trace["name"] for trace in figure["data"]} == {"Convencional", "Orgánico"}
 
 
+def _chart_texts(figure):
+    layout = figure["layout"]
+    return (
+        layout["title"]["text"],
+        layout["xaxis"]["title"],
+        layout["yaxis"]["title"],
+        [(trace["name"], trace.get("hovertemplate")) for trace in figure["data"]],
+    )
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda rows, lang: create_price_chart(rows, lang),
+        lambda rows, lang: create_volume_chart(rows, lang),
+        lambda rows, lang: create_scatter_chart(
+            rows, "AveragePrice", "Total Volume", lang
+        ),
+        lambda rows, lang: create_box_plot(rows, "Total Bags", "type", lang),
+    ],
+)
+def test_translate_figure_relabels_a_chart_without_rebuilding_it(build):
+    filtered = data.query("region in ['Albany', 'Boise']")
+    english = build(filtered, "en")
+
+    spanish = translate_figure(english, "es")
+
+    assert _chart_texts(spanish) == _chart_texts(build(filtered, "es"))
+    assert _chart_texts(english) == _chart_texts(build(filtered, "en"))
+    assert spanish["data"][0]["y"] is english["data"][0]["y"]
+
+
+def test_translate_figure_reads_text_parts_back_from_json():
+    figure = json.loads(
+        json.dumps(empty_state_figure(localized(("t", "empty.select_region"))))
+    )
+
+    spanish = translate_figure(figure, "es")
+
+    assert spanish["layout"]["title"] == t("empty.no_data_filters", "es")
+    assert spanish["layout"]["annotations"][0]["text"] == t("empty.select_region", "es")
+
+
+def test_language_toggle_reaches_no_server_chart_callback():
+    """The chart callbacks read the language as State, so it only labels
+    figures built for a filter change; a language switch is applied to the
+    figures already in the browser, from the string-tables store."""
+    language_triggered = [
+        output
+        for key, entry in app.callback_map.items()
+        if "callback" in entry
+        and "language-toggle" in {item["id"] for item in entry["inputs"]}
+        for output in key.strip(".").split("...")
+    ]
+
+    assert "summary-panel.children" in language_triggered
+    assert not [output for output in language_triggered if "chart" in output]
+    tables = find_component_by_id(app.layout, "string-tables").data
+    assert tables["t"]["es"]["charts.price.title"] == t("charts.price.title", "es")
+
+
+def test_summary_panel_language_switch_reuses_its_numbers():
+    filters = (["Albany"], "organic", "2015-01-01", "2015-12-31")
+
+    with patch("app.summary_kpis", wraps=summary_kpis) as compute:
+        english = update_summary_panel(*filters, lang="en")
+        spanish = update_summary_panel(*filters, lang="es")
+
+    assert compute.call_count == 1
+    assert any(
+        column_label("AveragePrice", "es") in text for text in collect_text(spanish)
+    )
+    assert collect_text(english) != collect_text(spanish)
+
+
+def test_summary_panel_shares_numbers_across_equivalent_filters():
+    hits = summary_cache.stats().hits
+
+    with patch("app.summary_kpis", wraps=summary_kpis) as compute:
+        first = update_summary_panel(
+            ["Boston", "Albany"], "organic", "2015-01-01", "2015-12-31"
+        )
+        # Same weeks and regions, spelled differently.
+        second = update_summary_panel(
+            ["Albany", "Boston", "Albany"], "organic", "2015-01-03", "2015-12-29"
+        )
+
+    assert compute.call_count == 1
+    assert summary_cache.stats().hits == hits + 1
+    assert collect_text(first) == collect_text(second)
+
+
 def test_create_summary_panel_spanish_translates_card_labels():
     regions, avocado_type = ["Albany"], "organic"
     start_date, end_date = "2015-01-01", "2015-12-31"
@@ -1536,7 +2168,7 @@ def test_update_charts_returns_spanish_empty_state_message():
 
 def test_update_summary_panel_callback_handles_exception_in_spanish(caplog):
     with caplog.at_level(logging.ERROR):
-        with patch("app.filter_data", side_effect=RuntimeError("boom")):
+        with patch("app.summary_kpis", side_effect=RuntimeError("boom")):
             panel = update_summary_panel(
                 ["Albany"], "organic", "2015-01-01", "2015-12-31", lang="es"
             )
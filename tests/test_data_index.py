@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import data, filter_data, select_rows
+from data_index import BlockIndex
+
+
+def query_positions(frame, regions, avocado_types, start_date, end_date):
+    """Reference answer: the boolean-scan query the index replaces."""
+    mask = (frame["Date"] >= start_date) & (frame["Date"] <= end_date)
+    if regions is not None:
+        mask &= frame["region"].isin(regions)
+    if avocado_types is not None:
+        mask &= frame["type"].isin(avocado_types)
+    return np.flatnonzero(mask.to_numpy())
+
+
+@pytest.mark.parametrize(
+    "regions,avocado_types,start_date,end_date",
+    [
+        (["Albany"], ["organic"], "2015-01-01", "2015-12-31"),
+        (["Chicago", "Albany"], ["conventional"], "2016-03-01", "2017-06-30"),
+        (None, ["organic"], "2015-01-01", "2018-12-31"),
+        (["Boise", "Denver"], None, "2017-01-01", "2017-01-31"),
+        (["Albany"], ["organic"], "2015-01-04", "2015-01-04"),
+        (["Albany"], ["organic"], "1999-01-01", "1999-12-31"),
+        (["Nowhere"], ["organic"], "2015-01-01", "2018-12-31"),
+        ([], ["organic"], "2015-01-01", "2018-12-31"),
+    ],
+)
+def test_block_index_matches_a_full_scan(regions, avocado_types, start_date, end_date):
+    index = BlockIndex(data)
+
+    result = index.positions(regions, avocado_types, start_date, end_date)
+
+    expected = query_positions(data, regions, avocado_types, start_date, end_date)
+    assert list(result) == list(expected)
+    assert index.count(regions, avocado_types, start_date, end_date) == len(expected)
+
+
+def test_filter_data_is_identical_to_the_query_it_replaces():
+    regions, avocado_type = ["Chicago", "Albany", "Boise"], "organic"
+    start_date, end_date = "2015-06-01", "2017-06-30"
+
+    result = filter_data(regions, avocado_type, start_date, end_date)
+    expected = data.query(
+        "region in @regions and type == @avocado_type"
+        " and Date >= @start_date and Date <= @end_date"
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_select_rows_without_a_region_filter_matches_the_box_plot_query():
+    avocado_type, start_date, end_date = "organic", "2016-01-01", "2016-12-31"
+
+    result = select_rows(None, [avocado_type], start_date, end_date)
+    expected = data.query(
+        "type == @avocado_type and Date >= @start_date and Date <= @end_date"
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_block_index_skips_rows_with_missing_region_type_or_date():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(
+                ["2015-01-04", None, "2015-01-11", "2015-01-18", "2015-01-04"]
+            ),
+            "region": ["Albany", "Albany", None, "Albany", "Albany"],
+            "type": ["organic", "organic", "organic", None, "organic"],
+        }
+    )
+    index = BlockIndex(frame)
+
+    assert list(index.positions(None, None, "2015-01-01", "2015-12-31")) == [0, 4]
+    assert list(index.positions(None, None, None, None)) == [0, 4]
+    assert index.count(None, None, None, None) == 2
+
+
+def test_block_index_on_an_empty_frame_matches_nothing():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(pd.Series([], dtype="object")),
+            "region": pd.Series([], dtype="object"),
+            "type": pd.Series([], dtype="object"),
+        }
+    )
+    index = BlockIndex(frame)
+
+    assert index.blocks == {}
+    assert len(index.positions(None, None, "2015-01-01", "2015-12-31")) == 0
+
+
+def test_with_rows_matches_an_index_built_from_scratch():
+    history = data[data["Date"] < "2018-01-01"]
+    additions = pd.concat(
+        [
+            data[data["Date"] >= "2018-01-01"],
+            data.head(4).assign(region="Atlantis"),
+            data.tail(2).assign(Date=pd.NaT),
+            data.head(1).assign(type=None),
+        ]
+    ).sort_values("Date", kind="stable")
+    frame_slots = (
+        history["Date"].to_numpy().searchsorted(additions["Date"].to_numpy(), "right")
+    )
+    order = np.insert(
+        np.arange(len(history)),
+        frame_slots,
+        len(history) + np.arange(len(additions)),
+    )
+    merged = pd.concat([history, additions]).iloc[order]
+
+    extended = BlockIndex(history).with_rows(
+        frame_slots,
+        additions["region"].to_numpy(),
+        additions["type"].to_numpy(),
+        additions["Date"].to_numpy(),
+    )
+
+    fresh = BlockIndex(merged)
+    assert extended.blocks == fresh.blocks
+    assert extended.regions == fresh.regions
+    for args in [
+        (None, None, None, None),
+        (["Albany", "Atlantis"], ["organic"], "2017-06-01", "2018-12-31"),
+    ]:
+        assert list(extended.positions(*args)) == list(fresh.positions(*args))
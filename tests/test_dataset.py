@@ -0,0 +1,659 @@
+import logging
+import os
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+import app
+import datastore
+from data_index import BlockIndex
+from dataset import (
+    DataReloader,
+    DatasetSnapshot,
+    LazySnapshot,
+    PandasQueries,
+    PartitionedSnapshot,
+)
+from translations import t
+
+SAMPLE_CSV = (
+    ",Date,AveragePrice,Total Volume,type,year,region\n"
+    "0,2015-01-11,1.40,1200.5,organic,2015,Albany\n"
+    "1,2015-01-04,1.50,1000.0,organic,2015,Albany\n"
+    "2,2015-01-04,0.90,5000.25,conventional,2015,Boise\n"
+)
+EXTRA_ROW = "3,2016-02-07,1.10,800.0,organic,2016,Denver\n"
+
+
+@pytest.fixture
+def sample_csv(tmp_path, monkeypatch):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV)
+    monkeypatch.setenv("AVOCADO_DATA_PATH", str(csv_path))
+    monkeypatch.delenv("AVOCADO_COLUMN_STORE", raising=False)
+    return csv_path
+
+
+def load_snapshot():
+    return DatasetSnapshot.build(*app.load_dataset())
+
+
+def touch_with_new_content(path, content):
+    previous = os.stat(path).st_mtime_ns
+    path.write_text(content)
+    os.utime(path, ns=(previous + 1_000_000_000, previous + 1_000_000_000))
+
+
+class SnapshotHolder:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def swap(self, snapshot):
+        previous, self.snapshot = self.snapshot, snapshot
+        return previous
+
+
+def test_snapshot_derives_regions_types_and_date_bounds(sample_csv):
+    snapshot = load_snapshot()
+
+    assert snapshot.regions == ["Albany", "Boise"]
+    assert snapshot.avocado_types == ["conventional", "organic"]
+    assert snapshot.min_date.isoformat() == "2015-01-04"
+    assert snapshot.max_date.isoformat() == "2015-01-11"
+
+
+def test_snapshot_select_matches_a_full_scan(sample_csv):
+    snapshot = load_snapshot()
+
+    result = snapshot.select(["Albany"], ["organic"], "2015-01-01", "2015-01-31")
+
+    expected = snapshot.data.query(
+        "region == 'Albany' and type == 'organic'"
+        " and Date >= '2015-01-01' and Date <= '2015-01-31'"
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_pandas_queries_require_select():
+    class WithoutSelect(PandasQueries):
+        pass
+
+    with pytest.raises(TypeError, match="select"):
+        WithoutSelect()  # type: ignore[abstract]
+
+
+def test_daily_data_is_filtered_to_the_exact_dates(tmp_path, monkeypatch):
+    dates = pd.date_range("2020-01-01", "2020-01-31", freq="D")
+    csv_path = tmp_path / "daily.csv"
+    pd.DataFrame(
+        {
+            "Date": dates.strftime("%Y-%m-%d"),
+            "AveragePrice": 1.0,
+            "Total Volume": 100.0,
+            "type": "organic",
+            "region": "A",
+        }
+    ).to_csv(csv_path)
+    monkeypatch.setenv("AVOCADO_DATA_PATH", str(csv_path))
+    monkeypatch.delenv("AVOCADO_COLUMN_STORE", raising=False)
+    snapshot = load_snapshot()
+
+    rows = app.filter_data(["A"], "organic", "2020-01-03", "2020-01-20", snapshot)
+
+    assert len(rows) == 18
+    assert (rows["Date"].min(), rows["Date"].max()) == (
+        pd.Timestamp("2020-01-03"),
+        pd.Timestamp("2020-01-20"),
+    )
+
+
+def test_reloader_ignores_an_unchanged_file(sample_csv):
+    holder = SnapshotHolder(load_snapshot())
+    reloader = DataReloader(str(sample_csv), load_snapshot, holder.swap, 1.0)
+
+    assert reloader.poll() is False
+    assert reloader.poll() is False
+
+
+def test_reloader_waits_for_the_file_to_settle_before_swapping(sample_csv, caplog):
+    original = load_snapshot()
+    holder = SnapshotHolder(original)
+    reloader = DataReloader(str(sample_csv), load_snapshot, holder.swap, 1.0)
+
+    touch_with_new_content(sample_csv, SAMPLE_CSV + EXTRA_ROW)
+    assert reloader.poll() is False
+    assert holder.snapshot is original
+
+    with caplog.at_level(logging.INFO, logger="dataset"):
+        assert reloader.poll() is True
+
+    assert len(holder.snapshot.data) == 4
+    assert holder.snapshot.regions == ["Albany", "Boise", "Denver"]
+    assert "3 -> 4 rows" in caplog.text
+    assert reloader.poll() is False
+
+
+def test_failed_reload_keeps_the_previous_snapshot(sample_csv, caplog):
+    original = load_snapshot()
+    holder = SnapshotHolder(original)
+    reloader = DataReloader(str(sample_csv), load_snapshot, holder.swap, 1.0)
+
+    touch_with_new_content(sample_csv, "not,an,avocado,file\n1,2,3,4\n")
+    reloader.poll()
+    with caplog.at_level(logging.ERROR, logger="dataset"):
+        assert reloader.poll() is False
+
+    assert holder.snapshot is original
+    assert "keeping the current data" in caplog.text
+    # Not retried until the file changes again.
+    assert reloader.poll() is False
+
+    touch_with_new_content(sample_csv, SAMPLE_CSV + EXTRA_ROW)
+    reloader.poll()
+    assert reloader.poll() is True
+    assert len(holder.snapshot.data) == 4
+
+
+def test_reloader_thread_stops_promptly(sample_csv):
+    holder = SnapshotHolder(load_snapshot())
+    reloader = DataReloader(str(sample_csv), load_snapshot, holder.swap, 0.01)
+
+    reloader.start()
+    reloader.stop()
+    reloader.join(timeout=1)
+
+    assert not reloader.is_alive()
+
+
+@pytest.fixture
+def swapped_in(sample_csv):
+    touch_with_new_content(sample_csv, SAMPLE_CSV + EXTRA_ROW)
+    previous = app.swap_dataset(load_snapshot())
+    yield app.current_dataset()
+    app.swap_dataset(previous)
+
+
+def test_module_attributes_follow_the_live_snapshot(swapped_in):
+    assert app.data is swapped_in.data
+    assert app.data_index is swapped_in.index
+    assert app.regions == ["Albany", "Boise", "Denver"]
+    assert app.DATA_MAX_DATE.isoformat() == "2016-02-07"
+
+
+def test_callbacks_read_the_swapped_in_snapshot(swapped_in):
+    filtered = app.filter_data(["Denver"], "organic", "2016-01-01", "2016-12-31")
+
+    assert len(filtered) == 1
+    assert isinstance(app.current_dataset().index, BlockIndex)
+
+
+def test_page_load_refreshes_region_options_and_date_bounds(swapped_in):
+    options, min_date, max_date = app.refresh_dataset_controls("/")
+
+    assert [option["value"] for option in options] == ["Albany", "Boise", "Denver"]
+    assert (min_date, max_date) == ("2015-01-04", "2016-02-07")
+
+
+def test_reloader_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("AVOCADO_DATA_RELOAD_INTERVAL", raising=False)
+
+    assert app.start_data_reloader() is None
+
+
+def test_reloader_watches_the_column_store_manifest(tmp_path, monkeypatch):
+    monkeypatch.setenv("AVOCADO_DATA_RELOAD_INTERVAL", "60")
+    monkeypatch.setenv("AVOCADO_COLUMN_STORE", str(tmp_path))
+
+    reloader = app.start_data_reloader()
+    try:
+        assert reloader is not None
+        assert reloader.watch_path == str(tmp_path / "manifest.json")
+        assert reloader.is_alive()
+    finally:
+        reloader.stop()
+        reloader.join(timeout=1)
+
+
+def test_partition_dir_serves_a_lazy_snapshot(sample_csv, tmp_path, monkeypatch):
+    datastore.ingest_partitions(str(sample_csv), str(tmp_path / "parts"))
+    monkeypatch.setenv("AVOCADO_PARTITION_DIR", str(tmp_path / "parts"))
+
+    snapshot = app.load_snapshot()
+    previous = app.swap_dataset(snapshot)
+    try:
+        assert isinstance(snapshot, PartitionedSnapshot)
+        assert snapshot.row_count == 3
+        assert app.regions == ["Albany", "Boise"]
+        assert len(app.filter_data(["Albany"], "organic", None, None)) == 2
+        summary = app.create_summary_panel(
+            app.filter_data(["Albany"], "organic", "2015-01-08", "2015-01-14"),
+            ["Albany"],
+            "organic",
+            "2015-01-08",
+            "2015-01-14",
+        )
+        assert "-6.7%" in str(summary)
+        stats = snapshot.summary_stats(["Albany"], ["organic"], None, None)
+        assert (stats["avg_price"], stats["total_volume"]) == (
+            pytest.approx(1.45),
+            pytest.approx(2200.5),
+        )
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_partition_store_without_dated_rows_is_rejected(tmp_path):
+    csv_path = tmp_path / "empty.csv"
+    csv_path.write_text(SAMPLE_CSV.splitlines()[0] + "\n")
+    datastore.ingest_partitions(str(csv_path), str(tmp_path / "parts"))
+
+    with pytest.raises(ValueError, match="no dated rows"):
+        PartitionedSnapshot.open(str(tmp_path / "parts"))
+
+
+# --- Lazy loading from the metadata sidecar ----------------------------------
+
+
+class CountingLoader:
+    def __init__(self, load):
+        self.load = load
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.load()
+
+
+def sidecar_metadata(sample_csv):
+    frame = datastore.parse_csv(str(sample_csv))
+    return datastore.dataset_metadata(frame)
+
+
+def test_lazy_snapshot_serves_metadata_without_loading(sample_csv):
+    loader = CountingLoader(load_snapshot)
+    lazy = LazySnapshot(sidecar_metadata(sample_csv), loader)
+
+    assert lazy.regions == ["Albany", "Boise"]
+    assert lazy.avocado_types == ["conventional", "organic"]
+    assert (lazy.min_date.isoformat(), lazy.max_date.isoformat()) == (
+        "2015-01-04",
+        "2015-01-11",
+    )
+    assert lazy.row_count == 3
+    assert loader.calls == 0
+    assert not lazy.is_loaded
+
+
+def test_lazy_snapshot_loads_once_on_first_select(sample_csv):
+    loader = CountingLoader(load_snapshot)
+    lazy = LazySnapshot(sidecar_metadata(sample_csv), loader)
+
+    threads = [
+        threading.Thread(target=lazy.select, args=(["Albany"], ["organic"], None, None))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert len(lazy.select(["Albany"], ["organic"], None, None)) == 2
+    assert lazy.count(["Albany"], ["organic"], None, None) == 2
+    assert isinstance(lazy.index, BlockIndex)
+
+
+def test_lazy_snapshot_prefers_loaded_values_over_a_wrong_sidecar(sample_csv, caplog):
+    metadata = {**sidecar_metadata(sample_csv), "regions": ["Stale"], "rows": 99}
+    lazy = LazySnapshot(metadata, load_snapshot)
+
+    with caplog.at_level(logging.WARNING, logger="dataset"):
+        assert len(lazy.data) == 3
+
+    assert lazy.regions == ["Albany", "Boise"]
+    assert lazy.row_count == 3
+    assert "sidecar listed 99" in caplog.text
+
+
+def test_warm_up_loads_in_the_background(sample_csv):
+    lazy = LazySnapshot(sidecar_metadata(sample_csv), load_snapshot)
+
+    lazy.warm_up().join(timeout=5)
+
+    assert lazy.is_loaded
+
+
+def test_failed_warm_up_is_logged_and_retried_on_access(sample_csv, caplog):
+    attempts = []
+
+    def flaky_load():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise OSError("disk went away")
+        return load_snapshot()
+
+    lazy = LazySnapshot(sidecar_metadata(sample_csv), flaky_load)
+    with caplog.at_level(logging.ERROR, logger="dataset"):
+        lazy.warm_up().join(timeout=5)
+
+    assert "warm-up load failed" in caplog.text
+    assert not lazy.is_loaded
+    assert lazy.row_count == 3 and len(lazy.data) == 3
+
+
+def test_load_snapshot_with_a_sidecar_skips_the_csv_parse(sample_csv, monkeypatch):
+    monkeypatch.setenv("AVOCADO_DATA_CACHE", "false")
+    app.load_snapshot()  # writes the sidecar
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError("read_csv called despite a metadata sidecar")
+
+    monkeypatch.setattr("datastore.pd.read_csv", fail_read_csv)
+    snapshot = app.load_snapshot(lazy=True)
+
+    assert isinstance(snapshot, LazySnapshot)
+    assert snapshot.regions == ["Albany", "Boise"]
+
+
+def test_load_snapshot_without_a_sidecar_loads_and_writes_one(sample_csv):
+    snapshot = app.load_snapshot(lazy=True)
+
+    assert isinstance(snapshot, DatasetSnapshot)
+    assert datastore.read_metadata_sidecar(str(sample_csv))["rows"] == 3
+
+
+def test_url_decoding_and_page_load_do_not_load_a_lazy_dataset(sample_csv):
+    app.load_snapshot()
+    lazy = app.load_snapshot(lazy=True)
+    previous = app.swap_dataset(lazy)
+    try:
+        filters = app.decode_query_to_filters("?region=Boise&start=2015-01-05")
+        options, _, max_date = app.refresh_dataset_controls("/")
+
+        assert filters["region"] == ["Boise"]
+        assert filters["start"] == "2015-01-05"
+        assert [option["value"] for option in options] == ["Albany", "Boise"]
+        assert max_date == "2015-01-11"
+        assert not lazy.is_loaded
+    finally:
+        app.swap_dataset(previous)
+
+
+# --- Incremental appends -----------------------------------------------------
+
+BATCH_CSV = (
+    ",Date,AveragePrice,Total Volume,type,year,region\n"
+    "7,2016-02-07,1.10,800.0,organic,2016,Denver\n"
+    "8,2015-01-04,1.55,1000.0,organic,2015,Albany\n"
+)
+
+
+LATER_BATCH_CSV = (
+    ",Date,AveragePrice,Total Volume,type,year,region\n"
+    "7,2015-01-18,1.30,900.0,organic,2015,Albany\n"
+    "8,2015-01-25,0.95,4800.0,conventional,2015,Boise\n"
+)
+
+
+def _write_batch(sample_csv, contents):
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(contents)
+    return str(batch_path)
+
+
+def test_append_batch_merges_into_the_live_dataset_and_the_source(sample_csv):
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(BATCH_CSV)
+    previous = app.swap_dataset(load_snapshot())
+    try:
+        result = app.append_batch(str(batch_path))
+
+        live = app.current_dataset()
+        assert (result.inserted, result.replaced) == (1, 1)
+        assert live.row_count == 4
+        assert live.regions == ["Albany", "Boise", "Denver"]
+        assert live.max_date.isoformat() == "2016-02-07"
+        albany = app.filter_data(["Albany"], "organic", "2015-01-04", "2015-01-04")
+        assert list(albany["AveragePrice"]) == [1.55]
+        assert datastore.read_metadata_sidecar(str(sample_csv)) == live.metadata()
+        assert len(load_snapshot().data) == 4
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_append_batch_leaves_the_reloader_and_next_load_nothing_to_parse(
+    sample_csv, monkeypatch
+):
+    batch_path = _write_batch(sample_csv, LATER_BATCH_CSV)
+    previous = app.swap_dataset(load_snapshot())
+    reloader = DataReloader(str(sample_csv), load_snapshot, app.swap_dataset, 1.0)
+    monkeypatch.setattr(app, "data_reloader", reloader)
+    try:
+        app.current_dataset().dates
+        app.append_batch(batch_path)
+
+        live = app.current_dataset()
+        assert reloader.poll() is False
+        assert reloader.poll() is False
+        assert app.current_dataset() is live
+        assert "dates" in live.__dict__
+        assert live.dates.tolist() == load_snapshot().dates.tolist()
+        cached = datastore.read_column_cache(str(sample_csv))
+        assert cached is not None
+        pd.testing.assert_frame_equal(cached, live.data)
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_append_extends_a_built_kpi_index_with_later_weeks(sample_csv):
+    snapshot = load_snapshot()
+    later = datastore.read_batch(_write_batch(sample_csv, LATER_BATCH_CSV))
+    earlier = datastore.read_batch(_write_batch(sample_csv, BATCH_CSV))
+    unbuilt, _ = snapshot.append(later)
+    snapshot.kpi_index
+
+    extended, _ = snapshot.append(later)
+    rebuilt, _ = snapshot.append(earlier)
+
+    # Only an index already built is extended, and only by later weeks.
+    assert "kpi_index" not in unbuilt.__dict__
+    assert "kpi_index" in extended.__dict__
+    assert "kpi_index" not in rebuilt.__dict__
+    for dataset in (extended, rebuilt):
+        for query in ((None, None, None, None), (["Albany"], ["organic"], None, None)):
+            assert dataset.summary_stats(*query) == DatasetSnapshot.build(
+                dataset.data, dataset.index
+            ).summary_stats(*query)
+
+
+def test_dense_cube_snapshot_serves_and_appends_the_same_rows(sample_csv, monkeypatch):
+    monkeypatch.setenv("AVOCADO_DENSE_CUBE", "true")
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(BATCH_CSV)
+    previous = app.swap_dataset(app.load_snapshot())
+    try:
+        assert app.current_dataset().cube is not None
+        exported = app.download_filtered_csv(1, ["Albany"], "organic", None, None)
+        expected = load_snapshot().select(["Albany"], ["organic"], None, None)
+        assert exported["content"] == expected.to_csv(index=False)
+
+        app.append_batch(str(batch_path))
+
+        live = app.current_dataset()
+        assert live.cube is not None
+        pd.testing.assert_frame_equal(
+            live.select(None, None, None, None),
+            live.data.iloc[live.index.positions(None, None, None, None)],
+        )
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_append_batch_needs_an_in_memory_dataset(sample_csv, tmp_path):
+    datastore.ingest_partitions(str(sample_csv), str(tmp_path / "parts"))
+    batch_path = tmp_path / "batch.csv"
+    batch_path.write_text(BATCH_CSV)
+    previous = app.swap_dataset(PartitionedSnapshot.open(str(tmp_path / "parts")))
+    try:
+        with pytest.raises(ValueError, match="in-memory dataset"):
+            app.append_batch(str(batch_path))
+    finally:
+        app.swap_dataset(previous)
+
+
+# --- Shared result caches ----------------------------------------------------
+
+
+class CountingSelects:
+    """Wraps a snapshot, counting the selections that reach it."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.selects = 0
+        self.selected = []
+
+    def __getattr__(self, name):
+        return getattr(self.snapshot, name)
+
+    def select(self, *args):
+        self.selects += 1
+        self.selected.append(args)
+        return self.snapshot.select(*args)
+
+
+def test_one_filter_change_selects_once_across_the_callbacks(sample_csv):
+    counting = CountingSelects(load_snapshot())
+    previous = app.swap_dataset(counting)
+    try:
+        before = app.filter_cache.stats()
+        filters = (["Boise", "Albany"], "organic", "2015-01-01", "2015-12-31")
+
+        app.update_summary_panel(*filters)
+        app.update_download_controls(*filters)
+        app.update_charts(*filters)
+        app.update_scatter_chart(*filters, "Total Volume", "AveragePrice")
+        app.update_box_plot(*filters, "AveragePrice", "year")
+
+        after = app.filter_cache.stats()
+        # One selection of the filter's rows; the price chart scores its
+        # anomalies from those same rows.
+        spec = app.filter_spec(*filters[:1], [filters[1]], *filters[2:])
+        dates = (spec.start_date.isoformat(), spec.end_date.isoformat())
+        assert counting.selected == [(["Albany", "Boise"], ["organic"], *dates)]
+        # The summary panel aggregates without selecting rows at all.
+        assert (after.misses - before.misses, after.hits - before.hits) == (1, 3)
+
+        # The anomaly feed selects every region of its type, once per range.
+        app.update_anomaly_feed(*filters[1:], "en")
+        app.update_anomaly_feed(*filters[1:], "es")
+        assert counting.selected[1:] == [(None, ["organic"], *dates)]
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_equivalent_filter_values_share_one_cached_selection(sample_csv):
+    counting = CountingSelects(load_snapshot())
+    previous = app.swap_dataset(counting)
+    try:
+        first = app.filter_data(["Albany", "Boise"], "organic", None, None)
+        reordered = app.filter_data(["Boise", "Albany", "Boise"], "organic", None, None)
+        # Outside the data, and between its weekly dates: same rows.
+        widened = app.filter_data(
+            ["Albany", "Boise"], "organic", "2014-06-01", "2015-01-17"
+        )
+
+        assert counting.selects == 1
+        assert reordered is first
+        assert widened is first
+        assert app.filter_spec(["Boise", "Albany"], ["organic"], None, None) == (
+            app.filter_spec(["Albany", "Boise"], ["organic"], "2014-06-01", None)
+        )
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_swapping_the_dataset_invalidates_cached_selections(sample_csv):
+    previous = app.swap_dataset(load_snapshot())
+    try:
+        assert app.filter_data(["Denver"], "organic", None, None).empty
+        assert app.filter_cache.stats().entries == 1
+
+        touch_with_new_content(sample_csv, SAMPLE_CSV + EXTRA_ROW)
+        app.swap_dataset(load_snapshot())
+
+        assert app.filter_cache.stats().entries == 0
+        assert len(app.filter_data(["Denver"], "organic", None, None)) == 1
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_figures_are_built_once_per_inputs_in_either_language(sample_csv):
+    previous = app.swap_dataset(load_snapshot())
+    filters = (["Albany"], "organic", "2015-01-01", "2015-12-31")
+    before = app.figure_caches["price"].stats()
+    try:
+        with patch("app.create_price_chart", wraps=app.create_price_chart) as build:
+            first, _ = app.update_charts(*filters)
+            again, _ = app.update_charts(*filters)
+            spanish, _ = app.update_charts(*filters, "es")
+
+        assert again == first
+        assert build.call_count == 1
+        assert spanish["layout"]["title"]["text"] == t("charts.price.title", "es")
+        assert spanish["data"][0]["y"] is first["data"][0]["y"]
+        assert first["layout"]["title"]["text"] == t("charts.price.title", "en")
+        after = app.figure_caches["price"].stats()
+        assert (after.hits - before.hits, after.misses - before.misses) == (2, 1)
+        assert after.saved_seconds > before.saved_seconds
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_box_plot_by_region_shares_one_figure_across_region_selections(sample_csv):
+    previous = app.swap_dataset(load_snapshot())
+    try:
+        with patch("app.create_box_plot", wraps=app.create_box_plot) as build:
+            for regions in (["Albany"], ["Boise"], []):
+                app.update_box_plot(
+                    regions, "organic", None, None, "AveragePrice", "region"
+                )
+
+        assert build.call_count == 1
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_swapping_the_dataset_never_serves_a_stale_figure(sample_csv):
+    previous = app.swap_dataset(load_snapshot())
+    filters = (["Albany", "Boise"], "organic", None, None)
+    try:
+        before = app.update_scatter_chart(*filters, "Total Volume", "AveragePrice")
+
+        touch_with_new_content(sample_csv, SAMPLE_CSV.replace("1.40", "1.45"))
+        app.swap_dataset(load_snapshot())
+        after = app.update_scatter_chart(*filters, "Total Volume", "AveragePrice")
+
+        assert after is not before
+        assert 1.45 in list(after["data"][0]["y"])
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_cache_stats_are_served_as_json():
+    response = app.server.test_client().get("/cache-stats")
+
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert set(stats["figures"]) == {"price", "volume", "scatter", "box"}
+    for counters in [stats["filter"], *stats["figures"].values()]:
+        assert set(counters) == {
+            "hits",
+            "misses",
+            "hit_rate",
+            "evictions",
+            "entries",
+            "bytes",
+            "saved_seconds",
+        }
@@ -0,0 +1,709 @@
+import logging
+import os
+from unittest.mock import ANY
+
+import numpy as np
+import pandas as pd
+import plotly.io.json
+import pytest
+
+import datastore
+from app import (
+    create_box_plot,
+    create_price_chart,
+    create_scatter_chart,
+    create_volume_chart,
+    data,
+    filter_data,
+    load_data,
+    load_dataset,
+)
+from data_index import BlockIndex
+from utils import calculate_price_change, calculate_summary_stats, find_region_extremes
+
+SAMPLE_CSV = (
+    ",Date,AveragePrice,Total Volume,type,year,region\n"
+    "0,2015-01-11,1.40,1200.5,organic,2015,Albany\n"
+    "1,2015-01-04,1.50,1000.0,organic,2015,Albany\n"
+    "2,2015-01-04,0.90,5000.25,conventional,2015,Boise\n"
+)
+
+
+@pytest.fixture
+def sample_csv(tmp_path, monkeypatch):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV)
+    monkeypatch.setenv("AVOCADO_DATA_PATH", str(csv_path))
+    monkeypatch.delenv("AVOCADO_DATA_CACHE", raising=False)
+    return csv_path
+
+
+def test_load_data_writes_a_column_cache_next_to_the_source(sample_csv):
+    load_data()
+
+    cache_dir = datastore.column_cache_dir(str(sample_csv))
+    assert os.path.isfile(os.path.join(cache_dir, datastore.MANIFEST_NAME))
+
+
+def test_cached_load_is_identical_to_a_fresh_parse(sample_csv, monkeypatch):
+    monkeypatch.setenv("AVOCADO_DATA_CACHE", "false")
+    fresh = load_data()
+    monkeypatch.setenv("AVOCADO_DATA_CACHE", "true")
+    load_data()
+
+    cached = datastore.read_column_cache(str(sample_csv))
+
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached, fresh)
+
+
+def test_warm_load_skips_the_csv_parse(sample_csv, monkeypatch):
+    load_data()
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError("read_csv called despite a valid cache")
+
+    monkeypatch.setattr("app.pd.read_csv", fail_read_csv)
+    result = load_data()
+
+    assert list(result["Date"]) == sorted(result["Date"])
+
+
+def test_cache_is_invalidated_when_the_source_changes(sample_csv):
+    load_data()
+    sample_csv.write_text(SAMPLE_CSV + "3,2015-01-18,1.60,900.0,organic,2015,Albany\n")
+
+    assert datastore.read_column_cache(str(sample_csv)) is None
+    assert len(load_data()) == 4
+
+
+def test_cache_is_invalidated_on_same_size_same_mtime_content_change(sample_csv):
+    load_data()
+    stat = os.stat(sample_csv)
+    sample_csv.write_text(SAMPLE_CSV.replace("Albany", "Albanx"))
+    os.utime(sample_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert datastore.read_column_cache(str(sample_csv)) is None
+
+
+def test_a_source_rewritten_during_the_parse_is_not_cached_as_its_new_contents(
+    sample_csv, monkeypatch
+):
+    parse_sources = datastore.parse_sources
+
+    def parse_then_rewrite(*args, **kwargs):
+        parsed = parse_sources(*args, **kwargs)
+        sample_csv.write_text(
+            SAMPLE_CSV + "3,2015-01-18,1.60,900.0,organic,2015,Albany\n"
+        )
+        return parsed
+
+    with monkeypatch.context() as patched:
+        patched.setattr("app.datastore.parse_sources", parse_then_rewrite)
+        assert len(load_data()) == 3
+
+    assert datastore.read_column_cache(str(sample_csv)) is None
+    assert len(load_data()) == 4
+
+
+def test_cache_disabled_by_env_var_writes_nothing(sample_csv, monkeypatch):
+    monkeypatch.setenv("AVOCADO_DATA_CACHE", "false")
+
+    load_data()
+
+    assert not os.path.exists(datastore.column_cache_dir(str(sample_csv)))
+
+
+def test_unwritable_cache_dir_falls_back_without_raising(sample_csv, caplog):
+    # A regular file squatting on the cache directory's name makes every
+    # write fail the same way a read-only filesystem would.
+    with open(datastore.column_cache_dir(str(sample_csv)), "w") as blocker:
+        blocker.write("")
+
+    result = load_data()
+
+    assert len(result) == 3
+    assert "Could not write column cache" in caplog.text
+
+
+def test_corrupt_cache_column_is_treated_as_a_miss(sample_csv):
+    load_data()
+    cache_dir = datastore.column_cache_dir(str(sample_csv))
+    manifest = datastore.read_cache_manifest(str(sample_csv))
+    os.remove(os.path.join(cache_dir, manifest["columns"][0]["file"]))
+
+    assert datastore.read_column_cache(str(sample_csv)) is None
+    assert len(load_data()) == 3
+
+
+# --- Compact in-memory representation -------------------------------------
+
+
+def to_plotly_json(figure):
+    """Figures as the browser receives them — Series/ndarray values
+    serialized exactly the way Dash ships them."""
+    return plotly.io.json.to_json_plotly(figure)
+
+
+def test_compact_frame_shrinks_the_bundled_dataset():
+    compact = datastore.compact_frame(data)
+
+    assert "Unnamed: 0" not in compact.columns
+    assert isinstance(compact["region"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["type"].dtype, pd.CategoricalDtype)
+    assert compact["year"].dtype == np.int16
+    assert (
+        datastore.frame_memory_bytes(compact) < datastore.frame_memory_bytes(data) / 2
+    )
+
+
+def test_compact_frame_keeps_floats_that_float32_cannot_hold_exactly():
+    frame = pd.DataFrame({"exact": [0.5, 2.0, np.nan], "inexact": [0.1, 1.33, 2.0]})
+
+    compact = datastore.compact_frame(frame)
+
+    assert compact["exact"].dtype == np.float32
+    assert compact["inexact"].dtype == np.float64
+
+
+def test_load_data_compact_mode_reports_footprint(sample_csv, monkeypatch, caplog):
+    monkeypatch.setenv("AVOCADO_COMPACT_DATA", "true")
+
+    with caplog.at_level(logging.INFO):
+        result = load_data()
+
+    assert isinstance(result["region"].dtype, pd.CategoricalDtype)
+    assert "Compact dataset mode" in caplog.text
+
+
+@pytest.fixture
+def compact_select():
+    compact = datastore.compact_frame(data)
+    index = BlockIndex(compact)
+
+    def select(regions, avocado_types, start_date, end_date):
+        return compact.iloc[
+            index.positions(regions, avocado_types, start_date, end_date)
+        ]
+
+    return compact, select
+
+
+FILTERS = (["Albany", "Chicago"], "organic", "2015-01-01", "2017-12-31")
+
+
+def test_compact_mode_filters_identical_cell_values(compact_select):
+    _, select = compact_select
+    regions, avocado_type, start_date, end_date = FILTERS
+
+    full = filter_data(regions, avocado_type, start_date, end_date)
+    compact = select(regions, [avocado_type], start_date, end_date)
+
+    assert list(compact.index) == list(full.index)
+    pd.testing.assert_frame_equal(
+        compact.astype(object),
+        full[compact.columns].astype(object),
+        check_dtype=False,
+    )
+
+
+def test_compact_mode_summary_stats_are_identical(compact_select):
+    compact_data, select = compact_select
+    regions, avocado_type, start_date, end_date = FILTERS
+
+    full_rows = filter_data(regions, avocado_type, start_date, end_date)
+    compact_rows = select(regions, [avocado_type], start_date, end_date)
+
+    assert calculate_summary_stats(compact_rows) == calculate_summary_stats(full_rows)
+    assert calculate_price_change(
+        compact_data, regions, avocado_type, "2016-01-01", "2016-12-31"
+    ) == calculate_price_change(data, regions, avocado_type, "2016-01-01", "2016-12-31")
+    assert find_region_extremes(
+        compact_data, avocado_type, start_date, end_date
+    ) == find_region_extremes(data, avocado_type, start_date, end_date)
+
+
+@pytest.mark.parametrize(
+    "build_chart",
+    [
+        create_price_chart,
+        create_volume_chart,
+        lambda rows: create_scatter_chart(rows, "AveragePrice", "year"),
+        lambda rows: create_box_plot(rows, "Total Volume", "year"),
+        lambda rows: create_box_plot(rows, "AveragePrice", "region"),
+    ],
+)
+def test_compact_mode_chart_payloads_are_identical(compact_select, build_chart):
+    _, select = compact_select
+    regions, avocado_type, start_date, end_date = FILTERS
+
+    full = build_chart(filter_data(regions, avocado_type, start_date, end_date))
+    compact = build_chart(select(regions, [avocado_type], start_date, end_date))
+
+    assert to_plotly_json(compact) == to_plotly_json(full)
+
+
+# --- Memory-mapped column store --------------------------------------------
+
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+@pytest.fixture(scope="module")
+def column_store(tmp_path_factory):
+    store_dir = str(tmp_path_factory.mktemp("store"))
+    datastore.write_column_store(data, store_dir)
+    return store_dir
+
+
+def test_column_store_round_trips_every_cell(column_store):
+    frame, _ = datastore.open_column_store(column_store)
+
+    assert list(frame.columns) == list(data.columns)
+    assert list(frame.index) == list(data.index)
+    assert frame["Date"].dtype == data["Date"].dtype
+    pd.testing.assert_frame_equal(frame.astype(object), data.astype(object))
+
+
+def test_column_store_columns_are_views_over_the_memory_maps(column_store):
+    frame, block_index = datastore.open_column_store(column_store)
+
+    assert is_memory_mapped(frame["AveragePrice"].to_numpy())
+    assert is_memory_mapped(frame["region"].array.codes)
+    assert is_memory_mapped(block_index.order)
+
+
+def test_column_store_block_index_matches_a_fresh_one(column_store):
+    _, stored_index = datastore.open_column_store(column_store)
+    fresh_index = BlockIndex(data)
+
+    for args in [
+        (["Albany", "Chicago"], ["organic"], "2015-01-01", "2016-06-30"),
+        (None, ["conventional"], "2017-01-01", "2017-12-31"),
+    ]:
+        assert list(stored_index.positions(*args)) == list(fresh_index.positions(*args))
+
+
+def test_filtering_and_aggregations_run_directly_on_the_store(column_store):
+    frame, block_index = datastore.open_column_store(column_store)
+    regions, avocado_type, start_date, end_date = FILTERS
+
+    rows = frame.iloc[
+        block_index.positions(regions, [avocado_type], start_date, end_date)
+    ]
+    full_rows = filter_data(regions, avocado_type, start_date, end_date)
+
+    assert calculate_summary_stats(rows) == calculate_summary_stats(full_rows)
+    assert find_region_extremes(
+        frame, avocado_type, start_date, end_date
+    ) == find_region_extremes(data, avocado_type, start_date, end_date)
+
+
+def test_load_dataset_maps_the_store_named_by_env_var(column_store, monkeypatch):
+    monkeypatch.setenv("AVOCADO_COLUMN_STORE", column_store)
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError("read_csv called despite a column store")
+
+    monkeypatch.setattr("datastore.pd.read_csv", fail_read_csv)
+    frame, _ = load_dataset()
+
+    assert len(frame) == len(data)
+
+
+def test_open_column_store_rejects_a_missing_or_stale_store(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No column store manifest"):
+        datastore.open_column_store(str(tmp_path))
+
+    manifest_path = tmp_path / datastore.MANIFEST_NAME
+    manifest_path.write_text('{"version": 0}')
+    with pytest.raises(ValueError, match="rebuild it"):
+        datastore.open_column_store(str(tmp_path))
+
+
+def test_build_store_cli_writes_an_openable_store(sample_csv, tmp_path, capsys):
+    store_dir = str(tmp_path / "cli_store")
+
+    datastore.main(["build-store", str(sample_csv), store_dir])
+
+    frame, _ = datastore.open_column_store(store_dir)
+    assert len(frame) == 3
+    assert "Wrote 3 rows" in capsys.readouterr().out
+
+
+# --- Streaming partition ingest --------------------------------------------
+
+BUNDLED_CSV = os.path.join(os.path.dirname(datastore.__file__), "avocado.csv")
+
+
+@pytest.fixture(scope="module")
+def partition_store(tmp_path_factory):
+    store_dir = str(tmp_path_factory.mktemp("partitions"))
+    datastore.ingest_partitions(BUNDLED_CSV, store_dir, chunk_rows=5_000)
+    return datastore.PartitionStore(store_dir)
+
+
+def test_partition_store_holds_every_row_once(partition_store):
+    assert partition_store.rows == len(data)
+    assert len(partition_store.partitions) == 108
+    pd.testing.assert_frame_equal(
+        partition_store.read_all().sort_index(), data.sort_index()
+    )
+
+
+def test_partition_store_selects_the_same_rows_as_filter_data(partition_store):
+    regions, avocado_type, start_date, end_date = FILTERS
+
+    rows = partition_store.select(regions, [avocado_type], start_date, end_date)
+
+    expected = filter_data(regions, avocado_type, start_date, end_date)
+    pd.testing.assert_frame_equal(rows.sort_index(), expected.sort_index())
+    assert rows["Date"].is_monotonic_increasing
+
+
+def test_partition_store_keeps_parsed_partitions_within_its_byte_budget(
+    partition_store,
+):
+    budget = 256 * 1024
+    store = datastore.PartitionStore(partition_store.store_dir, cache_bytes=budget)
+
+    store.read_all()
+    store.read_all()
+
+    stats = store._cache.stats()
+    assert 0 < stats.bytes <= budget
+    assert stats.evictions > 0
+    assert stats.hits < len(store.partitions)
+
+
+def test_partition_store_select_without_matches_keeps_the_schema(partition_store):
+    rows = partition_store.select(["Nowhere"], None, None, None)
+
+    assert rows.empty
+    assert list(rows.columns) == list(data.columns)
+    assert rows["Date"].dtype == data["Date"].dtype
+
+
+def test_ingest_output_does_not_depend_on_the_chunk_size(sample_csv, tmp_path):
+    one_chunk = datastore.ingest_partitions(str(sample_csv), str(tmp_path / "a"))
+    row_chunks = datastore.ingest_partitions(
+        str(sample_csv), str(tmp_path / "b"), chunk_rows=1
+    )
+
+    assert one_chunk["partitions"] == [
+        {**entry, "file": ANY} for entry in row_chunks["partitions"]
+    ]
+    pd.testing.assert_frame_equal(
+        datastore.PartitionStore(str(tmp_path / "a")).read_all(),
+        datastore.PartitionStore(str(tmp_path / "b")).read_all(),
+    )
+
+
+def test_ingest_streams_the_source_in_chunks(sample_csv, tmp_path, monkeypatch):
+    read_csv = pd.read_csv
+
+    def chunked_only(*args, **kwargs):
+        assert kwargs.get("chunksize") or kwargs.get("nrows") == 0
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr("datastore.pd.read_csv", chunked_only)
+
+    manifest = datastore.ingest_partitions(str(sample_csv), str(tmp_path), 2)
+
+    assert manifest["rows"] == 3
+
+
+def test_ingest_validates_the_header_before_reading_rows(tmp_path):
+    csv_path = tmp_path / "bad.csv"
+    csv_path.write_text("Date,region\n2015-01-04,Albany\n")
+
+    with pytest.raises(ValueError, match="AveragePrice, Total Volume, type"):
+        datastore.ingest_partitions(str(csv_path), str(tmp_path / "store"))
+    assert not (tmp_path / "store").exists()
+
+
+def test_reingest_replaces_the_previous_partitions(sample_csv, tmp_path):
+    datastore.ingest_partitions(str(sample_csv), str(tmp_path))
+    first_files = set(os.listdir(tmp_path))
+
+    datastore.ingest_partitions(str(sample_csv), str(tmp_path))
+
+    files = set(os.listdir(tmp_path))
+    assert len(files) == len(first_files)
+    assert files & first_files == {datastore.MANIFEST_NAME, "sample.csv"}
+
+
+def test_partition_store_rejects_a_missing_or_stale_store(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No partition store manifest"):
+        datastore.PartitionStore(str(tmp_path))
+
+    (tmp_path / datastore.MANIFEST_NAME).write_text('{"version": 0}')
+    with pytest.raises(ValueError, match="re-ingest it"):
+        datastore.PartitionStore(str(tmp_path))
+
+
+def test_ingest_cli_reports_rows_and_partitions(sample_csv, tmp_path, capsys):
+    datastore.main(["ingest", str(sample_csv), str(tmp_path), "--chunk-rows", "2"])
+
+    assert "Wrote 3 rows in 2 partitions" in capsys.readouterr().out
+
+
+# --- Multi-file sources ----------------------------------------------------
+
+
+@pytest.fixture
+def split_source(tmp_path):
+    """The sample CSV split into one file per region, plus its joined form."""
+    joined = tmp_path / "joined.csv"
+    joined.write_text(SAMPLE_CSV)
+    source_dir = tmp_path / "by_region"
+    source_dir.mkdir()
+    header, *rows = SAMPLE_CSV.splitlines(keepends=True)
+    (source_dir / "a_albany.csv").write_text(header + rows[0] + rows[1])
+    (source_dir / "b_boise.csv").write_text(header + rows[2])
+    (source_dir / "notes.txt").write_text("not a csv")
+    return joined, source_dir
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_directory_source_parses_to_the_joined_file_frame(split_source, workers):
+    joined, source_dir = split_source
+
+    frame = datastore.parse_sources(str(source_dir), workers=workers)
+
+    pd.testing.assert_frame_equal(frame, datastore.parse_csv(str(joined)))
+
+
+def test_glob_source_matches_only_the_pattern(split_source):
+    _, source_dir = split_source
+
+    frame = datastore.parse_sources(str(source_dir / "a_*.csv"))
+
+    assert list(frame["region"]) == ["Albany", "Albany"]
+
+
+def test_multi_file_source_rejects_a_mismatched_schema(split_source):
+    _, source_dir = split_source
+    (source_dir / "c_extra.csv").write_text(
+        ",Date,AveragePrice,Total Volume,type,region\n"
+        "0,2015-01-04,1.0,1.0,organic,Denver\n"
+    )
+
+    with pytest.raises(ValueError, match="c_extra.csv has columns"):
+        datastore.parse_sources(str(source_dir))
+
+
+def test_multi_file_source_rejects_a_file_missing_required_columns(split_source):
+    _, source_dir = split_source
+    (source_dir / "c_bad.csv").write_text("Date,region\n2015-01-04,Denver\n")
+
+    with pytest.raises(ValueError, match="c_bad.csv is missing required columns"):
+        datastore.parse_sources(str(source_dir))
+
+
+def test_empty_directory_source_is_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No CSV files found"):
+        datastore.parse_sources(str(tmp_path))
+
+
+def test_load_data_accepts_a_directory_without_caching_it(split_source, monkeypatch):
+    joined, source_dir = split_source
+    monkeypatch.setenv("AVOCADO_DATA_PATH", str(source_dir))
+    monkeypatch.setenv("AVOCADO_LOAD_WORKERS", "2")
+
+    frame = load_data()
+
+    pd.testing.assert_frame_equal(frame, datastore.parse_csv(str(joined)))
+    assert not os.path.exists(datastore.column_cache_dir(str(source_dir)))
+
+
+# --- Metadata sidecar --------------------------------------------------------
+
+
+def test_metadata_sidecar_round_trips(sample_csv):
+    metadata = datastore.dataset_metadata(datastore.parse_csv(str(sample_csv)))
+
+    assert datastore.write_metadata_sidecar(str(sample_csv), metadata)
+
+    assert datastore.read_metadata_sidecar(str(sample_csv)) == {
+        "regions": ["Albany", "Boise"],
+        "avocado_types": ["conventional", "organic"],
+        "min_date": "2015-01-04",
+        "max_date": "2015-01-11",
+        "rows": 3,
+        "schema_hash": metadata["schema_hash"],
+    }
+
+
+def test_metadata_sidecar_is_stale_once_the_source_changes(sample_csv):
+    metadata = datastore.dataset_metadata(datastore.parse_csv(str(sample_csv)))
+    datastore.write_metadata_sidecar(str(sample_csv), metadata)
+
+    sample_csv.write_text(SAMPLE_CSV + "3,2015-01-18,1.2,10.0,organic,2015,Boise\n")
+
+    assert datastore.read_metadata_sidecar(str(sample_csv)) is None
+
+
+def test_schema_hash_tracks_column_dtypes():
+    frame = datastore.parse_csv(BUNDLED_CSV)
+
+    assert datastore.schema_hash(frame) == datastore.schema_hash(frame.copy())
+    assert datastore.schema_hash(frame) != datastore.schema_hash(
+        datastore.compact_frame(frame)
+    )
+
+
+def test_unwritable_metadata_sidecar_is_logged_not_raised(sample_csv, caplog):
+    os.mkdir(datastore.metadata_sidecar_path(str(sample_csv)))
+
+    with caplog.at_level(logging.WARNING, logger="datastore"):
+        written = datastore.write_metadata_sidecar(str(sample_csv), {"rows": 3})
+
+    assert written is False
+    assert "Could not write metadata sidecar" in caplog.text
+
+
+def test_build_metadata_cli_writes_a_valid_sidecar(sample_csv, capsys):
+    datastore.main(["build-metadata", str(sample_csv)])
+
+    assert datastore.read_metadata_sidecar(str(sample_csv))["rows"] == 3
+    assert "Wrote metadata for 3 rows" in capsys.readouterr().out
+
+
+# --- Incremental appends -----------------------------------------------------
+
+
+def split_history(cutoff="2018-01-01"):
+    history = data[data["Date"] < cutoff]
+    return history, data[data["Date"] >= cutoff]
+
+
+def by_key(frame):
+    return frame.sort_values(datastore.ROW_KEY).reset_index(drop=True)
+
+
+def test_merge_matches_a_full_reload_of_history_plus_batch():
+    history, recent = split_history()
+    corrections = history.sample(5, random_state=0).assign(AveragePrice=9.99)
+    batch = pd.concat([recent, corrections]).sample(frac=1, random_state=0)
+
+    merged, index, result = datastore.merge_sorted_batch(
+        history, BlockIndex(history), batch
+    )
+
+    assert (result.inserted, result.replaced) == (len(recent), 5)
+    assert merged["Date"].is_monotonic_increasing
+    assert merged.index.is_unique
+    expected = datastore.drop_superseded_rows(pd.concat([history, batch]))
+    pd.testing.assert_frame_equal(by_key(merged), by_key(expected))
+    assert index.blocks == BlockIndex(merged).blocks
+
+
+def test_merge_replaces_existing_rows_in_place():
+    history, _ = split_history()
+    correction = history.iloc[[10]].assign(AveragePrice=9.99)
+
+    merged, _, result = datastore.merge_sorted_batch(
+        history, BlockIndex(history), correction
+    )
+
+    assert (result.inserted, result.replaced) == (0, 1)
+    assert list(merged.index) == list(history.index)
+    assert merged["AveragePrice"].iloc[10] == 9.99
+
+
+def test_merge_does_not_rebuild_the_index(monkeypatch):
+    history, recent = split_history()
+    index = BlockIndex(history)
+
+    def fail_init(*args, **kwargs):
+        raise AssertionError("BlockIndex rebuilt during an append")
+
+    monkeypatch.setattr(BlockIndex, "__init__", fail_init)
+    _, merged_index, _ = datastore.merge_sorted_batch(history, index, recent)
+
+    assert len(merged_index.order) == len(data)
+
+
+def test_merge_into_a_compact_frame_adds_new_categories():
+    history, recent = split_history()
+    compact = datastore.compact_frame(history)
+    batch = recent.head(2).assign(region="Atlantis")
+
+    merged, index, _ = datastore.merge_sorted_batch(compact, BlockIndex(compact), batch)
+
+    assert isinstance(merged["region"].dtype, pd.CategoricalDtype)
+    assert list(merged["region"].iloc[index.positions(["Atlantis"], None, None, None)])
+    assert "Unnamed: 0" not in merged.columns
+
+
+def test_merge_rejects_a_batch_with_other_columns():
+    history, recent = split_history()
+
+    with pytest.raises(ValueError, match="Batch columns"):
+        datastore.merge_sorted_batch(
+            history, BlockIndex(history), recent.drop(columns=["year"])
+        )
+
+
+def test_appended_source_reloads_to_the_merged_frame(sample_csv):
+    sample_csv.write_text(SAMPLE_CSV.rstrip("\n"))
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(
+        ",Date,AveragePrice,Total Volume,type,year,region\n"
+        "7,2015-01-18,1.30,900.0,organic,2015,Albany\n"
+        "8,2015-01-04,0.95,5100.0,conventional,2015,Boise\n"
+    )
+    history = datastore.parse_csv(str(sample_csv))
+    batch = datastore.read_batch(str(batch_path))
+
+    merged, _, result = datastore.merge_sorted_batch(
+        history, BlockIndex(history), batch
+    )
+    datastore.append_csv_rows(str(sample_csv), batch)
+
+    assert (result.inserted, result.replaced) == (1, 1)
+    reloaded = datastore.parse_csv(str(sample_csv))
+    pd.testing.assert_frame_equal(by_key(reloaded), by_key(merged))
+
+
+def test_append_cli_updates_the_source_and_its_sidecar(sample_csv, capsys):
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(
+        ",Date,AveragePrice,Total Volume,type,year,region\n"
+        "7,2015-01-18,1.30,900.0,organic,2015,Denver\n"
+    )
+
+    datastore.main(["append", str(sample_csv), str(batch_path)])
+
+    metadata = datastore.read_metadata_sidecar(str(sample_csv))
+    assert metadata["rows"] == 4
+    assert metadata["regions"] == ["Albany", "Boise", "Denver"]
+    assert metadata["max_date"] == "2015-01-18"
+    assert "Appended 1 new and 0 replaced rows" in capsys.readouterr().out
+
+
+def test_append_cli_refreshes_the_column_cache(sample_csv, monkeypatch):
+    datastore.parse_and_cache(str(sample_csv))
+    batch_path = sample_csv.parent / "batch.csv"
+    batch_path.write_text(
+        ",Date,AveragePrice,Total Volume,type,year,region\n"
+        "7,2015-01-18,1.30,900.0,organic,2015,Denver\n"
+        "8,2015-01-04,0.95,5100.0,conventional,2015,Boise\n"
+    )
+    parse_csv = datastore.parse_csv
+
+    def fail_parse(csv_path):
+        raise AssertionError("Source parsed during an append")
+
+    monkeypatch.setattr(datastore, "parse_csv", fail_parse)
+    datastore.main(["append", str(sample_csv), str(batch_path)])
+
+    cached = datastore.read_column_cache(str(sample_csv))
+    assert cached is not None
+    pd.testing.assert_frame_equal(by_key(cached), by_key(parse_csv(str(sample_csv))))
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import data
+from data_index import BlockIndex
+from datastore import compact_frame
+from dense_cube import DenseCube
+
+QUERIES = [
+    (None, None, None, None),
+    (["Albany", "Boston"], ["organic"], "2016-01-01", "2016-06-30"),
+    (None, ["conventional"], "2017-12-31", None),
+    (["Albany"], None, None, "2015-02-01"),
+    (["Boston", "Albany", "Boston"], ["organic"], "2015-01-02", "2015-01-10"),
+    ([], None, None, None),
+    (["Nowhere"], None, None, None),
+    (None, None, "2016-06-30", "2016-01-01"),
+]
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return DenseCube(data)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_select_rebuilds_the_rows_the_index_selects(cube, query):
+    expected = data.iloc[BlockIndex(data).positions(*query)]
+
+    pd.testing.assert_frame_equal(cube.select(*query), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES[:3])
+def test_select_keeps_compact_dtypes(query):
+    compact = compact_frame(data)
+
+    selected = DenseCube(compact).select(*query)
+
+    pd.testing.assert_frame_equal(
+        selected, compact.iloc[BlockIndex(compact).positions(*query)]
+    )
+
+
+def test_the_bundled_panel_fills_almost_every_cell(cube):
+    assert cube.values.shape == (
+        data["Date"].nunique(),
+        data["region"].nunique(),
+        data["type"].nunique(),
+        len(data.columns) - 3,
+    )
+    assert cube.fill_ratio > 0.99
+
+
+def test_windows_and_series_are_views(cube):
+    window = cube.window("2016-01-01", "2016-06-30")
+    series = cube.series("Albany", "organic", "AveragePrice", "2016-01-01", None)
+
+    assert np.shares_memory(window, cube.values)
+    assert np.shares_memory(series, cube.values)
+    rows = data[
+        (data["region"] == "Albany")
+        & (data["type"] == "organic")
+        & (data["Date"] >= "2016-01-01")
+    ].sort_values("Date")
+    assert series.tolist() == rows["AveragePrice"].tolist()
+    assert (
+        len(window)
+        == data.loc[data["Date"].between("2016-01-01", "2016-06-30"), "Date"].nunique()
+    )
+
+
+def test_cells_without_a_row_are_nan():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2015-01-04", "2015-01-11", "2015-01-04", None]),
+            "region": ["Albany", "Albany", "Boise", "Boise"],
+            "type": ["organic"] * 4,
+            "AveragePrice": [1.5, float("nan"), 0.9, 1.0],
+        }
+    )
+
+    cube = DenseCube(frame)
+
+    # Boise has no row on 2015-01-11; Albany's row there has no price.
+    assert cube.rows[:, :, 0].tolist() == [[0, 2], [1, -1]]
+    assert np.isnan(cube.values[1, :, 0, 0]).all()
+    pd.testing.assert_frame_equal(
+        cube.select(None, None, None, None), frame.iloc[[0, 1, 2]]
+    )
+
+
+def test_rows_sharing_a_cell_cannot_be_cubed():
+    frame = data.head(3)
+    with pytest.raises(ValueError, match="repeat"):
+        DenseCube(pd.concat([frame, frame]))
+
+
+def test_text_metrics_cannot_be_cubed():
+    with pytest.raises(ValueError, match="numeric"):
+        DenseCube(data.head(3).assign(note="x"))
+
+
+def test_unknown_series_keys_raise(cube):
+    with pytest.raises(KeyError):
+        cube.series("Nowhere", "organic", "AveragePrice")
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from downsample import lttb_indices
+
+
+def reference_lttb(x, y, max_points):
+    """The textbook one-series loop, for comparison."""
+    every = (len(x) - 2) / (max_points - 2)
+    anchor, picked = 0, [0]
+    for bucket in range(max_points - 2):
+        start = int(np.floor(bucket * every)) + 1
+        stop = int(np.floor((bucket + 1) * every)) + 1
+        if bucket == max_points - 3:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            following = slice(stop, int(np.floor((bucket + 2) * every)) + 1)
+            next_x, next_y = x[following].mean(), y[following].mean()
+        areas = np.abs(
+            (x[anchor] - next_x) * (y[start:stop] - y[anchor])
+            - (x[anchor] - x[start:stop]) * (next_y - y[anchor])
+        )
+        anchor = start + int(np.argmax(areas))
+        picked.append(anchor)
+    picked.append(len(x) - 1)
+    return picked
+
+
+def random_walks(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = [np.sort(rng.uniform(0, 1_000, length)) for length in lengths]
+    ys = [np.cumsum(rng.normal(size=length)) for length in lengths]
+    return xs, ys
+
+
+def test_lttb_picks_what_the_one_series_algorithm_picks():
+    xs, ys = random_walks([5_000, 1_234, 20_001, 301])
+
+    picked = lttb_indices(xs, ys, 300)
+
+    for x, y, positions in zip(xs, ys, picked):
+        assert positions.tolist() == reference_lttb(x, y, 300)
+
+
+def test_series_within_the_budget_keep_every_point():
+    xs, ys = random_walks([10, 300])
+
+    picked = lttb_indices(xs, ys, 300)
+
+    assert [positions.tolist() for positions in picked] == [
+        list(range(10)),
+        list(range(300)),
+    ]
+
+
+def test_kept_points_are_never_dropped():
+    xs, ys = random_walks([10_000])
+    keep = np.zeros(10_000, dtype=bool)
+    keep[[1, 4_321, 9_998]] = True
+
+    (positions,) = lttb_indices(xs, ys, 100, keep=[keep])
+
+    assert {1, 4_321, 9_998} <= set(positions.tolist())
+    # Their slots come out of the budget rather than on top of it.
+    assert len(positions) <= 100
+    assert positions.tolist() == sorted(set(positions.tolist()))
+
+
+def test_adjacent_kept_points_are_all_kept():
+    xs, ys = random_walks([5_000, 5_000])
+    keep = np.zeros(5_000, dtype=bool)
+    keep[2_500:2_503] = True
+
+    positions, other = lttb_indices(
+        xs, ys, 100, keep=[keep, np.zeros(5_000, dtype=bool)]
+    )
+
+    assert {2_500, 2_501, 2_502} <= set(positions.tolist())
+    assert len(positions) <= 100
+    # A series with nothing to keep is picked as usual.
+    assert other.tolist() == reference_lttb(xs[1], ys[1], 100)
+
+
+def test_kept_points_beyond_the_budget_are_all_kept_with_the_endpoints():
+    xs, ys = random_walks([1_000])
+    keep = np.zeros(1_000, dtype=bool)
+    keep[10:510:2] = True
+
+    (positions,) = lttb_indices(xs, ys, 100, keep=[keep])
+
+    assert set(np.flatnonzero(keep)) <= set(positions.tolist())
+    assert {0, 999} <= set(positions.tolist())
+    assert len(positions) <= keep.sum() + 3
+
+
+def test_dates_and_missing_values_are_handled():
+    dates = np.arange("2015-01-04", "2018-03-26", dtype="datetime64[D]").astype(
+        "datetime64[us]"
+    )
+    prices = np.sin(np.arange(len(dates)) / 30.0)
+    prices[100:130] = np.nan
+
+    (positions,) = lttb_indices([dates], [prices], 200)
+
+    assert len(positions) == 200
+    assert (positions[0], positions[-1]) == (0, len(dates) - 1)
+    # The gap stays a gap: some missing point inside it is kept.
+    kept = prices[positions]
+    assert np.isnan(kept).any()
+    assert not np.isnan(kept[positions < 95]).any()
+
+
+def test_budget_must_leave_room_for_a_bucket():
+    with pytest.raises(ValueError, match="at least 3"):
+        lttb_indices([np.arange(10.0)], [np.arange(10.0)], 2)
@@ -0,0 +1,127 @@
+import dataclasses
+from datetime import date
+
+import numpy as np
+import pytest
+
+from filters import FilterSpec
+
+# A weekly grid of Sundays, like the bundled dataset.
+MIN_DATE = date(2015, 1, 4)
+MAX_DATE = date(2018, 3, 25)
+WEEKLY = np.arange(
+    np.datetime64(MIN_DATE), np.datetime64(MAX_DATE) + 1, 7, dtype="datetime64[D]"
+)
+
+
+def build(
+    regions=("Albany",), avocado_types=("organic",), start=None, end=None, dates=WEEKLY
+):
+    return FilterSpec.build(
+        None if regions is None else list(regions),
+        None if avocado_types is None else list(avocado_types),
+        start,
+        end,
+        MIN_DATE,
+        MAX_DATE,
+        dates,
+    )
+
+
+def test_region_order_and_duplicates_are_normalized():
+    spec = build(regions=["Boston", "Albany", "Boston"])
+
+    assert spec.regions == ("Albany", "Boston")
+    assert spec == build(regions=["Albany", "Boston"])
+    assert hash(spec) == hash(build(regions=["Albany", "Boston"]))
+
+
+def test_none_means_all_and_stays_distinct_from_empty():
+    assert build(regions=None).regions is None
+    assert build(regions=[]).regions == ()
+    assert build(regions=None) != build(regions=[])
+
+
+def test_missing_dates_span_the_whole_dataset():
+    spec = build()
+
+    assert (spec.start_date, spec.end_date) == (MIN_DATE, MAX_DATE)
+
+
+def test_dates_outside_the_data_clamp_to_its_bounds():
+    assert build(start="1999-01-01", end="2999-01-01") == build()
+
+
+@pytest.mark.parametrize(
+    "start, end, expected_start, expected_end",
+    [
+        # Already on the grid.
+        ("2016-01-03", "2016-01-31", date(2016, 1, 3), date(2016, 1, 31)),
+        # Snapped inward: start up to the next Sunday, end down to the last.
+        ("2016-01-01", "2016-02-03", date(2016, 1, 3), date(2016, 1, 31)),
+        ("2016-01-04", "2016-01-09", date(2016, 1, 10), date(2016, 1, 3)),
+    ],
+)
+def test_dates_snap_inward_to_the_weekly_grid(start, end, expected_start, expected_end):
+    spec = build(start=start, end=end)
+
+    assert (spec.start_date, spec.end_date) == (expected_start, expected_end)
+
+
+def test_dates_snap_to_the_datas_own_dates_however_spaced():
+    daily = np.arange("2016-01-01", "2016-01-21", dtype="datetime64[D]")
+    # Irregular: nothing from the 8th to the 13th.
+    irregular = np.concatenate([daily[:7], daily[13:]])
+
+    spec = build(start="2016-01-03", end="2016-01-20", dates=daily)
+    assert (spec.start_date, spec.end_date) == (date(2016, 1, 3), date(2016, 1, 20))
+    spec = build(start="2016-01-09", end="2016-01-15", dates=irregular)
+    assert (spec.start_date, spec.end_date) == (date(2016, 1, 14), date(2016, 1, 15))
+    assert build(start="2016-01-09", end="2016-01-12", dates=irregular).is_empty
+
+
+def test_without_the_datas_dates_a_range_is_only_clamped():
+    spec = build(start="2016-01-01", end="2999-01-01", dates=None)
+
+    assert (spec.start_date, spec.end_date) == (date(2016, 1, 1), MAX_DATE)
+
+
+def test_ranges_selecting_the_same_weeks_are_equal():
+    assert build(start="2016-01-01", end="2016-02-03") == build(
+        start=date(2016, 1, 3), end="2016-01-31"
+    )
+
+
+@pytest.mark.parametrize(
+    "spec, empty",
+    [
+        (build(), False),
+        (build(regions=[]), True),
+        (build(avocado_types=[]), True),
+        # No Sunday between a Monday and the following Saturday.
+        (build(start="2016-01-04", end="2016-01-09"), True),
+        (build(start="2030-01-01"), True),
+    ],
+)
+def test_is_empty(spec, empty):
+    assert spec.is_empty is empty
+
+
+def test_digest_is_stable_and_distinguishes_specs():
+    spec = build(regions=["Boston", "Albany"], start="2016-01-01")
+
+    # Pinned: the digest must not depend on the process's string hash seed.
+    assert spec.digest() == "e2b0b6500e705883"
+    assert (
+        spec.digest()
+        == build(regions=["Albany", "Boston"], start="2016-01-03").digest()
+    )
+    assert spec.digest() != build(regions=["Albany"], start="2016-01-03").digest()
+
+
+def test_spec_is_immutable_and_slotted():
+    spec = build()
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        spec.regions = ("Boston",)
+    assert not hasattr(spec, "__dict__")
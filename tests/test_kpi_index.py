@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import data
+from kpi_index import KpiIndex
+from utils import calculate_price_change, calculate_summary_stats, find_region_extremes
+
+
+@pytest.fixture(scope="module")
+def index():
+    return KpiIndex(data)
+
+
+def selected_rows(regions, avocado_types, start_date, end_date):
+    mask = pd.Series(True, index=data.index)
+    if regions is not None:
+        mask &= data["region"].isin(regions)
+    if avocado_types is not None:
+        mask &= data["type"].isin(avocado_types)
+    if start_date is not None:
+        mask &= data["Date"] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= data["Date"] <= pd.Timestamp(end_date)
+    return data[mask]
+
+
+def random_ranges(count, seed=0):
+    """Date ranges with arbitrary (not just weekly) bounds, some reaching
+    outside the data."""
+    rng = np.random.default_rng(seed)
+    origin = pd.Timestamp("2014-11-01")
+    for first, last in np.sort(rng.integers(0, 1_300, (count, 2)), axis=1):
+        yield (
+            (origin + pd.Timedelta(days=int(first))).date().isoformat(),
+            (origin + pd.Timedelta(days=int(last))).date().isoformat(),
+        )
+
+
+@pytest.mark.parametrize(
+    "regions,avocado_types,start_date,end_date",
+    [
+        (None, None, None, None),
+        (["Albany", "Boston"], ["organic"], "2016-01-01", "2016-06-30"),
+        (None, ["conventional"], "2017-12-31", None),
+        (["Albany"], None, None, "2015-02-01"),
+        (["Albany"], ["organic"], "2015-01-04", "2015-01-04"),
+        (["Albany", "Nowhere"], ["organic"], "2015-01-02", "2015-01-10"),
+    ],
+)
+def test_summary_stats_match_utils(index, regions, avocado_types, start_date, end_date):
+    rows = selected_rows(regions, avocado_types, start_date, end_date)
+
+    stats = index.summary_stats(regions, avocado_types, start_date, end_date)
+
+    expected = calculate_summary_stats(rows)
+    assert stats["date_range"] == expected["date_range"]
+    assert {key: stats[key] for key in expected if key != "date_range"} == (
+        pytest.approx({key: expected[key] for key in expected if key != "date_range"})
+    )
+
+
+def test_summary_stats_match_utils_over_random_selections(index):
+    rng = np.random.default_rng(1)
+    regions = sorted(data["region"].unique())
+
+    for start_date, end_date in random_ranges(80):
+        chosen = list(rng.choice(regions, rng.integers(1, 5), replace=False))
+        rows = selected_rows(chosen, ["organic"], start_date, end_date)
+
+        stats = index.summary_stats(chosen, ["organic"], start_date, end_date)
+
+        if rows.empty:
+            assert stats is None
+            continue
+        expected = calculate_summary_stats(rows)
+        assert stats["date_range"] == expected["date_range"]
+        for key in ("avg_price", "max_price", "min_price", "total_volume"):
+            assert stats[key] == pytest.approx(expected[key], rel=1e-12)
+
+
+@pytest.mark.parametrize(
+    "regions,avocado_types,start_date,end_date",
+    [
+        ([], None, None, None),
+        (None, [], None, None),
+        (["Nowhere"], None, None, None),
+        (None, None, "2030-01-01", None),
+        (None, None, "2016-01-05", "2016-01-09"),
+        (None, None, "2016-06-30", "2016-01-01"),
+    ],
+)
+def test_summary_stats_are_none_for_an_empty_selection(
+    index, regions, avocado_types, start_date, end_date
+):
+    assert index.summary_stats(regions, avocado_types, start_date, end_date) is None
+
+
+def test_price_change_and_region_extremes_match_utils(index):
+    regions = sorted(data["region"].unique())
+    rng = np.random.default_rng(2)
+
+    for number, (start_date, end_date) in enumerate(random_ranges(80, seed=3)):
+        avocado_type = ("organic", "conventional")[number % 2]
+        chosen = list(rng.choice(regions, rng.integers(1, 5), replace=False))
+
+        change = index.price_change(chosen, avocado_type, start_date, end_date)
+        extremes = index.region_extremes(avocado_type, start_date, end_date)
+
+        assert change == pytest.approx(
+            calculate_price_change(data, chosen, avocado_type, start_date, end_date)
+        )
+        expected = find_region_extremes(data, avocado_type, start_date, end_date)
+        if expected is None:
+            assert extremes is None
+            continue
+        # Regions tied on average price may be ranked either way by rounding
+        # noise in pandas' sums, so check the averages the picks stand for.
+        averages = (
+            selected_rows(None, [avocado_type], start_date, end_date)
+            .groupby("region")["AveragePrice"]
+            .mean()
+        )
+        for side in ("best", "worst"):
+            price = expected[f"{side}_price"]
+            assert extremes[f"{side}_price"] == pytest.approx(price)
+            assert averages[extremes[f"{side}_region"]] == pytest.approx(price)
+
+
+def test_region_extremes_break_ties_on_the_first_region():
+    # Equal averages, one a rounding error above: (0.1 + 0.2) / 2 vs 0.15.
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2015-01-04", "2015-01-11", "2015-01-04"] * 2),
+            "region": ["Albany", "Albany", "Boise", "Chicago", "Chicago", "Chicago"],
+            "type": ["organic"] * 6,
+            "AveragePrice": [0.1, 0.2, 0.15, 0.5, 0.5, 0.5],
+            "Total Volume": [1.0] * 6,
+        }
+    )
+
+    extremes = KpiIndex(frame).region_extremes("organic", "2015-01-01", "2015-01-31")
+
+    assert extremes == {
+        "best_region": "Chicago",
+        "best_price": pytest.approx(0.5),
+        "worst_region": "Albany",
+        "worst_price": pytest.approx(0.15),
+    }
+
+
+def test_rows_missing_a_key_or_value_are_handled_like_utils():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(
+                ["2015-01-04", "2015-01-11", None, "2015-01-04", "2015-01-11"]
+            ),
+            "region": ["Albany", "Albany", "Albany", None, "Boise"],
+            "type": ["organic"] * 5,
+            "AveragePrice": [1.0, float("nan"), 3.0, 4.0, float("nan")],
+            "Total Volume": [10.0, 20.0, 30.0, 40.0, float("nan")],
+        }
+    )
+    index = KpiIndex(frame)
+
+    stats = index.summary_stats(["Albany", "Boise"], ["organic"], None, None)
+    extremes = index.region_extremes("organic", "2015-01-01", "2015-01-31")
+
+    assert stats == {
+        "avg_price": 1.0,
+        "max_price": 1.0,
+        "min_price": 1.0,
+        "total_volume": 30.0,
+        "date_range": {
+            "start": pd.Timestamp("2015-01-04"),
+            "end": pd.Timestamp("2015-01-11"),
+        },
+    }
+    # Boise has rows but no prices to average: it isn't ranked.
+    assert extremes["best_region"] == extremes["worst_region"] == "Albany"
+    assert index.price_change(["Boise"], "organic", "2015-01-11", "2015-01-17") is None
+
+
+def assert_same_index(actual, expected):
+    assert actual.regions == expected.regions
+    assert actual.avocado_types == expected.avocado_types
+    np.testing.assert_array_equal(actual.dates, expected.dates)
+    for name in ("price_sum", "price_count", "row_count", "volume_sum"):
+        np.testing.assert_allclose(getattr(actual, name), getattr(expected, name))
+    for name in ("price_min", "price_max"):
+        assert len(getattr(actual, name)) == len(getattr(expected, name))
+        for runs, expected_runs in zip(getattr(actual, name), getattr(expected, name)):
+            np.testing.assert_array_equal(runs, expected_runs)
+    np.testing.assert_array_equal(actual.next_row, expected.next_row)
+    np.testing.assert_array_equal(actual.last_row, expected.last_row)
+
+
+@pytest.mark.parametrize("weeks", [1, 3, 64])
+def test_extending_by_later_weeks_matches_a_rebuild(weeks):
+    dates = np.sort(data["Date"].unique())
+    split = dates[-weeks]
+    history, batch = data[data["Date"] < split], data[data["Date"] >= split]
+    # A series missing from the batch, and one with a gap in it.
+    batch = batch[batch["region"] != "Albany"]
+    batch = batch[~((batch["region"] == "Boise") & (batch["Date"] == split))]
+
+    extended = KpiIndex(history).extended(batch)
+
+    assert_same_index(extended, KpiIndex(pd.concat([history, batch])))
+
+
+def test_extending_needs_known_keys_and_later_dates():
+    dates = np.sort(data["Date"].unique())
+    known = data[data["region"] != "Albany"]
+    index = KpiIndex(known[known["Date"] < dates[-1]])
+
+    # A new region, and a week the index already has.
+    assert index.extended(data[data["Date"] == dates[-1]]) is None
+    assert index.extended(known[known["Date"] == dates[-2]]) is None
+    assert index.extended(known[known["Date"] == dates[-1]]) is not None
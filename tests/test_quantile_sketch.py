@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import data
+from quantile_sketch import LogMapping, QuantileSketch, SketchIndex
+
+QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def assert_within(estimates, exact, relative_accuracy):
+    # A hair of slack for floating-point rounding at bin edges.
+    tolerance = relative_accuracy * np.abs(exact) * (1 + 1e-9) + 1e-300
+    assert np.all(np.abs(np.asarray(estimates) - exact) <= tolerance)
+
+
+def random_values(size, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(mean=2, sigma=3, size=size)
+    values[: size // 10] = 0.0
+    values[size // 10 : size // 5] *= -1
+    return rng.permutation(values)
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.05, 0.01, 0.001])
+@pytest.mark.parametrize("method", ["lower", "hazen"])
+def test_quantiles_are_within_the_relative_accuracy_of_exact_ones(
+    relative_accuracy, method
+):
+    values = random_values(5_000)
+
+    sketch = QuantileSketch.from_values(values, relative_accuracy)
+
+    estimates = sketch.quantiles(QUANTILES, method=method)
+    exact = np.quantile(values, QUANTILES, method=method)
+    assert_within(estimates, exact, relative_accuracy)
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(values.mean())
+
+
+def test_sketch_size_follows_the_range_of_magnitudes_not_the_count():
+    rng = np.random.default_rng(0)
+
+    small = QuantileSketch.from_values(rng.uniform(1, 1_000, 1_000))
+    large = QuantileSketch.from_values(rng.uniform(1, 1_000, 100_000))
+
+    # log(1000) / log(γ) bins cover [1, 1000] at 1% accuracy.
+    assert len(small.bins) <= len(large.bins) <= 350
+
+
+def test_merged_sketches_equal_the_sketch_of_all_values():
+    values = random_values(2_000)
+    left = QuantileSketch.from_values(values[:700])
+    right = QuantileSketch.from_values(values[700:])
+
+    merged = left.merge(right)
+
+    whole = QuantileSketch.from_values(values)
+    assert merged.bins.tolist() == whole.bins.tolist()
+    assert merged.counts.tolist() == whole.counts.tolist()
+    assert merged.total == pytest.approx(whole.total)
+
+
+def test_sketches_of_different_accuracy_do_not_merge():
+    with pytest.raises(ValueError, match="different relative accuracy"):
+        QuantileSketch.from_values([1.0], 0.01).merge(
+            QuantileSketch.from_values([1.0], 0.02)
+        )
+
+
+def test_nan_values_are_left_out():
+    sketch = QuantileSketch.from_values([1.0, float("nan"), 3.0])
+
+    assert sketch.count == 2
+    assert sketch.mean == 2.0
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.0, 1.0, -0.1])
+def test_relative_accuracy_must_be_a_fraction(relative_accuracy):
+    with pytest.raises(ValueError, match="relative_accuracy"):
+        LogMapping(relative_accuracy)
+
+
+def test_empty_sketches_and_unknown_methods_are_rejected():
+    with pytest.raises(ValueError, match="empty sketch"):
+        QuantileSketch.from_values([]).quantiles([0.5])
+    with pytest.raises(ValueError, match="Unknown quantile method"):
+        QuantileSketch.from_values([1.0]).quantiles([0.5], method="nearest")
+
+
+def test_box_statistics_approximate_the_exact_ones():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(0, 0.5, 1_000), [50.0, 100.0]])
+
+    box = QuantileSketch.from_values(values).box()
+
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], method="hazen")
+    assert_within([box["q1"], box["median"], box["q3"]], [q1, median, q3], 0.01)
+    assert box["mean"] == pytest.approx(values.mean())
+    assert box["lowerfence"] <= box["q1"] <= box["q3"] <= box["upperfence"]
+    outside = (values < box["lowerfence"]) | (values > box["upperfence"])
+    assert len(box["outliers"]) == pytest.approx(outside.sum(), abs=5)
+    assert max(box["outliers"]) == pytest.approx(100.0, rel=0.01)
+
+
+# --- The index -------------------------------------------------------------------
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SketchIndex(data, ["AveragePrice", "Total Volume"])
+
+
+def selected_rows(regions, avocado_types, start_date, end_date):
+    mask = pd.Series(True, index=data.index)
+    if regions is not None:
+        mask &= data["region"].isin(regions)
+    if avocado_types is not None:
+        mask &= data["type"].isin(avocado_types)
+    if start_date is not None:
+        mask &= data["Date"] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= data["Date"] <= pd.Timestamp(end_date)
+    return data[mask]
+
+
+@pytest.mark.parametrize(
+    "regions,avocado_types,start_date,end_date",
+    [
+        (None, None, None, None),
+        (["Albany", "Boston"], ["organic"], "2016-01-01", "2016-06-30"),
+        (None, ["conventional"], "2017-12-31", None),
+        (["Albany"], None, None, "2015-02-01"),
+        (["Albany"], ["organic"], "2015-01-04", "2015-01-04"),
+    ],
+)
+def test_index_sketches_the_selected_rows(
+    index, regions, avocado_types, start_date, end_date
+):
+    rows = selected_rows(regions, avocado_types, start_date, end_date)
+
+    sketch = index.sketch("Total Volume", regions, avocado_types, start_date, end_date)
+
+    expected = QuantileSketch.from_values(rows["Total Volume"])
+    assert sketch.bins.tolist() == expected.bins.tolist()
+    assert sketch.counts.tolist() == expected.counts.tolist()
+    assert sketch.total == pytest.approx(expected.total)
+    assert_within(
+        index.quantiles(
+            "Total Volume", QUANTILES, regions, avocado_types, start_date, end_date
+        ),
+        np.quantile(rows["Total Volume"], QUANTILES, method="lower"),
+        0.01,
+    )
+
+
+@pytest.mark.parametrize("by", ["region", "type", "year"])
+def test_index_splits_a_selection_by_group(index, by):
+    rows = selected_rows(["Albany", "Boise", "Chicago"], None, "2015-06-01", None)
+
+    split = index.sketches(
+        "AveragePrice", ["Chicago", "Boise", "Albany"], None, "2015-06-01", None, by
+    )
+
+    groups = rows.groupby(by)["AveragePrice"]
+    assert [key for key, _ in split] == sorted(groups.groups)
+    for key, sketch in split:
+        values = groups.get_group(key)
+        assert sketch.count == len(values)
+        assert sketch.mean == pytest.approx(values.mean())
+        assert_within(
+            sketch.quantiles([0.25, 0.5, 0.75], method="hazen"),
+            np.quantile(values, [0.25, 0.5, 0.75], method="hazen"),
+            0.01,
+        )
+
+
+@pytest.mark.parametrize(
+    "regions,avocado_types,start_date,end_date",
+    [
+        ([], None, None, None),
+        (["Nowhere"], None, None, None),
+        (None, None, "2030-01-01", None),
+        (None, None, "2016-01-05", "2016-01-09"),
+    ],
+)
+def test_index_has_nothing_for_an_empty_selection(
+    index, regions, avocado_types, start_date, end_date
+):
+    selection = index.select(regions, avocado_types, start_date, end_date)
+
+    assert selection.split("AveragePrice", "region") == []
+    assert selection.sketch("AveragePrice").count == 0
+    assert (
+        index.quantiles(
+            "AveragePrice", [0.5], regions, avocado_types, start_date, end_date
+        )
+        is None
+    )
+
+
+def test_index_leaves_out_rows_missing_a_key_or_value():
+    frame = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2015-01-04", "2015-01-11", None, "2015-01-04"]),
+            "region": ["Albany", "Albany", "Albany", None],
+            "type": ["organic", "organic", "organic", "organic"],
+            "AveragePrice": [1.0, float("nan"), 3.0, 4.0],
+        }
+    )
+
+    sketch = SketchIndex(frame, ["AveragePrice"]).sketch(
+        "AveragePrice", None, None, None, None
+    )
+
+    assert (sketch.count, sketch.total) == (1, 1.0)
+
+
+def test_index_selects_exact_dates_of_daily_data():
+    dates = pd.date_range("2019-12-20", "2020-01-31", freq="D")
+    frame = pd.DataFrame(
+        {
+            "Date": dates,
+            "region": "Albany",
+            "type": "organic",
+            "AveragePrice": np.arange(len(dates), dtype=float) + 1.0,
+        }
+    )
+    index = SketchIndex(frame, ["AveragePrice"])
+
+    sketch = index.sketch("AveragePrice", None, None, "2020-01-03", "2020-01-20")
+    years = index.sketches(
+        "AveragePrice", None, None, "2019-12-30", "2020-01-02", "year"
+    )
+
+    assert sketch.count == 18
+    assert (
+        sketch.total
+        == frame.set_index("Date").loc["2020-01-03":"2020-01-20", "AveragePrice"].sum()
+    )
+    assert [(year, part.count) for year, part in years] == [(2019, 2), (2020, 2)]
+
+
+def test_index_merges_any_date_range_exactly():
+    # 37 dates: not a power of two, so ranges end in a partial top block.
+    dates = pd.date_range("2019-12-10", periods=37, freq="D")
+    rng = np.random.default_rng(7)
+    frame = pd.DataFrame(
+        {
+            "Date": np.tile(dates, 2),
+            "region": np.repeat(["Albany", "Boston"], len(dates)),
+            "type": "organic",
+            "AveragePrice": rng.lognormal(0.3, 0.4, 2 * len(dates)),
+        }
+    )
+    index = SketchIndex(frame, ["AveragePrice"])
+
+    for first in range(len(dates)):
+        for last in range(first, len(dates)):
+            start, end = dates[first], dates[last]
+            rows = frame[frame["Date"].between(start, end)]
+            sketch = index.sketch("AveragePrice", None, None, start, end)
+            expected = QuantileSketch.from_values(rows["AveragePrice"])
+            assert sketch.bins.tolist() == expected.bins.tolist()
+            assert sketch.counts.tolist() == expected.counts.tolist()
+            assert sketch.total == pytest.approx(expected.total)
+            years = index.sketches("AveragePrice", None, None, start, end, "year")
+            assert [(year, part.count) for year, part in years] == [
+                (year, len(group)) for year, group in rows.groupby(rows["Date"].dt.year)
+            ]
+
+
+def test_index_rejects_an_unknown_split():
+    with pytest.raises(ValueError, match="Cannot split"):
+        SketchIndex(data.iloc[:10], ["AveragePrice"]).sketches(
+            "AveragePrice", None, None, None, None, by="month"
+        )
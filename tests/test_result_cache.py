@@ -0,0 +1,181 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from result_cache import ResultCache
+
+
+def make_cache(max_entries=4, max_bytes=100):
+    return ResultCache(max_entries=max_entries, max_bytes=max_bytes, sizeof=len)
+
+
+def test_repeated_lookups_compute_once():
+    cache = make_cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_compute("key", compute) == "value"
+    assert cache.get_or_compute("key", compute) == "value"
+
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.bytes) == (1, 1, 1, 5)
+    assert stats.hit_rate == 0.5
+
+
+def test_least_recently_used_entry_is_evicted_past_max_entries():
+    cache = make_cache(max_entries=2)
+    cache.get_or_compute("a", lambda: "a")
+    cache.get_or_compute("b", lambda: "b")
+    cache.get_or_compute("a", lambda: "a")  # "b" is now least recently used
+
+    cache.get_or_compute("c", lambda: "c")
+
+    assert cache.get_or_compute("a", lambda: "recomputed") == "a"
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    assert cache.stats().evictions == 2
+
+
+def test_entries_are_evicted_to_stay_within_the_byte_budget():
+    cache = make_cache(max_bytes=10)
+    cache.get_or_compute("a", lambda: "x" * 6)
+
+    cache.get_or_compute("b", lambda: "y" * 6)
+
+    stats = cache.stats()
+    assert (stats.entries, stats.bytes, stats.evictions) == (1, 6, 1)
+    assert cache.get_or_compute("b", lambda: "recomputed") == "y" * 6
+
+
+def test_value_larger_than_the_budget_is_returned_but_not_stored():
+    cache = make_cache(max_bytes=3)
+
+    assert cache.get_or_compute("big", lambda: "too big") == "too big"
+
+    assert cache.stats().entries == 0
+
+
+def test_zero_entries_disables_the_cache():
+    cache = make_cache(max_entries=0)
+
+    cache.get_or_compute("key", lambda: "value")
+    cache.get_or_compute("key", lambda: "value")
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (0, 2, 0)
+
+
+def test_clear_drops_entries_but_keeps_counting():
+    cache = make_cache()
+    cache.get_or_compute("key", lambda: "old")
+
+    cache.clear()
+
+    assert cache.get_or_compute("key", lambda: "new") == "new"
+    assert cache.stats().misses == 2
+
+
+def test_failed_computation_is_not_cached():
+    cache = make_cache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        cache.get_or_compute("key", fail)
+
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+
+
+def test_concurrent_lookups_of_a_missing_key_share_one_computation():
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "value"
+
+    results = []
+    owner = threading.Thread(
+        target=lambda: results.append(cache.get_or_compute("key", slow_compute))
+    )
+    owner.start()
+    started.wait(timeout=5)
+    waiters = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("key", slow_compute))
+        )
+        for _ in range(4)
+    ]
+    for waiter in waiters:
+        waiter.start()
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join(timeout=5)
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert (cache.stats().hits, cache.stats().misses) == (4, 1)
+
+
+def test_waiters_recompute_when_the_shared_computation_fails():
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_compute():
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def lookup(compute):
+        try:
+            cache.get_or_compute("key", compute)
+        except RuntimeError as error:
+            errors.append(error)
+
+    owner = threading.Thread(target=lookup, args=(failing_compute,))
+    owner.start()
+    started.wait(timeout=5)
+    results = []
+    waiter = threading.Thread(
+        target=lambda: results.append(cache.get_or_compute("key", lambda: "value"))
+    )
+    waiter.start()
+    release.set()
+    owner.join(timeout=5)
+    waiter.join(timeout=5)
+
+    assert len(errors) == 1
+    assert results == ["value"]
+
+
+def test_hits_record_the_compute_time_they_saved():
+    cache = ResultCache(max_entries=4)
+    ticks = iter([10.0, 12.5])
+
+    with patch("result_cache.time.perf_counter", lambda: next(ticks)):
+        cache.get_or_compute("key", lambda: "value")
+    cache.get_or_compute("key", lambda: "value")
+    cache.get_or_compute("key", lambda: "value")
+
+    assert cache.stats().saved_seconds == 5.0
+
+
+def test_without_sizeof_only_the_entry_count_bounds_the_cache():
+    cache = ResultCache(max_entries=2)
+    for key in "abc":
+        cache.get_or_compute(key, lambda: "x" * 1000)
+
+    stats = cache.stats()
+    assert (stats.entries, stats.bytes, stats.evictions) == (2, 0, 1)
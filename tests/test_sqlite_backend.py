@@ -0,0 +1,334 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import app
+import datastore
+import sqlite_backend
+from data_index import BlockIndex
+from dataset import DatasetSnapshot
+from sqlite_backend import SqliteSnapshot, build_sqlite_store
+from utils import calculate_price_change, calculate_summary_stats, find_region_extremes
+
+BUNDLED_CSV = os.path.join(os.path.dirname(datastore.__file__), "avocado.csv")
+
+SAMPLE_CSV = (
+    ",Date,AveragePrice,Total Volume,type,year,region\n"
+    "0,2015-01-11,1.40,1200.5,organic,2015,Albany\n"
+    "1,2015-01-04,1.50,1000.0,organic,2015,Albany\n"
+    "2,2015-01-04,0.90,5000.25,conventional,2015,Boise\n"
+)
+
+
+@pytest.fixture(scope="module")
+def bundled_frame():
+    return datastore.parse_csv(BUNDLED_CSV)
+
+
+@pytest.fixture(scope="module")
+def bundled_db(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("sqlite") / "avocado.sqlite")
+    build_sqlite_store(BUNDLED_CSV, db_path, chunk_rows=5_000)
+    return db_path
+
+
+@pytest.fixture(params=["pandas", "sqlite"])
+def backend(request, bundled_frame, bundled_db):
+    """The same dataset behind each query backend."""
+    if request.param == "sqlite":
+        return SqliteSnapshot(bundled_db)
+    return DatasetSnapshot.build(bundled_frame, BlockIndex(bundled_frame))
+
+
+def matching_rows(frame, regions, avocado_types, start_date, end_date):
+    mask = pd.Series(True, index=frame.index)
+    if regions is not None:
+        mask &= frame["region"].isin(regions)
+    if avocado_types is not None:
+        mask &= frame["type"].isin(avocado_types)
+    if start_date is not None:
+        mask &= frame["Date"] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= frame["Date"] <= pd.Timestamp(end_date)
+    return frame[mask]
+
+
+# --- Parity across backends ---------------------------------------------------
+
+
+def test_backends_agree_on_metadata(backend, bundled_frame):
+    assert backend.regions == sorted(bundled_frame["region"].unique())
+    assert backend.avocado_types == sorted(bundled_frame["type"].unique())
+    assert backend.min_date == bundled_frame["Date"].min().date()
+    assert backend.max_date == bundled_frame["Date"].max().date()
+    assert backend.row_count == len(bundled_frame)
+    assert backend.dates.tolist() == sorted(bundled_frame["Date"].dt.date.unique())
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        (None, None, None, None),
+        (["Albany", "Boston"], ["organic"], "2016-01-01", "2016-06-30"),
+        (None, ["conventional"], "2017-12-31", None),
+        (["Albany"], None, None, "2015-02-01"),
+        ([], None, None, None),
+        (["Nowhere"], None, None, None),
+    ],
+)
+def test_backends_select_the_same_rows(backend, bundled_frame, query):
+    selected = backend.select(*query)
+
+    assert selected["Date"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        selected.sort_index(), matching_rows(bundled_frame, *query).sort_index()
+    )
+    assert backend.count(*query) == len(selected)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        (None, None, None, None),
+        (["Albany", "Boston"], ["organic"], "2016-01-01", "2016-06-30"),
+        (None, ["conventional"], "2017-12-31", None),
+        ([], None, None, None),
+        (["Albany"], None, "2030-01-01", None),
+    ],
+)
+def test_backends_agree_on_summary_stats(backend, bundled_frame, query):
+    rows = matching_rows(bundled_frame, *query)
+    expected = None if rows.empty else calculate_summary_stats(rows)
+
+    stats = backend.summary_stats(*query)
+
+    if expected is None:
+        assert stats is None
+    else:
+        assert stats["date_range"] == expected["date_range"]
+        assert {key: stats[key] for key in expected if key != "date_range"} == (
+            pytest.approx(
+                {key: expected[key] for key in expected if key != "date_range"}
+            )
+        )
+
+
+@pytest.mark.parametrize(
+    "avocado_type, start_date, end_date",
+    [
+        ("organic", "2016-01-01", "2016-06-30"),
+        ("conventional", "2015-01-01", "2018-12-31"),
+    ],
+)
+def test_backends_agree_on_region_extremes(
+    backend, bundled_frame, avocado_type, start_date, end_date
+):
+    expected = find_region_extremes(bundled_frame, avocado_type, start_date, end_date)
+
+    extremes = backend.region_extremes(avocado_type, start_date, end_date)
+
+    assert extremes == pytest.approx(expected)
+
+
+def test_backends_report_no_extremes_outside_the_data(backend):
+    assert backend.region_extremes("organic", "2030-01-01", "2030-12-31") is None
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date, expected",
+    [
+        ("2015-01-01", "2015-01-31", {"Albany": 1.5, "Boise": 0.9}),
+        ("2015-01-08", "2015-01-14", None),
+    ],
+)
+def test_backends_skip_regions_without_a_price(
+    tmp_path, start_date, end_date, expected
+):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(
+        SAMPLE_CSV.replace("1.40", "").replace("conventional", "organic")
+        + "3,2015-01-04,,800.0,organic,2015,Chicago\n"
+    )
+    frame = datastore.parse_csv(str(csv_path))
+    build_sqlite_store(str(csv_path), str(tmp_path / "sample.sqlite"))
+    backends = [
+        DatasetSnapshot.build(frame, BlockIndex(frame)),
+        SqliteSnapshot(str(tmp_path / "sample.sqlite")),
+    ]
+
+    for backend in backends:
+        extremes = backend.region_extremes("organic", start_date, end_date)
+        if expected is None:
+            assert extremes is None
+        else:
+            assert extremes == {
+                "best_region": "Albany",
+                "best_price": pytest.approx(expected["Albany"]),
+                "worst_region": "Boise",
+                "worst_price": pytest.approx(expected["Boise"]),
+            }
+
+
+@pytest.mark.parametrize(
+    "regions, start_date, end_date",
+    [
+        (["Albany"], "2016-01-01", "2016-06-30"),
+        (["Albany", "Boston", "Chicago"], "2017-03-05", "2017-03-11"),
+        (["Albany"], "2015-01-04", "2015-02-01"),
+        ([], "2016-01-01", "2016-06-30"),
+    ],
+)
+def test_backends_agree_on_price_change(
+    backend, bundled_frame, regions, start_date, end_date
+):
+    expected = calculate_price_change(
+        bundled_frame, regions, "organic", start_date, end_date
+    )
+
+    change = backend.price_change(regions, "organic", start_date, end_date)
+
+    assert change == pytest.approx(expected)
+
+
+# --- Building and opening the store --------------------------------------------
+
+
+def test_build_keeps_the_last_row_per_key(tmp_path):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV + "3,2015-01-04,1.55,1100.0,organic,2015,Albany\n")
+    db_path = str(tmp_path / "sample.sqlite")
+
+    assert build_sqlite_store(str(csv_path), db_path, chunk_rows=2) == 3
+
+    snapshot = SqliteSnapshot(db_path)
+    expected = datastore.parse_csv(str(csv_path))
+    pd.testing.assert_frame_equal(
+        snapshot.data.sort_index(), expected.sort_index(), check_like=True
+    )
+    assert snapshot.select(["Albany"], None, "2015-01-04", "2015-01-04")[
+        "AveragePrice"
+    ].tolist() == [1.55]
+
+
+def test_build_rejects_a_csv_missing_required_columns(tmp_path):
+    csv_path = tmp_path / "bad.csv"
+    csv_path.write_text("Date,region\n2015-01-04,Albany\n")
+
+    with pytest.raises(ValueError, match="missing required columns"):
+        build_sqlite_store(str(csv_path), str(tmp_path / "bad.sqlite"))
+    assert not (tmp_path / "bad.sqlite").exists()
+
+
+def test_store_without_dated_rows_is_rejected(tmp_path):
+    csv_path = tmp_path / "empty.csv"
+    csv_path.write_text(SAMPLE_CSV.splitlines()[0] + "\n")
+    db_path = str(tmp_path / "empty.sqlite")
+    build_sqlite_store(str(csv_path), db_path)
+
+    with pytest.raises(ValueError, match="no dated rows"):
+        SqliteSnapshot(db_path)
+
+
+def test_store_from_another_version_is_rejected(tmp_path):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV)
+    db_path = str(tmp_path / "sample.sqlite")
+    build_sqlite_store(str(csv_path), db_path)
+    connection = sqlite3.connect(db_path)
+    connection.execute("UPDATE manifest SET body = json_set(body, '$.version', 0)")
+    connection.commit()
+    connection.close()
+
+    with pytest.raises(ValueError, match="rebuild it with sqlite_backend.py"):
+        SqliteSnapshot(db_path)
+    assert not sqlite_backend.sqlite_store_is_current(db_path, str(csv_path))
+
+
+def test_missing_store_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No SQLite store"):
+        SqliteSnapshot(str(tmp_path / "missing.sqlite"))
+
+
+def test_cli_builds_next_to_the_csv(tmp_path, capsys):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV)
+
+    sqlite_backend.main([str(csv_path)])
+
+    assert "Wrote 3 rows" in capsys.readouterr().out
+    assert SqliteSnapshot(str(csv_path) + ".sqlite").row_count == 3
+
+
+# --- Serving it from the app ----------------------------------------------------
+
+
+@pytest.fixture
+def sqlite_app(tmp_path, monkeypatch):
+    csv_path = tmp_path / "sample.csv"
+    csv_path.write_text(SAMPLE_CSV)
+    monkeypatch.setenv("AVOCADO_DATA_PATH", str(csv_path))
+    monkeypatch.setenv("AVOCADO_QUERY_BACKEND", "sqlite")
+    monkeypatch.delenv("AVOCADO_SQLITE_PATH", raising=False)
+    monkeypatch.delenv("AVOCADO_PARTITION_DIR", raising=False)
+    return csv_path
+
+
+def test_app_serves_the_sqlite_backend(sqlite_app):
+    snapshot = app.load_snapshot()
+    previous = app.swap_dataset(snapshot)
+    try:
+        assert isinstance(snapshot, SqliteSnapshot)
+        assert snapshot.db_path == str(sqlite_app) + ".sqlite"
+        assert app.regions == ["Albany", "Boise"]
+        assert len(app.filter_data(["Albany"], "organic", None, None)) == 2
+        summary = app.create_summary_panel(
+            app.filter_data(["Albany"], "organic", "2015-01-08", "2015-01-14"),
+            ["Albany"],
+            "organic",
+            "2015-01-08",
+            "2015-01-14",
+        )
+        assert "-6.7%" in str(summary)
+        with pytest.raises(ValueError, match="in-memory dataset"):
+            app.append_batch(str(sqlite_app))
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_app_draws_sqlite_box_plots_from_rows(sqlite_app, monkeypatch):
+    monkeypatch.setattr(app, "BOX_PLOT_SKETCH", True)
+    snapshot = app.load_snapshot()
+    previous = app.swap_dataset(snapshot)
+    try:
+        figure = app.update_box_plot(
+            None, "organic", None, None, "AveragePrice", "region"
+        )
+        assert app.sketch_index(snapshot) is None
+        assert [trace["x"] for trace in figure["data"]] == [["Albany"]]
+        assert figure["data"][0]["median"] == [1.45]
+    finally:
+        app.swap_dataset(previous)
+
+
+def test_app_rebuilds_a_stale_store(sqlite_app, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "custom.sqlite")
+    monkeypatch.setenv("AVOCADO_SQLITE_PATH", db_path)
+    assert app.load_snapshot().row_count == 3
+
+    with open(sqlite_app, "a") as source:
+        source.write("3,2016-02-07,1.10,800.0,organic,2016,Denver\n")
+    stat = os.stat(sqlite_app)
+    os.utime(sqlite_app, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    snapshot = app.load_snapshot()
+    assert snapshot.row_count == 4
+    assert "Denver" in snapshot.regions
+
+
+def test_unknown_query_backend_is_rejected(sqlite_app, monkeypatch):
+    monkeypatch.setenv("AVOCADO_QUERY_BACKEND", "duckdb")
+
+    with pytest.raises(ValueError, match="Unknown AVOCADO_QUERY_BACKEND"):
+        app.load_snapshot()
@@ -11,6 +11,7 @@ from translations import (
     column_tooltip,
     groupby_label,
     groupby_tooltip,
+    localized,
     t,
     type_label,
 )
@@ -75,3 +76,15 @@ def test_type_label_matches_existing_title_case_convention_for_english():
     assert type_label("organic", "en") == "Organic"
     assert type_label("conventional", "es") == "Convencional"
     assert type_label("organic", "es") == "Orgánico"
+
+
+def test_localized_text_renders_its_lookups_in_each_language():
+    text = localized(("column", "AveragePrice"), " vs ", ("type", "organic"))
+
+    assert text.render("en") == f"{column_label('AveragePrice', 'en')} vs Organic"
+    assert text.render("es") == f"{column_label('AveragePrice', 'es')} vs Orgánico"
+
+
+def test_localized_text_raises_for_an_unknown_key():
+    with pytest.raises(KeyError):
+        localized(("t", "nonexistent.key")).render("en")